@@ -4,8 +4,18 @@ from beanie import init_beanie
 from motor.motor_asyncio import AsyncIOMotorClient
 from starlette.middleware.cors import CORSMiddleware
 from config import CONFIG
+from utils.graphql_cache import GraphQLCacheMiddleware
+from utils.graphql_persisted import PersistedQueryMiddleware
+from utils.metrics import MetricsMiddleware, mongo_command_metrics
+from utils.profiling import ProfilingMiddleware
+from utils.timing import ServerTimingMiddleware
 from models.dmarc_report import *
 from models.users import *
+from models.dmarc_rollup import *
+from models.dmarc_record import *
+from models.dmarc_report_chunk import *
+from models.ip_enrichment import *
+from utils.rdns import create_enricher, enrichment_worker
 
 
 
@@ -20,15 +30,31 @@ It supports:
 """
 
 
+DOCUMENT_MODELS = [
+    DMARCReportModel,
+    DMARCReportChunk,
+    DMARCDailyRollup,
+    DMARCRecord,
+    IPEnrichment,
+    User,
+]
+
+
+async def init_db():
+    db = AsyncIOMotorClient(CONFIG.mongo_uri, event_listeners=[mongo_command_metrics]).account
+    # init_beanie also creates the indexes declared in each model's Settings
+    await init_beanie(db, document_models=DOCUMENT_MODELS)
+    return db
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # type: ignore
-    app.db = AsyncIOMotorClient(CONFIG.mongo_uri).account 
-    await init_beanie(app.db, document_models=[
-        DMARCReportModel,
-        User
-        ]) 
+    app.db = await init_db()
+    if CONFIG.RDNS_ENABLED:
+        enrichment_worker.start(create_enricher())
     
     yield
+    await enrichment_worker.stop()
     print("Shutdown complete")
 
 #add cors middleware
@@ -39,11 +65,22 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Added before CORSMiddleware so cached GraphQL responses still get CORS headers
+app.add_middleware(GraphQLCacheMiddleware)
+# Added after GraphQLCacheMiddleware so it runs first and the cache sees the query text
+app.add_middleware(PersistedQueryMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+if CONFIG.PROFILER:
+    app.add_middleware(ProfilingMiddleware, profiler=CONFIG.PROFILER, sample_rate=CONFIG.PROFILE_SAMPLE_RATE, directory=CONFIG.PROFILE_DIR)
+if CONFIG.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
 
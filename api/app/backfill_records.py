@@ -0,0 +1,22 @@
+import asyncio
+from app import init_db
+from config import CONFIG
+from utils.dmarc_records import backfill_geoip, backfill_records
+from utils.ingest import index_pending_reports
+from utils.rdns import backfill_rdns, create_enricher
+
+
+async def main():
+    await init_db()
+    pending = await index_pending_reports()
+    print(f"Pending reports indexed: {pending} reports")
+    written = await backfill_records()
+    print(f"Records backfilled: {written} records written")
+    updated = await backfill_geoip()
+    print(f"GeoIP backfilled: {updated} records updated")
+    if CONFIG.RDNS_ENABLED:
+        enriched = await backfill_rdns(create_enricher())
+        print(f"Reverse DNS backfilled: {enriched} source IPs enriched")
+
+if __name__ == "__main__":
+    asyncio.run(main())
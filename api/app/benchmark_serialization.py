@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+import time
+from beanie.odm.utils.encoder import Encoder
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app import init_db
+from models.dmarc_report import DMARCReportModel
+from utils.report_storage import to_document
+from utils.serialization import dumps
+
+
+def synthetic_report(records: int) -> dict:
+    """
+    Build a report as the email client parser sends it: repeated elements as lists, scalars as strings.
+    """
+    return {
+        "version": "1.0",
+        "report_metadata": {
+            "org_name": "benchmark",
+            "email": "dmarc@example.com",
+            "report_id": "benchmark",
+            "date_range": {"begin": "1712620800", "end": "1712707200"},
+        },
+        "policy_published": {"domain": "example.com", "adkim": "r", "aspf": "r", "p": "none", "pct": "100"},
+        "record": [
+            {
+                "row": {
+                    "source_ip": f"10.0.{i // 256 % 256}.{i % 256}",
+                    "count": str(i % 7 + 1),
+                    "policy_evaluated": {"disposition": "none", "dkim": "pass", "spf": "fail"},
+                },
+                "identifiers": {"envelope_from": "example.com", "header_from": "example.com"},
+                "auth_results": {
+                    "dkim": [{"domain": "example.com", "selector": "default", "result": "pass"}],
+                    "spf": [{"domain": "example.com", "result": "fail"}],
+                },
+            }
+            for i in range(records)
+        ],
+    }
+
+
+def timed(function, repeat: int) -> float:
+    """
+    Return the best time of `repeat` runs of function, in milliseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(records: int, repeat: int) -> dict:
+    report = synthetic_report(records)
+    model = DMARCReportModel(**report)
+    model.id = ObjectId()
+    # What Motor returns when the report is read back
+    document = to_document(model)
+    return {
+        # Ingest: validation, then building the document to insert
+        "validate": timed(lambda: DMARCReportModel(**report), repeat),
+        "beanie encode": timed(lambda: Encoder(to_db=True, keep_nulls=True).encode(model), repeat),
+        "to_document": timed(lambda: to_document(model), repeat),
+        # Reads: the previous response path and the raw orjson one
+        "model json": timed(lambda: json.dumps(jsonable_encoder(model), separators=(",", ":")).encode(), repeat),
+        "raw orjson": timed(lambda: dumps(document), repeat),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare report ingest and response serialization paths.")
+    parser.add_argument("--records", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Beanie documents can only be built once the models are initialized
+    await init_db()
+    columns = ("validate", "beanie encode", "to_document", "model json", "raw orjson")
+    print(f"{'records':>8}" + "".join(f"{name + ' (ms)':>20}" for name in columns))
+    for records in args.records:
+        times = run(records, args.repeat)
+        print(f"{records:>8}" + "".join(f"{times[name]:>20.1f}" for name in columns))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,44 @@ class Settings(BaseModel):
     SECRET_KEY: str = config("SECRET_KEY")
     ALGORITHM : str = config("ALGORITHM", default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES : int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
+    AUTH_CACHE_TTL: int = config("AUTH_CACHE_TTL", default=60, cast=int)
+    AUTH_CACHE_MAX_ENTRIES: int = config("AUTH_CACHE_MAX_ENTRIES", default=10000, cast=int)
+    MAX_PAGE_SIZE: int = config("MAX_PAGE_SIZE", default=500, cast=int)
+    EXPORT_BATCH_SIZE: int = config("EXPORT_BATCH_SIZE", default=500, cast=int)
+    # "memory" is only invalidated in the process that inserts reports: use "redis" with several workers
+    RESPONSE_CACHE_BACKEND: str = config("RESPONSE_CACHE_BACKEND", default="memory")
+    RESPONSE_CACHE_TTL: int = config("RESPONSE_CACHE_TTL", default=300, cast=int)
+    RESPONSE_CACHE_MAX_ENTRIES: int = config("RESPONSE_CACHE_MAX_ENTRIES", default=1024, cast=int)
+    RESPONSE_CACHE_MAX_BUCKET_DAYS: int = config("RESPONSE_CACHE_MAX_BUCKET_DAYS", default=366, cast=int)
+    REDIS_URL: str = config("REDIS_URL", default="redis://localhost:6379/0")
+    GEOIP_COUNTRY_DB: str = config("GEOIP_COUNTRY_DB", default="")
+    GEOIP_ASN_DB: str = config("GEOIP_ASN_DB", default="")
+    GEOIP_CACHE_SIZE: int = config("GEOIP_CACHE_SIZE", default=65536, cast=int)
+    RDNS_ENABLED: bool = config("RDNS_ENABLED", default=True, cast=bool)
+    RDNS_CONCURRENCY: int = config("RDNS_CONCURRENCY", default=20, cast=int)
+    RDNS_TTL: int = config("RDNS_TTL", default=604800, cast=int)
+    RDNS_NEGATIVE_TTL: int = config("RDNS_NEGATIVE_TTL", default=3600, cast=int)
+    RDNS_FORWARD_CONFIRM: bool = config("RDNS_FORWARD_CONFIRM", default=True, cast=bool)
+    RDNS_BATCH_SIZE: int = config("RDNS_BATCH_SIZE", default=100, cast=int)
+    RDNS_QUEUE_SIZE: int = config("RDNS_QUEUE_SIZE", default=10000, cast=int)
+    DNS_NAMESERVERS: list = config("DNS_NAMESERVERS", default="", cast=lambda v: [n.strip() for n in v.split(",") if n.strip()])
+    DNS_PORT: int = config("DNS_PORT", default=53, cast=int)
+    DNS_TIMEOUT: float = config("DNS_TIMEOUT", default=3.0, cast=float)
+    REPORT_CHUNK_SIZE: int = config("REPORT_CHUNK_SIZE", default=5000, cast=int)
+    GRAPHQL_MAX_DEPTH: int = config("GRAPHQL_MAX_DEPTH", default=10, cast=int)
+    GRAPHQL_MAX_ALIASES: int = config("GRAPHQL_MAX_ALIASES", default=20, cast=int)
+    GRAPHQL_MAX_TOKENS: int = config("GRAPHQL_MAX_TOKENS", default=2000, cast=int)
+    GRAPHQL_MAX_COMPLEXITY: int = config("GRAPHQL_MAX_COMPLEXITY", default=20000, cast=int)
+    GRAPHQL_LIST_SIZE: int = config("GRAPHQL_LIST_SIZE", default=10, cast=int)
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = config("GRAPHQL_DOCUMENT_CACHE_SIZE", default=256, cast=int)
+    GRAPHQL_PERSISTED_QUERIES: str = config("GRAPHQL_PERSISTED_QUERIES", default="")
+    GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES: int = config("GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES", default=1000, cast=int)
+    GRAPHQL_PERSISTED_QUERIES_REGISTRATION: bool = config("GRAPHQL_PERSISTED_QUERIES_REGISTRATION", default=True, cast=bool)
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=True, cast=bool)
+    PROFILER: str = config("PROFILER", default="")
+    PROFILE_SAMPLE_RATE: float = config("PROFILE_SAMPLE_RATE", default=0.01, cast=float)
+    PROFILE_DIR: str = config("PROFILE_DIR", default="profiles")
+    BULK_MAX_REPORTS: int = config("BULK_MAX_REPORTS", default=1000, cast=int)
     API_KEYS: list = config("API_KEYS", cast=lambda v: [k.strip() for k in v.split(",")])
 
 CONFIG = Settings()
\ No newline at end of file
@@ -0,0 +1,44 @@
+from typing import Optional
+from beanie import Document, PydanticObjectId
+from datetime import datetime
+import pymongo
+from pymongo import IndexModel
+from models.dmarc_report import AuthResultType
+from models.geoip import GeoIPInfo
+from models.ip_enrichment import ReverseDNSInfo
+
+
+class DMARCRecord(Document):
+    report: PydanticObjectId
+    record_index: int
+    report_id: str
+    org_name: str
+    domain: str
+    begin: datetime
+    end: datetime
+    source_ip: str
+    count: int
+    disposition: Optional[str] = None
+    dkim: Optional[str] = None
+    spf: Optional[str] = None
+    header_from: Optional[str] = None
+    envelope_from: Optional[str] = None
+    envelope_to: Optional[str] = None
+    auth_results: Optional[AuthResultType] = None
+    geo: Optional[GeoIPInfo] = None
+    rdns: Optional[ReverseDNSInfo] = None
+
+    class Settings:
+        collection = "dmarc_record"
+        indexes = [
+            IndexModel([("report", pymongo.ASCENDING), ("record_index", pymongo.ASCENDING)], unique=True, name="report_record_unique"),
+            IndexModel([("begin", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)], name="begin_id"),
+            IndexModel([("report_id", pymongo.ASCENDING)], name="report_id"),
+            IndexModel([("source_ip", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="source_ip_begin"),
+            IndexModel([("header_from", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="header_from_begin"),
+            IndexModel([("dkim", pymongo.ASCENDING), ("spf", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="policy_evaluated_begin"),
+            IndexModel([("auth_results.dkim.result", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="dkim_result_begin"),
+            IndexModel([("auth_results.spf.result", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="spf_result_begin"),
+            IndexModel([("geo.country_code", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="country_begin"),
+            IndexModel([("rdns.org", pymongo.ASCENDING), ("begin", pymongo.ASCENDING)], name="sender_org_begin"),
+        ]
@@ -1,8 +1,10 @@
 from typing import Optional, List, Union
 from pydantic import EmailStr, Field, BaseModel, validator
 from uuid import UUID
-from beanie import Document, Indexed
+from beanie import Document, Indexed, PydanticObjectId
 from datetime import datetime
+import pymongo
+from pymongo import IndexModel
 
 class DateRangeType(BaseModel):
     begin: datetime
@@ -93,11 +95,27 @@ class PolicyPublishedType(BaseModel):
     pct: Optional[int] = None
     fo: Optional[str] = None
 
+class RecordTotals(BaseModel):
+    record_count: int
+    message_count: int
+    dkim_pass: int
+    dkim_fail: int
+    spf_pass: int
+    spf_fail: int
+    disposition_none: int
+    disposition_quarantine: int
+    disposition_reject: int
+
 class DMARCReportModel(Document):
     version: Optional[str] = None
     report_metadata: ReportMetadataType
     policy_published: PolicyPublishedType
     record: Union[List[RecordType], RecordType]
+    # Set on reports stored as a header plus record chunks (see utils/report_storage.py)
+    record_chunks: Optional[int] = None
+    record_totals: Optional[RecordTotals] = None
+    # Set until everything derived from the report is written (see utils/ingest.py)
+    pending_index: Optional[bool] = None
     
     @validator('record', pre=True)
     def ensure_record_is_list(cls, v):
@@ -107,3 +125,74 @@ class DMARCReportModel(Document):
     
     class Settings:
         collection = "dmarc_report"
+        indexes = [
+            IndexModel(
+                [("report_metadata.org_name", pymongo.ASCENDING), ("report_metadata.report_id", pymongo.ASCENDING)],
+                unique=True,
+                name="org_name_report_id_unique",
+            ),
+            IndexModel([("report_metadata.report_id", pymongo.ASCENDING)], name="report_id"),
+            IndexModel(
+                [("report_metadata.date_range.begin", pymongo.ASCENDING), ("report_metadata.date_range.end", pymongo.ASCENDING)],
+                name="date_range",
+            ),
+            IndexModel(
+                [("report_metadata.date_range.begin", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+                name="date_range_begin_id",
+            ),
+            IndexModel(
+                [("policy_published.domain", pymongo.ASCENDING), ("report_metadata.date_range.begin", pymongo.ASCENDING)],
+                name="domain_date_range",
+            ),
+            IndexModel([("pending_index", pymongo.ASCENDING)], sparse=True, name="pending_index"),
+        ]
+
+
+def _count_where(field: str, value: str) -> dict:
+    return {"$sum": {"$map": {
+        "input": "$record",
+        "as": "r",
+        "in": {"$cond": [{"$eq": [f"$$r.row.policy_evaluated.{field}", value]}, "$$r.row.count", 0]},
+    }}}
+
+
+_MESSAGE_COUNT = {"$sum": "$record.row.count"}
+
+
+def _total(name: str, expression: dict) -> dict:
+    # Chunked reports keep their totals in the header, their record list is empty
+    return {"$ifNull": [f"$record_totals.{name}", expression]}
+
+
+class DMARCReportSummary(BaseModel):
+    """Report metadata and record totals, computed by MongoDB without loading the records."""
+    id: PydanticObjectId = Field(alias="_id")
+    version: Optional[str] = None
+    report_metadata: ReportMetadataType
+    policy_published: PolicyPublishedType
+    record_count: int
+    message_count: int
+    dkim_pass: int
+    dkim_fail: int
+    spf_pass: int
+    spf_fail: int
+    disposition_none: int
+    disposition_quarantine: int
+    disposition_reject: int
+
+    class Settings:
+        projection = {
+            "_id": 1,
+            "version": 1,
+            "report_metadata": 1,
+            "policy_published": 1,
+            "record_count": _total("record_count", {"$size": "$record"}),
+            "message_count": _total("message_count", _MESSAGE_COUNT),
+            "dkim_pass": _total("dkim_pass", _count_where("dkim", "pass")),
+            "dkim_fail": _total("dkim_fail", {"$subtract": [_MESSAGE_COUNT, _count_where("dkim", "pass")]}),
+            "spf_pass": _total("spf_pass", _count_where("spf", "pass")),
+            "spf_fail": _total("spf_fail", {"$subtract": [_MESSAGE_COUNT, _count_where("spf", "pass")]}),
+            "disposition_none": _total("disposition_none", _count_where("disposition", "none")),
+            "disposition_quarantine": _total("disposition_quarantine", _count_where("disposition", "quarantine")),
+            "disposition_reject": _total("disposition_reject", _count_where("disposition", "reject")),
+        }
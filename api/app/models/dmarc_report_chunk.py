@@ -0,0 +1,17 @@
+from typing import List
+from beanie import Document, PydanticObjectId
+import pymongo
+from pymongo import IndexModel
+from models.dmarc_report import RecordType
+
+
+class DMARCReportChunk(Document):
+    report: PydanticObjectId
+    index: int
+    record: List[RecordType]
+
+    class Settings:
+        collection = "dmarc_report_chunk"
+        indexes = [
+            IndexModel([("report", pymongo.ASCENDING), ("index", pymongo.ASCENDING)], unique=True, name="report_index_unique"),
+        ]
@@ -0,0 +1,23 @@
+from typing import Optional
+from beanie import Document
+from datetime import datetime
+import pymongo
+from pymongo import IndexModel
+
+ROLLUP_KEY_FIELDS = ("day", "domain", "source_ip", "header_from", "disposition", "dkim", "spf")
+
+class DMARCDailyRollup(Document):
+    day: datetime
+    domain: Optional[str] = None
+    source_ip: Optional[str] = None
+    header_from: Optional[str] = None
+    disposition: Optional[str] = None
+    dkim: Optional[str] = None
+    spf: Optional[str] = None
+    count: int = 0
+
+    class Settings:
+        collection = "dmarc_daily_rollup"
+        indexes = [
+            IndexModel([(field, pymongo.ASCENDING) for field in ROLLUP_KEY_FIELDS], unique=True, name="rollup_key"),
+        ]
@@ -0,0 +1,29 @@
+from typing import Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+class SourceIPCount(BaseModel):
+    source_ip: Optional[str] = None
+    count: int
+
+class IdentifierCount(BaseModel):
+    identifier: Optional[str] = None
+    count: int
+
+class PolicyResultCount(BaseModel):
+    disposition: Optional[str] = None
+    dkim: Optional[str] = None
+    spf: Optional[str] = None
+    count: int
+
+class DailyCount(BaseModel):
+    day: datetime
+    disposition: Optional[str] = None
+    dkim: Optional[str] = None
+    spf: Optional[str] = None
+    count: int
+
+class CountryCount(BaseModel):
+    country_code: Optional[str] = None
+    country: Optional[str] = None
+    count: int
@@ -0,0 +1,8 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class GeoIPInfo(BaseModel):
+    country_code: Optional[str] = None
+    country: Optional[str] = None
+    asn: Optional[int] = None
+    as_org: Optional[str] = None
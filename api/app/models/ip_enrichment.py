@@ -0,0 +1,28 @@
+from typing import Optional
+from beanie import Document
+from datetime import datetime
+import pymongo
+from pydantic import BaseModel
+from pymongo import IndexModel
+
+
+class ReverseDNSInfo(BaseModel):
+    ptr: Optional[str] = None
+    forward_confirmed: Optional[bool] = None
+    org: Optional[str] = None
+
+
+class IPEnrichment(Document):
+    ip: str
+    rdns: ReverseDNSInfo
+    status: str
+    resolved_at: datetime
+    expires_at: datetime
+
+    class Settings:
+        collection = "ip_enrichment"
+        indexes = [
+            IndexModel([("ip", pymongo.ASCENDING)], unique=True, name="ip_unique"),
+            # MongoDB removes entries once expires_at has passed, so they are resolved again
+            IndexModel([("expires_at", pymongo.ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+        ]
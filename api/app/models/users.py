@@ -1,7 +1,8 @@
     
 from pydantic import BaseModel, Field, EmailStr
-from beanie import Document
+from beanie import Delete, Document, Replace, Save, SaveChanges, Update, after_event
 from typing import Optional
+from utils.auth import principal_cache
 
 class Token(BaseModel):
     access_token: str
@@ -16,6 +17,10 @@ class User(Document):
     user_type: str
     password: str
 
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_principals(self):
+        principal_cache.invalidate_user(self.username, self.email)
+
     class Settings:
         collection = "users"
 
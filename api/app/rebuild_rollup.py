@@ -0,0 +1,12 @@
+import asyncio
+from app import init_db
+from utils.dmarc_rollup import rebuild_rollup
+
+
+async def main():
+    await init_db()
+    written = await rebuild_rollup()
+    print(f"Rollup rebuilt: {written} daily buckets written")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,11 @@
 
+import time
 from datetime import timedelta
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import APIKeyHeader, OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from utils.auth import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, API_KEYS, SECRET_KEY, create_access_token, get_password_hash, verify_password
+from utils.auth import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY, create_access_token, get_password_hash, is_api_key, principal_cache, verify_password
+from utils.timing import record_timing
 from models.users import *
 import jwt
 from jwt.exceptions import InvalidTokenError
@@ -26,7 +28,15 @@ async def authenticate_user(username: str, password: str):
     return user
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+async def resolve_token(token: Optional[str]) -> Optional[UserResponse]:
+    """
+    Resolve the user of an access token, from the principal cache when possible.
+    """
+    if not token:
+        return None
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -38,10 +48,15 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     user = await get_user(username=token_data.username)
     if user is None:
         return None
-    return UserResponse.from_user(user)
+    principal = UserResponse.from_user(user)
+    principal_cache.set(token, principal, payload.get("exp"))
+    return principal
+
+async def get_current_user(token: Annotated[Optional[str], Depends(oauth2_scheme)]):
+    return await resolve_token(token)
 
 async def authenticate_api_key(api_key: str = Depends(api_key_header)):
-    if api_key in API_KEYS:
+    if is_api_key(api_key):
         return api_key
     return None
     
@@ -62,12 +77,19 @@ async def login_for_access_token(
     )
     return Token(access_token=access_token, token_type="bearer")
 
-async def get_current_auth(api_key: Optional[str] = Depends(authenticate_api_key), 
-                           user: Optional[UserResponse] = Depends(get_current_user)):
-    if api_key:
-        return True, api_key
-    if user:
-        return True, user
+async def get_current_auth(request: Request,
+                           api_key: Optional[str] = Depends(api_key_header),
+                           token: Optional[str] = Depends(oauth2_scheme)):
+    # The token is only resolved when no valid API key was sent
+    start = time.perf_counter()
+    try:
+        if is_api_key(api_key):
+            return True, api_key
+        user = await resolve_token(token)
+        if user:
+            return True, user
+    finally:
+        record_timing(request, "auth", time.perf_counter() - start)
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not authenticated",
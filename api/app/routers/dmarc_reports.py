@@ -1,10 +1,23 @@
 
 from typing import Annotated
-from fastapi import APIRouter, Depends, Query, status, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, Query, Request, status, HTTPException
 from fastapi.encoders import jsonable_encoder
-import pymongo
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from config import CONFIG
 from models.dmarc_report import *
+from models.dmarc_stats import *
+from models.dmarc_record import DMARCRecord
 from routers.auth import get_current_auth
+from utils import dmarc_stats
+from utils.cache import response_cache
+from utils.dmarc_records import find_records_page
+from utils.ingest import index_reports
+from utils.pagination import RAW_PROJECTION, find_raw_reports_page, find_reports_page
+from utils.report_storage import insert_documents, insert_report, iter_report_json, needs_chunks
+from utils.export import EXPORT_FORMATS, export_stream
 
 router = APIRouter()
 
@@ -20,85 +33,201 @@ async def create_dmarc_report(report: dict, auth: tuple = Depends(get_current_au
         dict: A dictionary containing a success message.
 
     Raises:
-        HTTPException: If the report_id is missing or if a DMARC report with the same report_id already exists.
+        HTTPException: If the report_id is missing or if a DMARC report with the same org_name and report_id already exists.
     """
     is_authenticated, user = auth
     if not is_authenticated:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     
-    report_id = report.get("report_metadata", {}).get("report_id")
+    metadata = report.get("report_metadata")
+    report_id = metadata.get("report_id") if isinstance(metadata, dict) else None
     if not report_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="report_id is required in report_metadata")
     
-    existing_report = await DMARCReportModel.find_one({"report_metadata.report_id": report_id})
-    if existing_report:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="DMARC Report with this report_id already exists")
-    
     new_report = DMARCReportModel(**report)
-    await new_report.create()
+    try:
+        await insert_report(new_report)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="DMARC Report with this report_id already exists")
+    await index_reports([new_report])
     return {"message": "DMARC Report created successfully"}
     
 
-async def get_all_dmarc_reports(skip: int = 0, limit: int = 10):
+def parse_bulk_body(body: bytes, content_type: str) -> list:
     """
-    Retrieve a list of DMARC reports.
+    Parse a bulk ingest body, either a JSON array or NDJSON (one report per line).
 
-    Args:
-        skip (int): Number of reports to skip (default is 0).
-        limit (int): Maximum number of reports to retrieve (default is 10).
+    Raises:
+        HTTPException: If the body cannot be decoded.
+    """
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            return [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        reports = orjson.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid bulk body: {e}")
+    if not isinstance(reports, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bulk body must be a JSON array or NDJSON")
+    return reports
+
+
+@router.post("/aggregated_report/bulk")
+async def create_dmarc_reports_bulk(request: Request, auth: tuple = Depends(get_current_auth)):
+    """
+    Create a batch of DMARC reports with a single unordered insert.
+
+    The body is either a JSON array of reports or NDJSON with one report per
+    line. Invalid reports and reports that already exist are reported per item
+    and do not fail the rest of the batch. Existing reports are detected by the
+    unique (org_name, report_id) index, so no lookup is made before the insert.
+    Reports above REPORT_CHUNK_SIZE records are inserted one by one, in chunks.
+
+    Reports are validated once and written with their own serializer (see
+    insert_documents), without a second pass through Beanie's encoder.
 
+    Args:
+        request (Request): The request holding the batch of reports.
+        auth (tuple): The authentication tuple.
     Returns:
-        List[DMARCReportModel]: A list of DMARC reports.
+        dict: A per-report status list ("created", "already_exists" or "invalid") and totals per status.
 
+    Raises:
+        HTTPException: If the body cannot be parsed or the batch exceeds BULK_MAX_REPORTS.
     """
-    reports = await DMARCReportModel.find_all().skip(skip).limit(limit).to_list()
-    return reports
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    reports = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    if len(reports) > CONFIG.BULK_MAX_REPORTS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A bulk request can hold at most {CONFIG.BULK_MAX_REPORTS} reports")
+
+    results = []
+    pending = {}
+    for index, report in enumerate(reports):
+        metadata = report.get("report_metadata") if isinstance(report, dict) else None
+        if not isinstance(metadata, dict):
+            metadata = {}
+        report_id = metadata.get("report_id")
+        result = {"index": index, "report_id": report_id, "status": "created"}
+        results.append(result)
+        if not report_id:
+            result.update(status="invalid", detail="report_id is required in report_metadata")
+            continue
+        try:
+            new_report = DMARCReportModel(**report)
+        except ValidationError as e:
+            result.update(status="invalid", detail=str(e))
+            continue
+        # Keyed by the validated values, the raw ones may be of any JSON type
+        key = (new_report.report_metadata.org_name, new_report.report_metadata.report_id)
+        if key in pending:
+            result.update(status="already_exists", detail="Duplicate report_id in batch")
+            continue
+        pending[key] = (index, new_report)
+
+    inserted = []
+    to_insert = []
+    for index, report in pending.values():
+        if not needs_chunks(report):
+            report.pending_index = True
+            to_insert.append((index, report))
+            continue
+        try:
+            inserted.append(await insert_report(report))
+        except DuplicateKeyError:
+            results[index].update(status="already_exists", detail="DMARC Report with this report_id already exists")
+
+    if to_insert:
+        failed = set()
+        try:
+            await insert_documents([report for _, report in to_insert], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                index = to_insert[error["index"]][0]
+                failed.add(error["index"])
+                if error.get("code") == 11000:
+                    results[index].update(status="already_exists", detail="DMARC Report with this report_id already exists")
+                else:
+                    results[index].update(status="invalid", detail=error.get("errmsg"))
+        inserted.extend(report for i, (_, report) in enumerate(to_insert) if i not in failed)
+    await index_reports(inserted)
 
-async def get_dmarc_reports_by_date_range(start_date: datetime, end_date: datetime):
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+
+async def get_dmarc_reports_page(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+    projection_model=None,
+):
     """
-    Retrieves DMARC reports within a specified date range.
+    Retrieve one page of DMARC reports ordered by date_range.begin, optionally within a date range.
 
     Args:
-        start_date (datetime): The start date of the date range.
-        end_date (datetime): The end date of the date range.
-        
+        start_date (Optional[datetime]): Only reports that begin on or after this date.
+        end_date (Optional[datetime]): Only reports that end on or before this date.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): Maximum number of reports in the page, capped at MAX_PAGE_SIZE (default is 10).
+        projection_model: Fetch this projection (e.g. DMARCReportSummary) instead of full reports (default is None).
 
     Returns:
-        List[DMARCReportModel]: A list of DMARC reports within the specified date range.
+        tuple: The list of DMARC reports (raw documents when projection_model is None) and the cursor of the next page (None on the last page).
 
     Raises:
-        HTTPException: If no DMARC reports are found for the given date range.
-    """
-    print(start_date, end_date)
-    reports = await DMARCReportModel.find_many(
-                DMARCReportModel.report_metadata.date_range.begin >= start_date,
-                DMARCReportModel.report_metadata.date_range.end <= end_date
-            ).sort(
-                [
-                    (DMARCReportModel.report_metadata.date_range.begin, pymongo.ASCENDING),
-                    (DMARCReportModel.report_metadata.date_range.end, pymongo.ASCENDING),
-                ]
-            ).to_list()
-    if not reports:
+        HTTPException: If the cursor is invalid, or no DMARC reports are found for the given date range.
+    """
+    try:
+        if projection_model:
+            reports, next_cursor = await find_reports_page(start_date, end_date, cursor, limit, projection_model)
+        else:
+            reports, next_cursor = await find_raw_reports_page(start_date, end_date, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not reports and not cursor and (start_date or end_date):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No DMARC Reports found for the given date range")
-    return reports
+    return reports, next_cursor
+
+
+async def page_content(headers: dict, page) -> list:
+    """
+    Await a (items, next_cursor) page, setting the X-Next-Cursor header when there is a next page.
+    """
+    items, next_cursor = await page
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @router.get("/aggregated_report", response_model=List[DMARCReportModel])
 async def get_dmarc_reports(
+    request: Request,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    skip: int = 0,
-    limit: int = 10,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, gt=0),
     auth: tuple = Depends(get_current_auth)
 ):
     """
-    Retrieve DMARC reports based on the specified date range or retrieve all DMARC reports.
+    Retrieve a page of DMARC reports, optionally within a date range.
+
+    Reports are ordered by date_range.begin. When more reports are available, the
+    cursor of the next page is returned in the X-Next-Cursor header; pass it back
+    as the cursor parameter to continue.
+
+    Responses are cached until a report within their date range is inserted, and
+    carry an ETag: send it back in If-None-Match to get a 304 when nothing changed.
 
     Parameters:
     - start_date (Optional[datetime]): The start date of the date range to filter the reports. Defaults to None.
     - end_date (Optional[datetime]): The end date of the date range to filter the reports. Defaults to None.
-    - skip (int): The number of reports to skip. Defaults to 0.
-    - limit (int): The maximum number of reports to retrieve. Defaults to 10.
+    - cursor (Optional[str]): The X-Next-Cursor value of the previous page. Defaults to None.
+    - limit (int): The maximum number of reports to retrieve, capped at MAX_PAGE_SIZE. Defaults to 10.
     - auth (tuple): The authentication tuple.
 
     Returns:
@@ -108,17 +237,357 @@ async def get_dmarc_reports(
     if not is_authenticated:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     
-    if start_date and end_date:
-        return await get_dmarc_reports_by_date_range(start_date, end_date)
-    else:
-        return await get_all_dmarc_reports(skip, limit)
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: page_content(headers, get_dmarc_reports_page(start_date, end_date, cursor, limit)),
+    )
+
+
+@router.get("/aggregated_report/summary", response_model=List[DMARCReportSummary])
+async def get_dmarc_report_summaries(
+    request: Request,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, gt=0),
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Retrieve a page of DMARC report summaries, optionally within a date range.
+
+    A summary holds the report metadata, the published policy and the record
+    totals (records, messages, DKIM/SPF pass and fail, dispositions). Totals are
+    computed by MongoDB, so the records themselves are never sent. Paging works
+    as in GET /aggregated_report, with the X-Next-Cursor header.
+
+    Parameters:
+    - start_date (Optional[datetime]): The start date of the date range to filter the reports. Defaults to None.
+    - end_date (Optional[datetime]): The end date of the date range to filter the reports. Defaults to None.
+    - cursor (Optional[str]): The X-Next-Cursor value of the previous page. Defaults to None.
+    - limit (int): The maximum number of reports to retrieve, capped at MAX_PAGE_SIZE. Defaults to 10.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[DMARCReportSummary]: The summaries of the DMARC reports matching the specified criteria.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: page_content(headers, get_dmarc_reports_page(start_date, end_date, cursor, limit, DMARCReportSummary)),
+    )
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("/aggregated_report/export")
+async def export_dmarc_records(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    format: str = "ndjson",
+    gzip: bool = False,
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Stream every record within a date range, one flattened row per record.
+
+    Each row holds the report metadata (org_name, email, report_id, begin, end, domain),
+    source_ip, count, disposition, dkim, spf and the identifiers. Rows are read from a
+    MongoDB cursor in batches of EXPORT_BATCH_SIZE and written as they arrive, so the
+    server memory does not grow with the size of the range.
+
+    Parameters:
+    - start_date (Optional[datetime]): The start date of the date range. Defaults to None.
+    - end_date (Optional[datetime]): The end date of the date range. Defaults to None.
+    - format (str): "ndjson" or "csv". Defaults to "ndjson".
+    - gzip (bool): Gzip-compress the file. Defaults to False.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - StreamingResponse: The export file.
+
+    Raises:
+    - HTTPException: If the format is not supported.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    filename = f"dmarc_records.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_stream(start_date, end_date, format, gzip, CONFIG.EXPORT_BATCH_SIZE),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/aggregated_report/records", response_model=List[DMARCRecord])
+async def get_dmarc_records(
+    request: Request,
+    source_ip: Optional[str] = None,
+    header_from: Optional[str] = None,
+    envelope_from: Optional[str] = None,
+    envelope_to: Optional[str] = None,
+    domain: Optional[str] = None,
+    org_name: Optional[str] = None,
+    disposition: Optional[str] = None,
+    dkim: Optional[str] = None,
+    spf: Optional[str] = None,
+    dkim_result: Optional[str] = None,
+    spf_result: Optional[str] = None,
+    country_code: Optional[str] = None,
+    sender_org: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, gt=0),
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Retrieve a page of individual records, each with its report metadata, matching exact filters.
+
+    Records are read from the dmarc_record collection, so filtering on source_ip,
+    header_from, the evaluated policy or the auth results is an index lookup. Paging
+    works as in GET /aggregated_report, with the X-Next-Cursor header.
+
+    Parameters:
+    - source_ip, header_from, envelope_from, envelope_to (Optional[str]): Record identifiers to match.
+    - domain, org_name (Optional[str]): Report policy domain and reporter to match.
+    - disposition, dkim, spf (Optional[str]): Evaluated policy results to match.
+    - dkim_result, spf_result (Optional[str]): Any DKIM/SPF auth result to match.
+    - country_code (Optional[str]): GeoIP country (ISO code) of the source IP to match.
+    - sender_org (Optional[str]): Organization owning the source IP to match, set by the reverse DNS enrichment.
+    - start_date (Optional[datetime]): Only records of reports that begin on or after this date. Defaults to None.
+    - end_date (Optional[datetime]): Only records of reports that end on or before this date. Defaults to None.
+    - cursor (Optional[str]): The X-Next-Cursor value of the previous page. Defaults to None.
+    - limit (int): The maximum number of records to retrieve, capped at MAX_PAGE_SIZE. Defaults to 10.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[DMARCRecord]: The matching records ordered by report begin date.
+
+    Raises:
+    - HTTPException: If the cursor is invalid.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    filters = {
+        "source_ip": source_ip,
+        "header_from": header_from,
+        "envelope_from": envelope_from,
+        "envelope_to": envelope_to,
+        "domain": domain,
+        "org_name": org_name,
+        "disposition": disposition,
+        "dkim": dkim,
+        "spf": spf,
+        "dkim_result": dkim_result,
+        "spf_result": spf_result,
+        "country_code": country_code,
+        "sender_org": sender_org,
+    }
+
+    async def records_page():
+        try:
+            return await find_records_page(filters, start_date, end_date, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: page_content(headers, records_page()),
+    )
+
+
+@router.get("/aggregated_report/stats/source_ip", response_model=List[SourceIPCount])
+async def get_source_ip_stats(
+    request: Request,
+    start_date: datetime,
+    end_date: datetime,
+    limit: Optional[int] = Query(None, gt=0),
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Retrieve the total message count per source IP within a date range.
+    Counts have day granularity: reports are counted by the UTC day they begin,
+    from the day of start_date up to end_date; their end date is not compared.
+
+    Parameters:
+    - start_date (datetime): The start date of the date range, truncated to its UTC day.
+    - end_date (datetime): The end date of the date range, exclusive.
+    - limit (Optional[int]): Only return the top N source IPs. Defaults to None.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[SourceIPCount]: Source IPs sorted by descending message count.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: dmarc_stats.count_by_source_ip(start_date, end_date, limit),
+    )
+
+
+@router.get("/aggregated_report/stats/identifiers/{field}", response_model=List[IdentifierCount])
+async def get_identifier_stats(
+    request: Request,
+    field: str,
+    start_date: datetime,
+    end_date: datetime,
+    limit: Optional[int] = Query(None, gt=0),
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Retrieve the total message count per identifier within a date range.
+    Counts have day granularity: reports are counted by the UTC day they begin,
+    from the day of start_date up to end_date; their end date is not compared.
+
+    Parameters:
+    - field (str): The identifier to group by (header_from, envelope_from or envelope_to).
+    - start_date (datetime): The start date of the date range, truncated to its UTC day.
+    - end_date (datetime): The end date of the date range, exclusive.
+    - limit (Optional[int]): Only return the top N identifiers. Defaults to None.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[IdentifierCount]: Identifier values sorted by descending message count.
+
+    Raises:
+    - HTTPException: If the identifier field is not supported.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    if field not in dmarc_stats.IDENTIFIER_FIELDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"field must be one of {', '.join(dmarc_stats.IDENTIFIER_FIELDS)}")
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: dmarc_stats.count_by_identifier(start_date, end_date, field, limit),
+    )
+
+
+@router.get("/aggregated_report/stats/policy_evaluated", response_model=List[PolicyResultCount])
+async def get_policy_result_stats(request: Request, start_date: datetime, end_date: datetime, auth: tuple = Depends(get_current_auth)):
+    """
+    Retrieve the total message count per disposition/dkim/spf result within a date range.
+    Counts have day granularity: reports are counted by the UTC day they begin,
+    from the day of start_date up to end_date; their end date is not compared.
+
+    Parameters:
+    - start_date (datetime): The start date of the date range, truncated to its UTC day.
+    - end_date (datetime): The end date of the date range, exclusive.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[PolicyResultCount]: The message count for each evaluated result combination.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: dmarc_stats.count_by_policy_result(start_date, end_date),
+    )
+
+
+@router.get("/aggregated_report/stats/daily", response_model=List[DailyCount])
+async def get_daily_stats(request: Request, start_date: datetime, end_date: datetime, auth: tuple = Depends(get_current_auth)):
+    """
+    Retrieve the total message count per day and evaluated result within a date range.
+    Counts have day granularity: reports are counted by the UTC day they begin,
+    from the day of start_date up to end_date; their end date is not compared.
+
+    Parameters:
+    - start_date (datetime): The start date of the date range, truncated to its UTC day.
+    - end_date (datetime): The end date of the date range, exclusive.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[DailyCount]: The message count per day, disposition, dkim and spf result.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    return await response_cache.cached_response(
+        request,
+        response_cache.date_buckets(start_date, end_date),
+        lambda headers: dmarc_stats.count_by_day(start_date, end_date),
+    )
+
+
+@router.get("/aggregated_report/stats/countries", response_model=List[CountryCount])
+async def get_country_stats(
+    request: Request,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    report_id: Optional[str] = None,
+    auth: tuple = Depends(get_current_auth)
+):
+    """
+    Retrieve the total message count per source IP country, within a date range or for one report.
+
+    Countries are resolved from the local GeoIP database when records are stored,
+    so no lookup is made at query time.
+
+    Parameters:
+    - start_date (Optional[datetime]): The start date of the date range. Defaults to None.
+    - end_date (Optional[datetime]): The end date of the date range. Defaults to None.
+    - report_id (Optional[str]): Only count the records of this report instead of a date range. Defaults to None.
+    - auth (tuple): The authentication tuple.
+
+    Returns:
+    - List[CountryCount]: Countries sorted by descending message count.
+
+    Raises:
+    - HTTPException: If neither a report_id nor a date range is given.
+    """
+    is_authenticated, user = auth
+    if not is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    if not report_id and not (start_date and end_date):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="report_id or start_date and end_date are required")
+    buckets = [] if report_id else response_cache.date_buckets(start_date, end_date)
+    return await response_cache.cached_response(
+        request,
+        buckets,
+        lambda headers: dmarc_stats.count_by_country(start_date, end_date, report_id),
+    )
 
 
 @router.get("/aggregated_report/{report_id}", response_model=DMARCReportModel)
-async def get_dmarc_report_by_id(report_id: str, auth: tuple = Depends(get_current_auth)):
+async def get_dmarc_report_by_id(request: Request, report_id: str, auth: tuple = Depends(get_current_auth)):
     """
     Retrieve a DMARC report by its ID.
 
+    Reports stored in chunks are streamed chunk by chunk instead of being
+    reassembled and cached, and carry no ETag. Cache hits are answered without
+    querying the database.
+
     Parameters:
     - report_id (str): The ID of the DMARC report to retrieve.
     - auth (tuple): The authentication tuple.
@@ -133,8 +602,17 @@ async def get_dmarc_report_by_id(report_id: str, auth: tuple = Depends(get_curre
     if not is_authenticated:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     
-    report = await DMARCReportModel.find_one({"report_metadata.report_id": report_id})
-    if not report:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DMARC Report not found")
-    return report
+    collection = DMARCReportModel.get_motor_collection()
+
+    async def find_report(headers):
+        report = await collection.find_one({"report_metadata.report_id": report_id}, RAW_PROJECTION)
+        if not report:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DMARC Report not found")
+        if report.get("record_chunks"):
+            # Only the header, with an empty record list, was read; not cached
+            return StreamingResponse(iter_report_json(report), media_type="application/json")
+        return report
+
+    # Stored reports never change, so the response does not depend on any date bucket
+    return await response_cache.cached_response(request, [], find_report)
   
\ No newline at end of file
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from strawberry.fastapi import GraphQLRouter
 from routers.auth import get_current_auth
 from schemas.dmarc_report import schema
+from utils.graphql_loaders import get_context
 
 
 router = APIRouter()
-graphql_app = GraphQLRouter(schema)
+graphql_app = GraphQLRouter(schema, context_getter=get_context)
 
 router.include_router(graphql_app, prefix="/graphql")
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Expose the Prometheus metrics of this API process: request latency per route and MongoDB command timing.
+
+    Returns:
+    - Response: The metrics in the Prometheus text format.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
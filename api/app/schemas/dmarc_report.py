@@ -3,10 +3,20 @@ from fastapi import APIRouter
 from strawberry.schema.config import StrawberryConfig
 
 import strawberry
+from strawberry.types import Info
 from datetime import datetime
 from typing import List, Optional
 import pymongo
+from pymongo.errors import DuplicateKeyError
 from models.dmarc_report import DMARCReportModel
+from utils import dmarc_stats
+from utils.dmarc_records import find_records_page
+from utils.graphql_limits import graphql_extensions
+from utils.graphql_loaders import report_key
+from utils.ingest import index_reports
+from utils.pagination import find_projected_reports_page, page_size
+from utils.projection import ProjectedDocument, project_documents, selected_projection
+from utils.report_storage import insert_report, load_record_documents, with_record_chunks
 
 router = APIRouter()
 
@@ -171,45 +181,239 @@ class DMARCReportType:
     policy_published: Optional[PolicyPublishedType]
     record: Optional[List[RecordType]]
 
+@strawberry.type
+class DMARCReportPageType:
+    items: List[DMARCReportType]
+    next_cursor: Optional[str]
+
+@strawberry.type
+class GeoIPType:
+    country_code: Optional[str]
+    country: Optional[str]
+    asn: Optional[int]
+    as_org: Optional[str]
+
+@strawberry.type
+class ReverseDNSType:
+    ptr: Optional[str]
+    forward_confirmed: Optional[bool]
+    org: Optional[str]
+
+@strawberry.type
+class DMARCRecordType:
+    id: Optional[str]
+    report_id: Optional[str]
+    org_name: Optional[str]
+    domain: Optional[str]
+    begin: Optional[datetime]
+    end: Optional[datetime]
+    source_ip: Optional[str]
+    count: Optional[int]
+    disposition: Optional[str]
+    dkim: Optional[str]
+    spf: Optional[str]
+    header_from: Optional[str]
+    envelope_from: Optional[str]
+    envelope_to: Optional[str]
+    auth_results: Optional[AuthResultType]
+    geo: Optional[GeoIPType]
+    rdns: Optional[ReverseDNSType]
+
+    @strawberry.field
+    async def report(self, info: Info) -> Optional[DMARCReportType]:
+        # The reports of all the records of a page are loaded together
+        report = await info.context["report_by_id_loader"].load(report_key(self.report, selected_projection(info)))
+        return ProjectedDocument(report) if report else None
+
+@strawberry.type
+class DMARCRecordPageType:
+    items: List[DMARCRecordType]
+    next_cursor: Optional[str]
+
+@strawberry.type
+class SourceIPCountType:
+    source_ip: Optional[str]
+    count: int
+
+@strawberry.type
+class IdentifierCountType:
+    identifier: Optional[str]
+    count: int
+
+@strawberry.type
+class PolicyResultCountType:
+    disposition: Optional[str]
+    dkim: Optional[str]
+    spf: Optional[str]
+    count: int
+
+@strawberry.type
+class CountryCountType:
+    country_code: Optional[str]
+    country: Optional[str]
+    count: int
+
+@strawberry.type
+class DailyCountType:
+    day: datetime
+    disposition: Optional[str]
+    dkim: Optional[str]
+    spf: Optional[str]
+    count: int
+
 # Queries
 @strawberry.type
 class Query:
-    @strawberry.field
-    async def all_dmarc_reports(self, skip: int = 0, limit: int = 10) -> List[DMARCReportType]:
+    @strawberry.field(
+        deprecation_reason="skip makes deep pages scan every report before them; "
+        "use dmarc_reports_page and its next_cursor, like the REST listing"
+    )
+    async def all_dmarc_reports(self, info: Info, skip: int = 0, limit: int = 10) -> List[DMARCReportType]:
         try:
-            reports = await DMARCReportModel.find_all().skip(skip).limit(limit).to_list()
-            return reports
+            projection = with_record_chunks(selected_projection(info))
+            reports = await DMARCReportModel.get_motor_collection().find(
+                {}, projection
+            ).skip(skip).limit(page_size(limit)).to_list(length=None)
+            return project_documents(await load_record_documents(reports, projection))
         except Exception as e:
             raise Exception(f"Error retrieving DMARC reports: {str(e)}")
 
     @strawberry.field
-    async def dmarc_report_by_id(self, report_id: str) -> Optional[DMARCReportType]:
+    async def dmarc_reports_page(
+        self,
+        info: Info,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> DMARCReportPageType:
+        try:
+            reports, next_cursor = await find_projected_reports_page(
+                selected_projection(info, "items"), start_date, end_date, cursor, limit
+            )
+            return DMARCReportPageType(items=project_documents(reports), next_cursor=next_cursor)
+        except Exception as e:
+            raise Exception(f"Error retrieving DMARC reports page: {str(e)}")
+
+    @strawberry.field
+    async def dmarc_report_by_id(self, info: Info, report_id: str) -> Optional[DMARCReportType]:
         try:
-            report = await DMARCReportModel.find_one({"report_metadata.report_id": report_id})
+            report = await info.context["report_by_report_id_loader"].load(report_key(report_id, selected_projection(info)))
             if not report:
                 raise Exception("DMARC Report not found")
-            return report
+            return ProjectedDocument(report)
         except Exception as e:
             raise Exception(f"Error retrieving DMARC report by ID: {str(e)}")
 
     @strawberry.field
-    async def all_dmarc_reports_by_date_range(self, start_date: datetime, end_date: datetime) -> List[DMARCReportType]:
+    async def all_dmarc_reports_by_date_range(self, info: Info, start_date: datetime, end_date: datetime, limit: Optional[int] = None) -> List[DMARCReportType]:
         try:
-            reports = await DMARCReportModel.find_many(
-                DMARCReportModel.report_metadata.date_range.begin >= start_date,
-                DMARCReportModel.report_metadata.date_range.end <= end_date
+            projection = with_record_chunks(selected_projection(info))
+            reports = await DMARCReportModel.get_motor_collection().find(
+                {
+                    "report_metadata.date_range.begin": {"$gte": start_date},
+                    "report_metadata.date_range.end": {"$lte": end_date},
+                },
+                projection,
             ).sort(
                 [
-                    (DMARCReportModel.report_metadata.date_range.begin, pymongo.ASCENDING),
-                    (DMARCReportModel.report_metadata.date_range.end, pymongo.ASCENDING),
+                    ("report_metadata.date_range.begin", pymongo.ASCENDING),
+                    ("report_metadata.date_range.end", pymongo.ASCENDING),
                 ]
-            ).to_list()
-            if not reports:
-                raise Exception("No DMARC Reports found for the given date range")
-            return reports
+            ).limit(page_size(limit)).to_list(length=None)
+            return project_documents(await load_record_documents(reports, projection))
         except Exception as e:
             raise Exception(f"Error retrieving DMARC reports by date range: {str(e)}")
 
+    @strawberry.field
+    async def dmarc_records(
+        self,
+        source_ip: Optional[str] = None,
+        header_from: Optional[str] = None,
+        envelope_from: Optional[str] = None,
+        envelope_to: Optional[str] = None,
+        domain: Optional[str] = None,
+        org_name: Optional[str] = None,
+        disposition: Optional[str] = None,
+        dkim: Optional[str] = None,
+        spf: Optional[str] = None,
+        dkim_result: Optional[str] = None,
+        spf_result: Optional[str] = None,
+        country_code: Optional[str] = None,
+        sender_org: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> DMARCRecordPageType:
+        try:
+            filters = {
+                "source_ip": source_ip,
+                "header_from": header_from,
+                "envelope_from": envelope_from,
+                "envelope_to": envelope_to,
+                "domain": domain,
+                "org_name": org_name,
+                "disposition": disposition,
+                "dkim": dkim,
+                "spf": spf,
+                "dkim_result": dkim_result,
+                "spf_result": spf_result,
+                "country_code": country_code,
+                "sender_org": sender_org,
+            }
+            records, next_cursor = await find_records_page(filters, start_date, end_date, cursor, limit)
+            return DMARCRecordPageType(items=records, next_cursor=next_cursor)
+        except Exception as e:
+            raise Exception(f"Error retrieving DMARC records: {str(e)}")
+
+    @strawberry.field
+    async def source_ip_counts(self, start_date: datetime, end_date: datetime, limit: Optional[int] = None) -> List[SourceIPCountType]:
+        try:
+            counts = await dmarc_stats.count_by_source_ip(start_date, end_date, limit)
+            return [SourceIPCountType(**c.dict()) for c in counts]
+        except Exception as e:
+            raise Exception(f"Error retrieving source IP counts: {str(e)}")
+
+    @strawberry.field
+    async def identifier_counts(self, field: str, start_date: datetime, end_date: datetime, limit: Optional[int] = None) -> List[IdentifierCountType]:
+        try:
+            counts = await dmarc_stats.count_by_identifier(start_date, end_date, field, limit)
+            return [IdentifierCountType(**c.dict()) for c in counts]
+        except Exception as e:
+            raise Exception(f"Error retrieving identifier counts: {str(e)}")
+
+    @strawberry.field
+    async def policy_result_counts(self, start_date: datetime, end_date: datetime) -> List[PolicyResultCountType]:
+        try:
+            counts = await dmarc_stats.count_by_policy_result(start_date, end_date)
+            return [PolicyResultCountType(**c.dict()) for c in counts]
+        except Exception as e:
+            raise Exception(f"Error retrieving policy result counts: {str(e)}")
+
+    @strawberry.field
+    async def daily_counts(self, start_date: datetime, end_date: datetime) -> List[DailyCountType]:
+        try:
+            counts = await dmarc_stats.count_by_day(start_date, end_date)
+            return [DailyCountType(**c.dict()) for c in counts]
+        except Exception as e:
+            raise Exception(f"Error retrieving daily counts: {str(e)}")
+
+    @strawberry.field
+    async def country_counts(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        report_id: Optional[str] = None,
+    ) -> List[CountryCountType]:
+        try:
+            if not report_id and not (start_date and end_date):
+                raise Exception("report_id or start_date and end_date are required")
+            counts = await dmarc_stats.count_by_country(start_date, end_date, report_id)
+            return [CountryCountType(**c.dict()) for c in counts]
+        except Exception as e:
+            raise Exception(f"Error retrieving country counts: {str(e)}")
+
 # Mutations
 @strawberry.type
 class Mutation:
@@ -217,9 +421,18 @@ class Mutation:
     async def create_dmarc_report(self, report: DMARCReportInput) -> str:
         try:
             new_report = DMARCReportModel(**report)
-            await new_report.create()
+            try:
+                await insert_report(new_report)
+            except DuplicateKeyError:
+                raise Exception("DMARC Report with this report_id already exists")
+            await index_reports([new_report])
             return "DMARC Report created successfully"
         except Exception as e:
             raise Exception(f"Error creating DMARC report: {str(e)}")
 
-schema = strawberry.Schema(query=Query, mutation=Mutation, config=StrawberryConfig(auto_camel_case=False))
\ No newline at end of file
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    config=StrawberryConfig(auto_camel_case=False),
+    extensions=graphql_extensions(),
+)
\ No newline at end of file
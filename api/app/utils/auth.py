@@ -1,4 +1,7 @@
 # auth.py
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Optional
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
@@ -27,3 +30,66 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def hash_api_key(api_key: str) -> bytes:
+    return hashlib.sha256(api_key.encode()).digest()
+
+
+# Keys are compared by digest, so the time of a lookup does not depend on how much of a key matches
+API_KEY_HASHES = frozenset(hash_api_key(api_key) for api_key in API_KEYS if api_key)
+
+
+def is_api_key(api_key: Optional[str]) -> bool:
+    return bool(api_key) and hash_api_key(api_key) in API_KEY_HASHES
+
+
+class PrincipalCache:
+    """
+    In-process LRU cache of the principal (a UserResponse) of each access token,
+    so authenticated requests do not decode the token and read the user every time.
+
+    An entry lives ttl seconds at most and never past the expiry of its token.
+    Entries of a user are dropped when the user document changes; other API
+    workers keep theirs until the ttl runs out.
+    """
+    def __init__(self, ttl: int = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, token: str):
+        entry = self.entries.get(token)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            del self.entries[token]
+            return None
+        self.entries.move_to_end(token)
+        return principal
+
+    def set(self, token: str, principal, token_expires_at: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        if self.ttl <= 0 or expires_at <= time.time():
+            return
+        self.entries[token] = (expires_at, principal)
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate_user(self, username: str, email: Optional[str] = None):
+        """
+        Drop the entries of a user, matched by username or email so a renamed user is found too.
+        """
+        stale = [
+            token for token, (_, principal) in self.entries.items()
+            if principal.username == username or (email is not None and principal.email == email)
+        ]
+        for token in stale:
+            del self.entries[token]
+
+
+principal_cache = PrincipalCache(CONFIG.AUTH_CACHE_TTL, CONFIG.AUTH_CACHE_MAX_ENTRIES)
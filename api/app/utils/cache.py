@@ -0,0 +1,266 @@
+# cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Request, Response, status
+from config import CONFIG
+from utils.serialization import dumps
+
+ALL_DATES = "*"
+
+
+class NoCacheBackend:
+    """
+    Backend used when the cache is disabled: nothing is stored, responses still get an ETag.
+    """
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        pass
+
+    async def get_generations(self, buckets: List[str]) -> List[int]:
+        return [0] * len(buckets)
+
+    async def bump_generations(self, buckets: Iterable[str]):
+        pass
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with a TTL per entry. Bucket generations are kept
+    apart from the entries so they are never evicted.
+
+    Generations are only bumped in the process that changed the data, so with
+    several API workers (or the backfill script) the other processes keep
+    serving stale responses until their TTL expires. Use the Redis backend then.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_generations(self, buckets: List[str]) -> List[int]:
+        return [self.generations.get(bucket, 0) for bucket in buckets]
+
+    async def bump_generations(self, buckets: Iterable[str]):
+        for bucket in buckets:
+            self.generations[bucket] = self.generations.get(bucket, 0) + 1
+
+
+class RedisCacheBackend:
+    """
+    Cache stored in Redis (or any server speaking its protocol), shared by every API worker.
+    Requires the optional redis package.
+    """
+    def __init__(self, url: str, prefix: str = "dmarc:cache:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def get_generations(self, buckets: List[str]) -> List[int]:
+        if not buckets:
+            return []
+        values = await self.client.mget([f"{self.prefix}gen:{bucket}" for bucket in buckets])
+        return [int(value or 0) for value in values]
+
+    async def bump_generations(self, buckets: Iterable[str]):
+        pipe = self.client.pipeline(transaction=False)
+        for bucket in buckets:
+            pipe.incr(f"{self.prefix}gen:{bucket}")
+        await pipe.execute()
+
+
+def _normalize_value(value: str) -> str:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def _day(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(value.year, value.month, value.day)
+
+
+class ResponseCache:
+    """
+    Cache of serialized responses, keyed by the request path and its normalized query parameters.
+
+    Every cached response depends on date buckets: one per UTC day of its date
+    range, or ALL_DATES when the range is open or longer than
+    RESPONSE_CACHE_MAX_BUCKET_DAYS. The generation of each bucket is part of the
+    key, so inserting a report only has to bump the generations of the days it
+    covers (and ALL_DATES) for the affected responses to be recomputed.
+    """
+    def __init__(self, backend, ttl: int = 300, max_bucket_days: int = 366):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_bucket_days = max_bucket_days
+
+    def date_buckets(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> List[str]:
+        """
+        Return the date buckets a response over [start_date, end_date] depends on.
+        """
+        if not start_date or not end_date:
+            return [ALL_DATES]
+        day, last = _day(start_date), _day(end_date)
+        if (last - day).days > self.max_bucket_days:
+            return [ALL_DATES]
+        buckets = []
+        while day <= last:
+            buckets.append(day.date().isoformat())
+            day += timedelta(days=1)
+        return buckets
+
+    def range_buckets(self, ranges: Iterable[Tuple[datetime, datetime]]) -> set:
+        """
+        Return the date buckets invalidated by changing data of the (begin, end) ranges.
+        A range longer than max_bucket_days cannot fall within a bucketed range, so
+        only ALL_DATES covers it.
+        """
+        buckets = {ALL_DATES}
+        for begin, end in ranges:
+            day, last = _day(begin), _day(end)
+            if (last - day).days > self.max_bucket_days:
+                continue
+            while day <= last:
+                buckets.add(day.date().isoformat())
+                day += timedelta(days=1)
+        return buckets
+
+    def report_buckets(self, reports: list) -> set:
+        """
+        Return the date buckets invalidated by inserting reports.
+        """
+        return self.range_buckets(
+            (report.report_metadata.date_range.begin, report.report_metadata.date_range.end) for report in reports
+        )
+
+    async def key(self, namespace: str, params: List[Tuple[str, str]], buckets: List[str]) -> str:
+        generations = await self.backend.get_generations(buckets)
+        raw = json.dumps([namespace, sorted(params), list(zip(buckets, generations))], separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def request_params(self, request: Request) -> List[Tuple[str, str]]:
+        """
+        Normalize query parameters: empty values dropped and dates converted to naive UTC ISO format.
+        """
+        return [(name, _normalize_value(value)) for name, value in request.query_params.multi_items() if value != ""]
+
+    def etag(self, body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def etag_matches(self, etag: str, if_none_match: str) -> bool:
+        """
+        Whether an If-None-Match header lists etag, so the client copy is still valid.
+        """
+        return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+    async def get(self, key: str) -> Optional[Tuple[str, dict, bytes]]:
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        meta, body = value.split(b"\n", 1)
+        meta = json.loads(meta)
+        return meta["etag"], meta["headers"], body
+
+    async def set(self, key: str, etag: str, headers: dict, body: bytes):
+        meta = json.dumps({"etag": etag, "headers": headers}).encode()
+        await self.backend.set(key, meta + b"\n" + body, self.ttl)
+
+    async def invalidate_reports(self, reports: list):
+        """
+        Invalidate the cached responses whose date range overlaps newly inserted reports.
+        """
+        if reports:
+            await self.backend.bump_generations(self.report_buckets(reports))
+
+    async def invalidate_ranges(self, ranges: Iterable[Tuple[datetime, datetime]]):
+        """
+        Invalidate the cached responses whose date range overlaps updated data, e.g.
+        the (begin, end) ranges of records changed by the GeoIP or reverse DNS enrichment.
+        """
+        ranges = list(ranges)
+        if ranges:
+            await self.backend.bump_generations(self.range_buckets(ranges))
+
+    async def cached_response(self, request: Request, buckets: List[str], compute: Callable[[dict], Awaitable]) -> Response:
+        """
+        Serve a GET endpoint from the cache, computing and storing it on a miss.
+
+        Args:
+            request (Request): The request; its path and query parameters form the key.
+            buckets (List[str]): The date buckets the response depends on (see date_buckets).
+            compute (Callable): Called with a dict of extra response headers to fill in; returns the content.
+                It may instead return a Response (e.g. a StreamingResponse), which is sent as is and not cached.
+
+        Returns:
+            Response: The JSON response with an ETag, or 304 when it matches If-None-Match.
+        """
+        key = await self.key(request.url.path, self.request_params(request), buckets)
+        cached = await self.get(key)
+        if cached:
+            etag, headers, body = cached
+        else:
+            headers = {}
+            content = await compute(headers)
+            if isinstance(content, Response):
+                return content
+            body = dumps(content)
+            etag = self.etag(body)
+            await self.set(key, etag, headers, body)
+
+        headers = {**headers, "ETag": etag, "Cache-Control": "private, no-cache"}
+        if self.etag_matches(etag, request.headers.get("if-none-match", "")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    Build the response cache configured by RESPONSE_CACHE_BACKEND ("memory", "redis" or "none").
+    """
+    if CONFIG.RESPONSE_CACHE_BACKEND == "none":
+        backend = NoCacheBackend()
+    elif CONFIG.RESPONSE_CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(CONFIG.REDIS_URL)
+    else:
+        backend = MemoryCacheBackend(CONFIG.RESPONSE_CACHE_MAX_ENTRIES)
+    return ResponseCache(backend, ttl=CONFIG.RESPONSE_CACHE_TTL, max_bucket_days=CONFIG.RESPONSE_CACHE_MAX_BUCKET_DAYS)
+
+
+response_cache = create_response_cache()
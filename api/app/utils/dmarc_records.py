@@ -0,0 +1,191 @@
+# dmarc_records.py
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import pymongo
+from pymongo.errors import BulkWriteError
+from models.dmarc_report import DMARCReportModel
+from models.dmarc_record import DMARCRecord
+from models.geoip import GeoIPInfo
+from utils.cache import response_cache
+from utils.geoip import geoip_resolver
+from utils.pagination import keyset_match, next_page, page_size
+from utils.report_storage import insert_documents, load_records
+
+BACKFILL_BATCH_SIZE = 200
+RECORD_SORT = [("begin", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+RECORD_FILTER_FIELDS = {
+    "source_ip": "source_ip",
+    "header_from": "header_from",
+    "envelope_from": "envelope_from",
+    "envelope_to": "envelope_to",
+    "domain": "domain",
+    "org_name": "org_name",
+    "disposition": "disposition",
+    "dkim": "dkim",
+    "spf": "spf",
+    "dkim_result": "auth_results.dkim.result",
+    "spf_result": "auth_results.spf.result",
+    "country_code": "geo.country_code",
+    "sender_org": "rdns.org",
+}
+
+
+def report_records(report: DMARCReportModel, geo: Optional[Dict[str, GeoIPInfo]] = None) -> List[DMARCRecord]:
+    """
+    Flatten the records of a stored report into DMARCRecord documents.
+
+    Args:
+        report (DMARCReportModel): The stored report.
+        geo (Optional[Dict[str, GeoIPInfo]]): GeoIP information per source IP (default is None).
+    """
+    geo = geo or {}
+    metadata = report.report_metadata
+    return [
+        DMARCRecord(
+            report=report.id,
+            record_index=index,
+            report_id=metadata.report_id,
+            org_name=metadata.org_name,
+            domain=report.policy_published.domain,
+            begin=metadata.date_range.begin,
+            end=metadata.date_range.end,
+            source_ip=record.row.source_ip,
+            count=record.row.count,
+            disposition=record.row.policy_evaluated.disposition,
+            dkim=record.row.policy_evaluated.dkim,
+            spf=record.row.policy_evaluated.spf,
+            header_from=record.identifiers.header_from,
+            envelope_from=record.identifiers.envelope_from,
+            envelope_to=record.identifiers.envelope_to,
+            auth_results=record.auth_results,
+            geo=geo.get(record.row.source_ip),
+        )
+        for index, record in enumerate(report.record)
+    ]
+
+
+async def store_records(reports: List[DMARCReportModel]) -> int:
+    """
+    Write the flattened records of newly inserted reports to the dmarc_record collection.
+
+    Source IPs are resolved with GeoIP once per batch. Records that are already
+    stored (same report and position) are skipped, so this is safe to run again
+    for the same reports.
+
+    Returns:
+        int: The number of records written.
+    """
+    geo = geoip_resolver.lookup_many(record.row.source_ip for report in reports for record in report.record)
+    records = [record for report in reports for record in report_records(report, geo)]
+    if not records:
+        return 0
+    try:
+        await insert_documents(records, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return len(records) - len(errors)
+    return len(records)
+
+
+async def backfill_records() -> int:
+    """
+    Write the flattened records of every stored report that is missing from dmarc_record.
+
+    Returns:
+        int: The number of records written.
+    """
+    written = 0
+    batch = []
+    async for report in DMARCReportModel.find_all():
+        batch.append(report)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            written += await store_records(await load_records(batch))
+            batch = []
+    if batch:
+        written += await store_records(await load_records(batch))
+    return written
+
+
+async def record_date_ranges(query: dict) -> Set[Tuple[datetime, datetime]]:
+    """
+    Return the distinct (begin, end) date ranges of the records matching query,
+    read before updating them to invalidate the cached responses they appear in.
+    """
+    cursor = DMARCRecord.get_motor_collection().find(query, {"_id": 0, "begin": 1, "end": 1})
+    return {(document["begin"], document["end"]) async for document in cursor}
+
+
+async def backfill_geoip() -> int:
+    """
+    Resolve the source IPs of stored records that have no GeoIP information yet.
+
+    Returns:
+        int: The number of records updated.
+    """
+    if not geoip_resolver.enabled:
+        return 0
+    collection = DMARCRecord.get_motor_collection()
+    ips = await collection.distinct("source_ip", {"geo": None})
+    updated = 0
+    ranges = set()
+    for ip, info in geoip_resolver.lookup_many(ips).items():
+        if info is None:
+            continue
+        query = {"source_ip": ip, "geo": None}
+        ranges |= await record_date_ranges(query)
+        result = await collection.update_many(query, {"$set": {"geo": info.dict()}})
+        updated += result.modified_count
+    if updated:
+        await response_cache.invalidate_ranges(ranges)
+    return updated
+
+
+def records_query(
+    filters: Dict[str, Optional[str]],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Build the dmarc_record filter from exact-match record filters, a date range and a cursor.
+
+    Raises:
+        ValueError: If a filter is unknown or the cursor is malformed.
+    """
+    query = {}
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in RECORD_FILTER_FIELDS:
+            raise ValueError(f"Unknown record filter: {name}")
+        query[RECORD_FILTER_FIELDS[name]] = value
+    if start_date:
+        query["begin"] = {"$gte": start_date}
+    if end_date:
+        query["end"] = {"$lte": end_date}
+    if cursor:
+        query.update(keyset_match(cursor, "begin"))
+    return query
+
+
+async def find_records_page(
+    filters: Dict[str, Optional[str]],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[DMARCRecord], Optional[str]]:
+    """
+    Fetch one page of flattened records ordered by (begin, _id).
+
+    Returns:
+        tuple: The records of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If a filter is unknown or the cursor is malformed.
+    """
+    size = page_size(limit)
+    records = await DMARCRecord.find(records_query(filters, start_date, end_date, cursor)).sort(RECORD_SORT).limit(size + 1).to_list()
+    return next_page(records, size, lambda r: r.begin, lambda r: r.id)
@@ -0,0 +1,137 @@
+# dmarc_rollup.py
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from models.dmarc_report import DMARCReportModel
+from models.dmarc_rollup import DMARCDailyRollup, ROLLUP_KEY_FIELDS
+from utils.report_storage import unwind_records
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def report_day(value: datetime) -> datetime:
+    """
+    Truncate a report date to its UTC day, as stored in the rollup collection.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(value.year, value.month, value.day)
+
+
+def report_buckets(report: DMARCReportModel) -> Dict[Tuple, int]:
+    """
+    Sum the message count of a report's records per rollup key.
+
+    Returns:
+        dict: A mapping of rollup key tuples (in ROLLUP_KEY_FIELDS order) to message counts.
+    """
+    day = report_day(report.report_metadata.date_range.begin)
+    domain = report.policy_published.domain
+    buckets = defaultdict(int)
+    for record in report.record:
+        policy = record.row.policy_evaluated
+        key = (day, domain, record.row.source_ip, record.identifiers.header_from,
+               policy.disposition, policy.dkim, policy.spf)
+        buckets[key] += record.row.count
+    return buckets
+
+
+async def rollup_reports(reports: List[DMARCReportModel]):
+    """
+    Add the counts of newly inserted reports to the daily rollup collection
+    with a single bulk write.
+
+    Args:
+        reports (List[DMARCReportModel]): The reports that were just inserted.
+    """
+    buckets = defaultdict(int)
+    for report in reports:
+        for key, count in report_buckets(report).items():
+            buckets[key] += count
+    operations = [
+        UpdateOne(dict(zip(ROLLUP_KEY_FIELDS, key)), {"$inc": {"count": count}}, upsert=True)
+        for key, count in buckets.items()
+    ]
+    if operations:
+        await DMARCDailyRollup.get_motor_collection().bulk_write(operations, ordered=False)
+
+
+def rebuild_pipeline(match: Optional[dict] = None) -> list:
+    """
+    Build the pipeline that recomputes every rollup bucket from the raw reports,
+    or only from the reports matching match.
+    """
+    return [
+        *([{"$match": match}] if match else []),
+        {"$project": {"report_metadata.date_range.begin": 1, "policy_published.domain": 1, "record.row": 1, "record.identifiers": 1}},
+        *unwind_records(["row", "identifiers"]),
+        {"$group": {
+            "_id": {
+                "day": {"$dateTrunc": {"date": "$report_metadata.date_range.begin", "unit": "day"}},
+                "domain": "$policy_published.domain",
+                "source_ip": "$record.row.source_ip",
+                "header_from": "$record.identifiers.header_from",
+                "disposition": "$record.row.policy_evaluated.disposition",
+                "dkim": "$record.row.policy_evaluated.dkim",
+                "spf": "$record.row.policy_evaluated.spf",
+            },
+            "count": {"$sum": "$record.row.count"},
+        }},
+        {"$replaceWith": {"$mergeObjects": ["$_id", {"count": "$count"}]}},
+    ]
+
+
+async def rebuild_rollup() -> int:
+    """
+    Drop and recompute the daily rollup collection from the raw DMARC reports.
+
+    Reports ingested while the rebuild runs may be counted twice or not at
+    all, so run it while ingest is stopped.
+
+    Returns:
+        int: The number of rollup buckets written.
+    """
+    collection = DMARCDailyRollup.get_motor_collection()
+    await collection.delete_many({})
+
+    written = 0
+    batch = []
+    async for bucket in DMARCReportModel.get_motor_collection().aggregate(rebuild_pipeline(), allowDiskUse=True):
+        batch.append(bucket)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        written += len(batch)
+    return written
+
+
+async def rebuild_report_buckets(reports: List[DMARCReportModel]) -> int:
+    """
+    Recompute the rollup buckets of the days and domains of reports from the raw
+    reports. Unlike rollup_reports this can run again for the same reports, e.g.
+    when it is unknown whether their counts were already added.
+
+    Like rebuild_rollup, reports of those days ingested while it runs may be
+    counted twice or not at all.
+
+    Returns:
+        int: The number of rollup buckets written.
+    """
+    collection = DMARCDailyRollup.get_motor_collection()
+    keys = {(report_day(report.report_metadata.date_range.begin), report.policy_published.domain) for report in reports}
+    written = 0
+    for day, domain in keys:
+        match = {
+            "report_metadata.date_range.begin": {"$gte": day, "$lt": day + timedelta(days=1)},
+            "policy_published.domain": domain,
+        }
+        buckets = await DMARCReportModel.get_motor_collection().aggregate(rebuild_pipeline(match)).to_list(length=None)
+        await collection.delete_many({"day": day, "domain": domain})
+        if buckets:
+            await collection.insert_many(buckets, ordered=False)
+            written += len(buckets)
+    return written
@@ -0,0 +1,180 @@
+# dmarc_stats.py
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from models.dmarc_rollup import DMARCDailyRollup
+from models.dmarc_record import DMARCRecord
+from models.dmarc_stats import SourceIPCount, IdentifierCount, PolicyResultCount, DailyCount, CountryCount
+
+IDENTIFIER_FIELDS = ("header_from", "envelope_from", "envelope_to")
+ROLLUP_IDENTIFIER_FIELDS = ("header_from",)
+
+
+def utc_day(value: datetime) -> datetime:
+    """
+    Truncate a date to the start of its UTC day, as a naive datetime like the rollup keys.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_range(start_date: datetime, end_date: datetime) -> Tuple[datetime, datetime]:
+    """
+    The bounds of the statistics over [start_date, end_date), with day granularity:
+    reports count when the UTC day they begin is on or after the day of start_date
+    and before end_date. Both bounds are returned as UTC midnights, so they select
+    the same reports when compared with the rollup days or with report begin dates.
+    """
+    start, end = utc_day(start_date), utc_day(end_date)
+    if end_date.tzinfo is not None:
+        end_date = end_date.astimezone(timezone.utc).replace(tzinfo=None)
+    if end < end_date:
+        end += timedelta(days=1)
+    return start, end
+
+
+def rollup_match(start_date: datetime, end_date: datetime) -> dict:
+    """
+    Build the $match stage for pipelines over the daily rollup collection, whose
+    buckets are keyed by the UTC day the report begins (see day_range). The end of
+    the reports is not compared with end_date.
+    """
+    start, end = day_range(start_date, end_date)
+    return {"$match": {"day": {"$gte": start, "$lt": end}}}
+
+
+def _group_rollup_by_field(start_date: datetime, end_date: datetime, field: str, name: str, limit: Optional[int] = None) -> list:
+    pipeline = [
+        rollup_match(start_date, end_date),
+        {"$group": {"_id": f"${field}", "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"_id": 0, name: "$_id", "count": 1}})
+    return pipeline
+
+
+def rollup_source_ip_pipeline(start_date: datetime, end_date: datetime, limit: Optional[int] = None) -> list:
+    return _group_rollup_by_field(start_date, end_date, "source_ip", "source_ip", limit)
+
+
+def rollup_identifier_pipeline(start_date: datetime, end_date: datetime, field: str, limit: Optional[int] = None) -> list:
+    if field not in ROLLUP_IDENTIFIER_FIELDS:
+        raise ValueError(f"field must be one of {', '.join(ROLLUP_IDENTIFIER_FIELDS)}")
+    return _group_rollup_by_field(start_date, end_date, field, "identifier", limit)
+
+
+def rollup_policy_result_pipeline(start_date: datetime, end_date: datetime) -> list:
+    return [
+        rollup_match(start_date, end_date),
+        {"$group": {
+            "_id": {"disposition": "$disposition", "dkim": "$dkim", "spf": "$spf"},
+            "count": {"$sum": "$count"},
+        }},
+        {"$sort": {"count": -1}},
+        {"$project": {"_id": 0, "disposition": "$_id.disposition", "dkim": "$_id.dkim", "spf": "$_id.spf", "count": 1}},
+    ]
+
+
+def rollup_daily_pipeline(start_date: datetime, end_date: datetime) -> list:
+    return [
+        rollup_match(start_date, end_date),
+        {"$group": {
+            "_id": {"day": "$day", "disposition": "$disposition", "dkim": "$dkim", "spf": "$spf"},
+            "count": {"$sum": "$count"},
+        }},
+        {"$sort": {"_id.day": 1}},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id.day",
+            "disposition": "$_id.disposition",
+            "dkim": "$_id.dkim",
+            "spf": "$_id.spf",
+            "count": 1,
+        }},
+    ]
+
+
+def records_match(start_date: datetime, end_date: datetime) -> dict:
+    """
+    Build the $match stage for pipelines over the dmarc_record collection: records of
+    reports that begin on or after start_date and end on or before end_date, the
+    bounds of the date range listing.
+    """
+    return {"$match": {"begin": {"$gte": start_date}, "end": {"$lte": end_date}}}
+
+
+def records_identifier_pipeline(start_date: datetime, end_date: datetime, field: str, limit: Optional[int] = None) -> list:
+    if field not in IDENTIFIER_FIELDS:
+        raise ValueError(f"field must be one of {', '.join(IDENTIFIER_FIELDS)}")
+    start, end = day_range(start_date, end_date)
+    pipeline = [
+        # Same reports as rollup_match, so every identifier field counts the same range
+        {"$match": {"begin": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": f"${field}", "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"_id": 0, "identifier": "$_id", "count": 1}})
+    return pipeline
+
+
+def records_country_pipeline(match: dict) -> list:
+    """
+    Sum the message count per source IP country over the dmarc_record collection.
+    """
+    return [
+        match,
+        {"$group": {
+            "_id": "$geo.country_code",
+            "country": {"$first": "$geo.country"},
+            "count": {"$sum": "$count"},
+        }},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$project": {"_id": 0, "country_code": "$_id", "country": 1, "count": 1}},
+    ]
+
+
+async def _aggregate_rollup(pipeline: list) -> List[dict]:
+    return await DMARCDailyRollup.aggregate(pipeline).to_list()
+
+
+async def _aggregate_records(pipeline: list) -> List[dict]:
+    return await DMARCRecord.aggregate(pipeline).to_list()
+
+
+async def count_by_source_ip(start_date: datetime, end_date: datetime, limit: Optional[int] = None) -> List[SourceIPCount]:
+    rows = await _aggregate_rollup(rollup_source_ip_pipeline(start_date, end_date, limit))
+    return [SourceIPCount(**row) for row in rows]
+
+
+async def count_by_identifier(start_date: datetime, end_date: datetime, field: str, limit: Optional[int] = None) -> List[IdentifierCount]:
+    if field in ROLLUP_IDENTIFIER_FIELDS:
+        rows = await _aggregate_rollup(rollup_identifier_pipeline(start_date, end_date, field, limit))
+    else:
+        rows = await _aggregate_records(records_identifier_pipeline(start_date, end_date, field, limit))
+    return [IdentifierCount(**row) for row in rows]
+
+
+async def count_by_policy_result(start_date: datetime, end_date: datetime) -> List[PolicyResultCount]:
+    rows = await _aggregate_rollup(rollup_policy_result_pipeline(start_date, end_date))
+    return [PolicyResultCount(**row) for row in rows]
+
+
+async def count_by_day(start_date: datetime, end_date: datetime) -> List[DailyCount]:
+    rows = await _aggregate_rollup(rollup_daily_pipeline(start_date, end_date))
+    return [DailyCount(**row) for row in rows]
+
+
+async def count_by_country(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, report_id: Optional[str] = None) -> List[CountryCount]:
+    """
+    Sum the message count per source IP country, either within a date range or for a single report.
+    """
+    if report_id:
+        match = {"$match": {"report_id": report_id}}
+    else:
+        match = records_match(start_date, end_date)
+    rows = await _aggregate_records(records_country_pipeline(match))
+    return [CountryCount(**row) for row in rows]
@@ -0,0 +1,136 @@
+# export.py
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from models.dmarc_report import DMARCReportModel
+from utils.pagination import PAGE_SORT, reports_query
+from utils.report_storage import unwind_records
+
+EXPORT_FIELDS = (
+    "org_name",
+    "email",
+    "report_id",
+    "begin",
+    "end",
+    "domain",
+    "source_ip",
+    "count",
+    "disposition",
+    "dkim",
+    "spf",
+    "header_from",
+    "envelope_from",
+    "envelope_to",
+)
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def export_pipeline(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> list:
+    """
+    Build the pipeline that flattens every record into one row with its report metadata.
+    """
+    return [
+        {"$match": reports_query(start_date, end_date)},
+        {"$sort": dict(PAGE_SORT)},
+        {"$project": {
+            "report_metadata.org_name": 1,
+            "report_metadata.email": 1,
+            "report_metadata.report_id": 1,
+            "report_metadata.date_range": 1,
+            "policy_published.domain": 1,
+            "record.row": 1,
+            "record.identifiers": 1,
+        }},
+        *unwind_records(["row", "identifiers"]),
+        {"$project": {
+            "_id": 0,
+            "org_name": "$report_metadata.org_name",
+            "email": "$report_metadata.email",
+            "report_id": "$report_metadata.report_id",
+            "begin": "$report_metadata.date_range.begin",
+            "end": "$report_metadata.date_range.end",
+            "domain": "$policy_published.domain",
+            "source_ip": "$record.row.source_ip",
+            "count": "$record.row.count",
+            "disposition": "$record.row.policy_evaluated.disposition",
+            "dkim": "$record.row.policy_evaluated.dkim",
+            "spf": "$record.row.policy_evaluated.spf",
+            "header_from": "$record.identifiers.header_from",
+            "envelope_from": "$record.identifiers.envelope_from",
+            "envelope_to": "$record.identifiers.envelope_to",
+        }},
+    ]
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_export_batches(start_date: Optional[datetime], end_date: Optional[datetime], batch_size: int) -> AsyncIterator[list]:
+    """
+    Iterate the flattened record rows in lists of at most batch_size, as the cursor fetches them.
+    """
+    cursor = DMARCReportModel.get_motor_collection().aggregate(
+        export_pipeline(start_date, end_date), batchSize=batch_size, allowDiskUse=True
+    )
+    batch = []
+    async for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps({field: _export_value(row.get(field)) for field in EXPORT_FIELDS}) + "\n" for row in batch
+        ).encode()
+
+
+async def iter_csv(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for batch in batches:
+        writer.writerows([_export_value(row.get(field)) for field in EXPORT_FIELDS] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compress a byte stream into a single gzip member without buffering it.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(start_date: Optional[datetime], end_date: Optional[datetime], export_format: str, compress: bool, batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Build the byte stream of an export.
+
+    Args:
+        start_date (Optional[datetime]): Only reports that begin on or after this date.
+        end_date (Optional[datetime]): Only reports that end on or before this date.
+        export_format (str): "ndjson" or "csv".
+        compress (bool): Gzip the stream.
+        batch_size (int): Number of rows fetched from MongoDB and written per chunk.
+    """
+    batches = iter_export_batches(start_date, end_date, batch_size)
+    stream = iter_csv(batches) if export_format == "csv" else iter_ndjson(batches)
+    return gzip_stream(stream) if compress else stream
@@ -0,0 +1,58 @@
+# geoip.py
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+import maxminddb
+from config import CONFIG
+from models.geoip import GeoIPInfo
+
+
+class GeoIPResolver:
+    """
+    Resolve IP addresses to country and ASN from local MaxMind DB (mmdb) files,
+    such as GeoLite2-Country and GeoLite2-ASN. Results are kept in an LRU cache.
+    Without a database file, lookups return no information.
+    """
+    def __init__(self, country_db: str = "", asn_db: str = "", cache_size: int = 65536):
+        self.country_reader = maxminddb.open_database(country_db) if country_db else None
+        self.asn_reader = maxminddb.open_database(asn_db) if asn_db else None
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.country_reader or self.asn_reader)
+
+    def _get(self, reader, ip: str) -> dict:
+        if reader is None:
+            return {}
+        try:
+            return reader.get(ip) or {}
+        except ValueError:
+            # Not an IP address
+            return {}
+
+    def _lookup(self, ip: str) -> Optional[GeoIPInfo]:
+        country_record = self._get(self.country_reader, ip)
+        asn_record = self._get(self.asn_reader, ip)
+        if not country_record and not asn_record:
+            return None
+        country = country_record.get("country") or country_record.get("registered_country") or {}
+        return GeoIPInfo(
+            country_code=country.get("iso_code"),
+            country=(country.get("names") or {}).get("en"),
+            asn=asn_record.get("autonomous_system_number"),
+            as_org=asn_record.get("autonomous_system_organization"),
+        )
+
+    def lookup_many(self, ips: Iterable[str]) -> Dict[str, Optional[GeoIPInfo]]:
+        """
+        Resolve a batch of IP addresses, looking each distinct address up once.
+
+        Returns:
+            dict: A mapping of IP address to its GeoIPInfo (None when unknown).
+        """
+        if not self.enabled:
+            return {}
+        return {ip: self.lookup(ip) for ip in set(ips) if ip}
+
+
+geoip_resolver = GeoIPResolver(CONFIG.GEOIP_COUNTRY_DB, CONFIG.GEOIP_ASN_DB, CONFIG.GEOIP_CACHE_SIZE)
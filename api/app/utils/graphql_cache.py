@@ -0,0 +1,172 @@
+# graphql_cache.py
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from graphql import DocumentNode, FieldNode, GraphQLError, OperationDefinitionNode, OperationType, parse, print_ast
+from graphql.utilities import value_from_ast_untyped
+from utils.cache import ALL_DATES, ResponseCache, response_cache
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+async def read_body(receive) -> bytes:
+    """
+    Read the whole body of an ASGI HTTP request.
+    """
+    body, more_body = b"", True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+def replay_body(body: bytes, receive):
+    """
+    Build an ASGI receive callable returning an already read body, then the following messages.
+    """
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay_receive
+
+
+@lru_cache(maxsize=256)
+def _parse_query(query: str) -> Tuple[DocumentNode, str]:
+    # Dashboards send the same few queries over and over
+    document = parse(query)
+    return document, print_ast(document)
+
+
+def graphql_cache_params(cache: ResponseCache, body: bytes) -> Optional[Tuple[list, List[str]]]:
+    """
+    Build the cache key parameters and date buckets of a GraphQL request.
+
+    The query is normalized by re-printing its AST. Each top-level field with
+    start_date and end_date arguments (literals or variables) depends on the
+    buckets of that range; any other field depends on ALL_DATES.
+
+    Returns:
+        tuple: The key parameters and the date buckets, or None when the request must
+        not be cached (mutations, subscriptions and invalid requests).
+    """
+    try:
+        payload = json.loads(body)
+        document, normalized_query = _parse_query(payload["query"])
+    except (ValueError, KeyError, TypeError, GraphQLError):
+        return None
+    variables = payload.get("variables") or {}
+
+    buckets = set()
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        if definition.operation != OperationType.QUERY:
+            return None
+        for selection in definition.selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                buckets.add(ALL_DATES)
+                continue
+            if selection.name.value.startswith("__"):
+                continue
+            arguments = {
+                argument.name.value: value_from_ast_untyped(argument.value, variables)
+                for argument in selection.arguments or ()
+            }
+            start_date, end_date = _parse_date(arguments.get("start_date")), _parse_date(arguments.get("end_date"))
+            buckets.update(cache.date_buckets(start_date, end_date))
+
+    params = [
+        ("query", normalized_query),
+        ("variables", json.dumps(variables, sort_keys=True)),
+        ("operationName", payload.get("operationName") or ""),
+    ]
+    return params, sorted(buckets)
+
+
+class GraphQLCacheMiddleware:
+    """
+    ASGI middleware caching the responses of GraphQL queries sent with POST.
+
+    Uses the same cache and date bucket invalidation as the REST endpoints.
+    Responses containing errors are not stored. Cached responses carry an ETag and
+    are answered with 304 when it matches If-None-Match.
+    """
+    def __init__(self, app, path: str = "/api/graphql", cache: ResponseCache = response_cache):
+        self.app = app
+        self.path = path
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        replay_receive = replay_body(body, receive)
+        cache_params = graphql_cache_params(self.cache, body)
+        if cache_params is None:
+            await self.app(scope, replay_receive, send)
+            return
+
+        key = await self.cache.key("graphql", *cache_params)
+        cached = await self.cache.get(key)
+        if cached:
+            etag, headers, cached_body = cached
+            if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+            if self.cache.etag_matches(etag, if_none_match):
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(b"etag", etag.encode())],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(cached_body)).encode()),
+                    (b"etag", etag.encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": cached_body})
+            return
+
+        response_status = None
+        chunks = []
+
+        async def capture_send(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+
+        if response_status != 200:
+            return
+        response_body = b"".join(chunks)
+        try:
+            if json.loads(response_body).get("errors"):
+                return
+        except ValueError:
+            return
+        await self.cache.set(key, self.cache.etag(response_body), {}, response_body)
@@ -0,0 +1,109 @@
+# graphql_limits.py
+from typing import Optional
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+)
+from graphql.validation import ValidationRule
+from strawberry.extensions import (
+    AddValidationRules,
+    MaxAliasesLimiter,
+    MaxTokensLimiter,
+    ParserCache,
+    QueryDepthLimiter,
+    ValidationCache,
+)
+from config import CONFIG
+
+
+class QueryComplexityRule(ValidationRule):
+    """
+    Reject operations whose estimated cost exceeds GRAPHQL_MAX_COMPLEXITY.
+
+    Every selected field costs 1, times the number of items it can return. A field
+    with a limit argument returns at most that many items (MAX_PAGE_SIZE when it is
+    a variable or missing, as variables are not known during validation); on a page
+    type the limit applies to its item list. Other lists are estimated at
+    GRAPHQL_LIST_SIZE items.
+    """
+    def enter_operation_definition(self, node: OperationDefinitionNode, *_):
+        schema = self.context.schema
+        root = schema.mutation_type if node.operation == OperationType.MUTATION else schema.query_type
+        if root is None:
+            return
+        complexity = self._cost(node.selection_set, root, None)
+        if complexity > CONFIG.GRAPHQL_MAX_COMPLEXITY:
+            self.report_error(GraphQLError(
+                f"Query complexity of {complexity} exceeds the maximum of {CONFIG.GRAPHQL_MAX_COMPLEXITY}", node
+            ))
+
+    def _limit(self, node: FieldNode, field) -> Optional[int]:
+        if "limit" not in field.args:
+            return None
+        limit = None
+        for argument in node.arguments or ():
+            if argument.name.value == "limit" and isinstance(argument.value, IntValueNode):
+                limit = int(argument.value.value)
+        if limit is None and isinstance(field.args["limit"].default_value, int):
+            limit = field.args["limit"].default_value
+        if limit is None or limit <= 0:
+            return CONFIG.MAX_PAGE_SIZE
+        return min(limit, CONFIG.MAX_PAGE_SIZE)
+
+    def _cost(self, selection_set: Optional[SelectionSetNode], parent_type, size: Optional[int]) -> int:
+        if selection_set is None:
+            return 0
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = self.context.get_fragment(selection.name.value)
+                if fragment:
+                    fragment_type = self.context.schema.get_type(fragment.type_condition.name.value)
+                    cost += self._cost(fragment.selection_set, fragment_type, size)
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.context.schema.get_type(selection.type_condition.name.value)
+                cost += self._cost(selection.selection_set, fragment_type, size)
+                continue
+            field = getattr(parent_type, "fields", {}).get(selection.name.value)
+            if field is None:
+                # Introspection and unknown fields, the latter are reported by the standard rules
+                continue
+            is_list = is_list_type(get_nullable_type(field.type))
+            limit = self._limit(selection, field)
+            multiplier, child_size = 1, None
+            if limit is not None and is_list:
+                multiplier = limit
+            elif limit is not None:
+                child_size = limit
+            elif is_list:
+                multiplier = size or CONFIG.GRAPHQL_LIST_SIZE
+            cost += multiplier * (1 + self._cost(selection.selection_set, get_named_type(field.type), child_size))
+        return cost
+
+
+def graphql_extensions() -> list:
+    """
+    Build the schema extensions bounding the work of a single operation (depth,
+    aliases, tokens and complexity) and caching the parsing and validation of
+    repeated query documents, such as persisted queries.
+    """
+    return [
+        MaxTokensLimiter(max_token_count=CONFIG.GRAPHQL_MAX_TOKENS),
+        ParserCache(maxsize=CONFIG.GRAPHQL_DOCUMENT_CACHE_SIZE),
+        QueryDepthLimiter(max_depth=CONFIG.GRAPHQL_MAX_DEPTH),
+        MaxAliasesLimiter(max_alias_count=CONFIG.GRAPHQL_MAX_ALIASES),
+        AddValidationRules([QueryComplexityRule]),
+        ValidationCache(maxsize=CONFIG.GRAPHQL_DOCUMENT_CACHE_SIZE),
+    ]
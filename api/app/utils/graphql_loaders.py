@@ -0,0 +1,62 @@
+# graphql_loaders.py
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from strawberry.dataloader import DataLoader
+from models.dmarc_report import DMARCReportModel
+from utils.report_storage import load_record_documents, with_record_chunks
+
+ReportKey = Tuple[Any, Tuple[Tuple[str, int], ...]]
+
+
+def report_key(value, projection: dict) -> ReportKey:
+    """
+    Build the key of a report_loader lookup: the looked up value and a hashable projection.
+    """
+    return value, tuple(sorted(projection.items()))
+
+
+def _get_path(document: dict, path: str):
+    for name in path.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(name)
+    return document
+
+
+def report_loader(field: str) -> DataLoader:
+    """
+    Build a DataLoader of raw report documents by the value of a field, e.g. "_id"
+    or "report_metadata.report_id".
+
+    Every lookup of a resolver pass (aliased root fields, the parent report of each
+    record of a page...) is answered by one $in query per distinct projection,
+    plus one query for the records of chunked reports. Loaders cache their
+    results, so they must be created for each request.
+    """
+    async def load(keys: List[ReportKey]) -> List[Optional[dict]]:
+        values_by_projection = defaultdict(set)
+        for value, projection in keys:
+            values_by_projection[projection].add(value)
+
+        found: Dict[ReportKey, dict] = {}
+        for projection, values in values_by_projection.items():
+            query_projection = with_record_chunks({**dict(projection), field: 1})
+            documents = await DMARCReportModel.get_motor_collection().find(
+                {field: {"$in": list(values)}}, query_projection
+            ).to_list(length=None)
+            await load_record_documents(documents, query_projection)
+            for document in documents:
+                found.setdefault((_get_path(document, field), projection), document)
+        return [found.get(key) for key in keys]
+
+    return DataLoader(load_fn=load)
+
+
+async def get_context() -> dict:
+    """
+    Build the GraphQL context of a request, with its own DataLoaders.
+    """
+    return {
+        "report_by_id_loader": report_loader("_id"),
+        "report_by_report_id_loader": report_loader("report_metadata.report_id"),
+    }
@@ -0,0 +1,124 @@
+# graphql_persisted.py
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional
+from config import CONFIG
+from utils.graphql_cache import read_body, replay_body
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class PersistedQueryStore:
+    """
+    Queries known by the sha256 hash of their text.
+
+    Queries of the JSON file at path (a list of queries, or an object of name to
+    query) are always known; this is where the dashboard's fixed queries go.
+    Clients may register others, following the automatic persisted queries
+    protocol, and the max_entries most recently used of those are kept.
+    """
+    def __init__(self, path: str = "", max_entries: int = 1000, allow_registration: bool = True):
+        self.max_entries = max_entries
+        self.allow_registration = allow_registration
+        self.registered: OrderedDict = OrderedDict()
+        self.static = {}
+        if path:
+            with open(path) as file:
+                queries = json.load(file)
+            if isinstance(queries, dict):
+                queries = queries.values()
+            self.static = {query_hash(query): query for query in queries}
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        query = self.static.get(sha256_hash)
+        if query is None:
+            query = self.registered.get(sha256_hash)
+            if query is not None:
+                self.registered.move_to_end(sha256_hash)
+        return query
+
+    def register(self, sha256_hash: str, query: str) -> bool:
+        """
+        Register a query sent along with its hash.
+
+        Returns:
+            bool: False if the hash does not match the query.
+        """
+        if query_hash(query) != sha256_hash:
+            return False
+        if sha256_hash in self.static or not self.allow_registration:
+            return True
+        self.registered[sha256_hash] = query
+        self.registered.move_to_end(sha256_hash)
+        while len(self.registered) > self.max_entries:
+            self.registered.popitem(last=False)
+        return True
+
+
+def _error(message: str, code: str) -> bytes:
+    return json.dumps({"errors": [{"message": message, "extensions": {"code": code}}]}).encode()
+
+
+class PersistedQueryMiddleware:
+    """
+    ASGI middleware resolving GraphQL requests sent with POST as
+    {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": ...}}} instead of a query.
+
+    The query text is put back in the body before GraphQLCacheMiddleware and the
+    GraphQL app see it, so persisted queries share their response cache and the
+    parsing and validation caches of the schema. An unknown hash is answered with
+    PERSISTED_QUERY_NOT_FOUND, after which clients resend the hash with the query.
+    """
+    def __init__(self, app, path: str = "/api/graphql", store: Optional[PersistedQueryStore] = None):
+        self.app = app
+        self.path = path
+        self.store = store or persisted_queries
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        try:
+            payload = json.loads(body)
+            sha256_hash = payload["extensions"]["persistedQuery"]["sha256Hash"]
+        except (ValueError, KeyError, TypeError):
+            await self.app(scope, replay_body(body, receive), send)
+            return
+
+        query = payload.get("query")
+        if query:
+            if not isinstance(query, str) or not self.store.register(sha256_hash, query):
+                await self._respond(send, _error("provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH"))
+                return
+        else:
+            query = self.store.get(sha256_hash)
+            if query is None:
+                await self._respond(send, _error("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"))
+                return
+            payload["query"] = query
+            body = json.dumps(payload).encode()
+
+        await self.app(scope, replay_body(body, receive), send)
+
+    async def _respond(self, send, body: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+persisted_queries = PersistedQueryStore(
+    CONFIG.GRAPHQL_PERSISTED_QUERIES,
+    CONFIG.GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES,
+    CONFIG.GRAPHQL_PERSISTED_QUERIES_REGISTRATION,
+)
@@ -0,0 +1,69 @@
+# ingest.py
+import logging
+from typing import List
+from pymongo.errors import PyMongoError
+from models.dmarc_report import DMARCReportModel
+from utils.cache import response_cache
+from utils.dmarc_records import store_records
+from utils.dmarc_rollup import rebuild_report_buckets, rollup_reports
+from utils.rdns import enrichment_worker
+from utils.report_storage import load_records
+
+PENDING_BATCH_SIZE = 200
+
+logger = logging.getLogger(__name__)
+
+
+async def _finish_indexing(reports: List[DMARCReportModel]):
+    await store_records(reports)
+    await response_cache.invalidate_reports(reports)
+    enrichment_worker.submit({record.row.source_ip for report in reports for record in report.record})
+    await DMARCReportModel.get_motor_collection().update_many(
+        {"_id": {"$in": [report.id for report in reports]}}, {"$unset": {"pending_index": ""}}
+    )
+    for report in reports:
+        report.pending_index = None
+
+
+async def index_reports(reports: List[DMARCReportModel]):
+    """
+    Update everything derived from newly inserted reports: the daily rollup, the
+    dmarc_record collection and the cached responses covering their dates. Their
+    source IPs are then queued for reverse DNS enrichment in the background.
+
+    The reports are stored at this point, so a database error is logged instead
+    of raised (a retry of the request would only find them already existing).
+    They stay marked pending_index until index_pending_reports finishes them.
+    Other exceptions are bugs and propagate.
+
+    Args:
+        reports (List[DMARCReportModel]): The reports that were just inserted.
+    """
+    if not reports:
+        return
+    try:
+        await rollup_reports(reports)
+        await _finish_indexing(reports)
+    except PyMongoError:
+        logger.exception("Error indexing %d reports, left pending", len(reports))
+
+
+async def index_pending_reports() -> int:
+    """
+    Finish indexing the reports still marked pending_index. As their rollup
+    counts may have been added before the failure, the rollup buckets of their
+    days are recomputed from the raw reports rather than incremented; the other
+    writes can safely run again. Run it while ingest is stopped, like rebuild_rollup.
+
+    Returns:
+        int: The number of reports indexed.
+    """
+    indexed = 0
+    while True:
+        reports = await DMARCReportModel.find({"pending_index": True}).limit(PENDING_BATCH_SIZE).to_list()
+        if not reports:
+            return indexed
+        reports = await load_records(reports)
+        await rebuild_report_buckets(reports)
+        await _finish_indexing(reports)
+        indexed += len(reports)
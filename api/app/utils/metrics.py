@@ -0,0 +1,102 @@
+# metrics.py
+import threading
+import time
+from prometheus_client import Counter, Histogram
+from pymongo import monitoring
+
+REQUEST_LATENCY = Histogram(
+    "dmarc_api_request_duration_seconds",
+    "Time until the response of an HTTP request started, by route.",
+    ["method", "route", "status"],
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "dmarc_api_mongo_command_duration_seconds",
+    "Round trip time of MongoDB commands, by command and collection.",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "dmarc_api_mongo_command_failures",
+    "MongoDB commands that returned an error, by command and collection.",
+    ["command", "collection"],
+)
+
+
+def route_name(scope) -> str:
+    """
+    The path template of the route that handled a request (e.g. /api/v1/aggregated_report/{id}),
+    so metrics are not labelled with every report id. Unmatched requests share one label.
+    """
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "endpoint")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request in REQUEST_LATENCY.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                REQUEST_LATENCY.labels(scope["method"], route_name(scope), str(status)).observe(time.perf_counter() - start)
+
+        async def metrics_send(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, metrics_send)
+        except Exception:
+            record(500)
+            raise
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    PyMongo command listener timing every command sent by the API's client.
+    Motor runs the driver in threads, so pending commands are kept under a lock.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.collections = {}
+
+    def _pop_collection(self, event) -> str:
+        with self.lock:
+            return self.collections.pop((event.connection_id, event.request_id), "")
+
+    def started(self, event):
+        # getMore names its collection apart from the cursor id
+        field = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(field)
+        with self.lock:
+            self.collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,171 @@
+# pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from beanie import PydanticObjectId
+import pymongo
+from config import CONFIG
+from models.dmarc_report import DMARCReportModel
+from utils.report_storage import load_records, load_record_documents, with_record_chunks
+
+SORT_FIELD = "report_metadata.date_range.begin"
+# Read raw report documents as Beanie would serialize them
+RAW_PROJECTION = {"revision_id": 0}
+PAGE_SORT = [(SORT_FIELD, pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+
+
+def page_size(limit: Optional[int]) -> int:
+    """
+    Clamp a requested page size to [1, MAX_PAGE_SIZE]. No limit means MAX_PAGE_SIZE.
+    """
+    if limit is None:
+        return CONFIG.MAX_PAGE_SIZE
+    return max(1, min(limit, CONFIG.MAX_PAGE_SIZE))
+
+
+def encode_cursor(begin: datetime, report_id) -> str:
+    """
+    Build the opaque cursor pointing after a report, from its date_range.begin and _id.
+    """
+    raw = json.dumps({"b": begin.isoformat(), "i": str(report_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    """
+    Decode a cursor built by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["b"]), PydanticObjectId(data["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_match(cursor: str, sort_field: str = SORT_FIELD) -> dict:
+    """
+    Build the filter that selects documents sorted after the cursor on (sort_field, _id).
+    """
+    begin, document_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {sort_field: {"$gt": begin}},
+            {sort_field: begin, "_id": {"$gt": document_id}},
+        ]
+    }
+
+
+def reports_query(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, cursor: Optional[str] = None) -> dict:
+    """
+    Build the report filter for a page: an optional date range plus the keyset condition.
+    """
+    conditions = []
+    if start_date:
+        conditions.append({SORT_FIELD: {"$gte": start_date}})
+    if end_date:
+        conditions.append({"report_metadata.date_range.end": {"$lte": end_date}})
+    if cursor:
+        conditions.append(keyset_match(cursor))
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def next_page(items: list, size: int, begin_of, id_of) -> Tuple[list, Optional[str]]:
+    """
+    Trim a result fetched with limit size + 1 to the page and build the next cursor.
+    """
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    return items, encode_cursor(begin_of(items[-1]), id_of(items[-1]))
+
+
+async def find_reports_page(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    projection_model=None,
+) -> Tuple[list, Optional[str]]:
+    """
+    Fetch one page of reports ordered by (date_range.begin, _id).
+
+    Every page is an index range scan on the date_range_begin_id index, so its
+    cost does not grow with how far the client has paged.
+
+    Args:
+        projection_model: A Beanie projection model (e.g. DMARCReportSummary) to fetch instead of full reports.
+
+    Returns:
+        tuple: The reports of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    size = page_size(limit)
+    query = DMARCReportModel.find(reports_query(start_date, end_date, cursor)).sort(PAGE_SORT).limit(size + 1)
+    if projection_model:
+        query = query.project(projection_model)
+    reports, next_cursor = next_page(await query.to_list(), size, lambda r: r.report_metadata.date_range.begin, lambda r: r.id)
+    if not projection_model:
+        await load_records(reports)
+    return reports, next_cursor
+
+
+async def find_projected_reports_page(
+    projection: dict,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of raw report documents holding only the projected paths.
+    The sort key is always fetched so the next cursor can be built.
+
+    Returns:
+        tuple: The documents of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    size = page_size(limit)
+    projection = with_record_chunks({**projection, SORT_FIELD: 1})
+    documents = await DMARCReportModel.get_motor_collection().find(
+        reports_query(start_date, end_date, cursor), projection
+    ).sort(PAGE_SORT).limit(size + 1).to_list(length=None)
+    documents, next_cursor = next_page(documents, size, lambda d: d["report_metadata"]["date_range"]["begin"], lambda d: d["_id"])
+    return await load_record_documents(documents, projection), next_cursor
+
+
+async def find_raw_reports_page(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of full reports as raw Motor documents, with the records of
+    chunked reports reassembled. They are meant to be serialized with
+    utils.serialization.dumps, skipping model validation.
+
+    Returns:
+        tuple: The documents of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    size = page_size(limit)
+    documents = await DMARCReportModel.get_motor_collection().find(
+        reports_query(start_date, end_date, cursor), RAW_PROJECTION
+    ).sort(PAGE_SORT).limit(size + 1).to_list(length=None)
+    documents, next_cursor = next_page(documents, size, lambda d: d["report_metadata"]["date_range"]["begin"], lambda d: d["_id"])
+    return await load_record_documents(documents, {"record": 1}), next_cursor
@@ -0,0 +1,65 @@
+# profiling.py
+import cProfile
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a sample of HTTP requests and writing one profile per
+    request to a directory, to find where the time of slow routes goes under load.
+
+    profiler is "cprofile" (a .prof file, for pstats or snakeviz) or "pyinstrument"
+    (an .html report, requires the optional pyinstrument package). cProfile sees
+    every coroutine running on the event loop meanwhile, so its profiles of
+    concurrent requests overlap; pyinstrument follows the request's own task.
+    """
+    def __init__(self, app, profiler: str = "cprofile", sample_rate: float = 0.01, directory: str = "profiles"):
+        if profiler not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        if profiler == "pyinstrument":
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise RuntimeError("PROFILER=pyinstrument requires the pyinstrument package (pip install pyinstrument)")
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, scope, extension: str) -> str:
+        route = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return os.path.join(self.directory, f"{timestamp}-{scope['method']}-{route}.{extension}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.stop()
+                with open(self._path(scope, "html"), "w") as f:
+                    f.write(profiler.output_html())
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            path = self._path(scope, "prof")
+            profiler.dump_stats(path)
+            print(f"Profiled {scope['method']} {scope['path']} in {time.perf_counter() - start:.3f}s: {path}")
@@ -0,0 +1,86 @@
+# projection.py
+from typing import List, Optional
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+
+
+def selection_paths(selections: list, prefix: str = "") -> List[str]:
+    """
+    Flatten GraphQL selections into the dotted document paths of their leaf fields.
+    Fragments are expanded in place and the top-level id field maps to _id.
+    """
+    paths = []
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            paths.extend(selection_paths(selection.selections, prefix))
+            continue
+        if selection.name.startswith("__"):
+            continue
+        name = "_id" if not prefix and selection.name == "id" else selection.name
+        if selection.selections:
+            paths.extend(selection_paths(selection.selections, f"{prefix}{name}."))
+        else:
+            paths.append(f"{prefix}{name}")
+    return paths
+
+
+def _find_field(selections: list, name: str):
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            found = _find_field(selection.selections, name)
+            if found:
+                return found
+        elif selection.name == name:
+            return selection
+    return None
+
+
+def selected_projection(info: Info, field: Optional[str] = None) -> dict:
+    """
+    Build a MongoDB projection from the fields selected in the current resolver.
+
+    Args:
+        info (Info): The resolver info.
+        field (Optional[str]): Read the selection of this child field instead (e.g. "items" of a page type).
+
+    Returns:
+        dict: The projection, e.g. {"record.row.source_ip": 1, "record.row.count": 1}.
+    """
+    selections = info.selected_fields[0].selections
+    if field:
+        child = _find_field(selections, field)
+        selections = child.selections if child else []
+    projection = {path: 1 for path in selection_paths(selections)}
+    return projection or {"_id": 1}
+
+
+def _wrap(value):
+    if isinstance(value, dict):
+        return ProjectedDocument(value)
+    if isinstance(value, list):
+        return [_wrap(item) for item in value]
+    return value
+
+
+class ProjectedDocument:
+    """
+    Attribute access over a partially projected MongoDB document, so the default
+    Strawberry resolvers can read it. Paths that were not projected resolve to None.
+    """
+    __slots__ = ("_document",)
+
+    def __init__(self, document: dict):
+        self._document = document
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            # Protocol lookups such as __await__ must not find a field
+            raise AttributeError(name)
+        if name == "id":
+            value = self._document.get("_id")
+            return str(value) if value is not None else None
+        return _wrap(self._document.get(name))
+
+
+def project_documents(documents: List[dict]) -> List[ProjectedDocument]:
+    return [ProjectedDocument(document) for document in documents]
@@ -0,0 +1,307 @@
+# rdns.py
+import asyncio
+import ipaddress
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import PyMongoError
+from config import CONFIG
+from models.dmarc_record import DMARCRecord
+from models.ip_enrichment import IPEnrichment, ReverseDNSInfo
+from utils.cache import response_cache
+from utils.dmarc_records import record_date_ranges
+from utils.geoip import geoip_resolver
+
+STATUS_OK = "ok"
+STATUS_NO_PTR = "no_ptr"
+STATUS_ERROR = "error"
+BACKFILL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class DNSLookupError(Exception):
+    """
+    A lookup that failed without an answer (timeout, SERVFAIL, refused...), as opposed to a name that does not exist.
+    """
+
+
+class AbstractDNSResolver(ABC):
+    """
+    Abstract class for the DNS lookups used by the enrichment stage.
+    """
+
+    @abstractmethod
+    async def reverse(self, ip: str) -> Optional[str]:
+        """
+        Resolve the PTR name of an IP address.
+
+        Returns:
+            str: The name without the trailing dot, or None when the address has no PTR record.
+
+        Raises:
+            DNSLookupError: If the lookup failed.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def forward(self, name: str) -> List[str]:
+        """
+        Resolve the A and AAAA addresses of a name.
+
+        Returns:
+            List[str]: The addresses, empty when the name does not exist.
+
+        Raises:
+            DNSLookupError: If the lookup failed.
+        """
+        raise NotImplementedError
+
+
+class DNSPythonResolver(AbstractDNSResolver):
+    """
+    Asynchronous resolver based on dnspython. Uses the system configuration unless
+    nameservers are given, which also lets tests point it at a local stub server.
+    """
+    def __init__(self, nameservers: Optional[List[str]] = None, port: int = 53, timeout: float = 3.0):
+        self.resolver = dns.asyncresolver.Resolver(configure=not nameservers)
+        if nameservers:
+            self.resolver.nameservers = nameservers
+            self.resolver.port = port
+        self.resolver.lifetime = timeout
+
+    async def reverse(self, ip: str) -> Optional[str]:
+        try:
+            answer = await self.resolver.resolve_address(ip)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return None
+        except (dns.exception.DNSException, ValueError) as e:
+            raise DNSLookupError(str(e) or type(e).__name__)
+        return answer[0].target.to_text().rstrip(".").lower()
+
+    async def forward(self, name: str) -> List[str]:
+        addresses = []
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = await self.resolver.resolve(name, rdtype)
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                continue
+            except dns.exception.DNSException as e:
+                raise DNSLookupError(str(e) or type(e).__name__)
+            addresses.extend(rdata.address for rdata in answer)
+        return addresses
+
+
+def _same_address(ip: str, addresses: List[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+        return any(ipaddress.ip_address(other) == address for other in addresses)
+    except ValueError:
+        return False
+
+
+class IPEnricher:
+    """
+    Resolve the PTR name (optionally forward-confirmed) and the owning organization
+    of source IPs, and store them in the ip_enrichment collection and on every
+    dmarc_record of the address.
+
+    ip_enrichment is a persistent cache: an address is resolved again only once its
+    entry expires, after ttl seconds for a PTR name and negative_ttl seconds when
+    there is none or the lookup failed. At most concurrency lookups run at once.
+    The organization is the ASN organization from the GeoIP database, when configured.
+    """
+    def __init__(
+        self,
+        resolver: AbstractDNSResolver,
+        concurrency: int = 20,
+        ttl: int = 604800,
+        negative_ttl: int = 3600,
+        forward_confirm: bool = True,
+        timeout: float = 5.0,
+    ):
+        self.resolver = resolver
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.forward_confirm = forward_confirm
+        self.timeout = timeout
+
+    async def _lookup(self, ip: str) -> ReverseDNSInfo:
+        ptr = await asyncio.wait_for(self.resolver.reverse(ip), self.timeout)
+        forward_confirmed = None
+        if ptr and self.forward_confirm:
+            addresses = await asyncio.wait_for(self.resolver.forward(ptr), self.timeout)
+            forward_confirmed = _same_address(ip, addresses)
+        return ReverseDNSInfo(ptr=ptr, forward_confirmed=forward_confirmed)
+
+    async def resolve(self, ip: str) -> IPEnrichment:
+        """
+        Resolve one address, without reading or writing the cache.
+        """
+        async with self.semaphore:
+            try:
+                rdns = await self._lookup(ip)
+                status = STATUS_OK if rdns.ptr else STATUS_NO_PTR
+            except (DNSLookupError, asyncio.TimeoutError):
+                rdns, status = ReverseDNSInfo(), STATUS_ERROR
+        geo = geoip_resolver.lookup(ip) if geoip_resolver.enabled else None
+        rdns.org = geo.as_org if geo else None
+        now = datetime.now(timezone.utc)
+        ttl = self.ttl if status == STATUS_OK else self.negative_ttl
+        return IPEnrichment(ip=ip, rdns=rdns, status=status, resolved_at=now, expires_at=now + timedelta(seconds=ttl))
+
+    async def enrich(self, ips: Iterable[str]) -> Dict[str, IPEnrichment]:
+        """
+        Enrich a batch of source IPs, resolving only the ones without a live cache entry.
+
+        Records are only written when their information changes: those of freshly
+        resolved IPs when it differs from the stored one, and those of cached IPs
+        when they have none yet (records ingested since the entry was resolved). The
+        cached responses covering the dates of changed records are invalidated.
+        Failed lookups are only cached, for negative_ttl, and never written to records.
+
+        Returns:
+            dict: A mapping of IP address to its IPEnrichment.
+        """
+        ips = {ip for ip in ips if ip}
+        if not ips:
+            return {}
+        cached = await IPEnrichment.find({"ip": {"$in": list(ips)}, "expires_at": {"$gt": datetime.now(timezone.utc)}}).to_list()
+        entries = {entry.ip: entry for entry in cached}
+        resolved = await asyncio.gather(*(self.resolve(ip) for ip in ips - entries.keys()))
+
+        if resolved:
+            await IPEnrichment.get_motor_collection().bulk_write(
+                [
+                    UpdateOne({"ip": entry.ip}, {"$set": entry.dict(exclude={"id", "revision_id"})}, upsert=True)
+                    for entry in resolved
+                ],
+                ordered=False,
+            )
+        # A failed lookup says nothing about the address: records keep their previous
+        # information and, when they have none, backfill_rdns retries them later
+        updates = [
+            ({"source_ip": ip, "rdns": None}, entry.rdns.dict())
+            for ip, entry in entries.items() if entry.status != STATUS_ERROR
+        ]
+        updates.extend(
+            ({"source_ip": entry.ip, "rdns": {"$ne": entry.rdns.dict()}}, entry.rdns.dict())
+            for entry in resolved if entry.status != STATUS_ERROR
+        )
+        entries.update((entry.ip, entry) for entry in resolved)
+        if not updates:
+            return entries
+        ranges = await record_date_ranges({"$or": [query for query, _ in updates]})
+        result = await DMARCRecord.get_motor_collection().bulk_write(
+            [UpdateMany(query, {"$set": {"rdns": rdns}}) for query, rdns in updates],
+            ordered=False,
+        )
+        if result.modified_count:
+            await response_cache.invalidate_ranges(ranges)
+        return entries
+
+
+class EnrichmentWorker:
+    """
+    Background task running the enrichment stage after ingest, so inserting reports
+    never waits on DNS. Addresses are queued, deduplicated while pending and
+    enriched in batches. When the queue is full new addresses are dropped; the
+    backfill_records script picks them up later. Database errors are logged and
+    the worker goes on; any other exception is a bug, logged as it stops the worker.
+    """
+    def __init__(self, batch_size: int = 100, queue_size: int = 10000):
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.enricher: Optional[IPEnricher] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: Set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self, enricher: IPEnricher):
+        self.enricher = enricher
+        self.queue = asyncio.Queue(self.queue_size)
+        self.task = asyncio.create_task(self.run())
+        self.task.add_done_callback(self._log_crash)
+
+    def _log_crash(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Reverse DNS worker stopped", exc_info=task.exception())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Already logged when the worker stopped
+            pass
+        self.task = None
+
+    def submit(self, ips: Iterable[str]):
+        """
+        Queue source IPs for enrichment. Does nothing when the worker is not running.
+        """
+        if self.task is None:
+            return
+        for ip in ips:
+            if not ip or ip in self.pending:
+                continue
+            try:
+                self.queue.put_nowait(ip)
+            except asyncio.QueueFull:
+                logger.warning("Reverse DNS queue is full, dropping new source IPs")
+                return
+            self.pending.add(ip)
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.enricher.enrich(batch)
+            except PyMongoError:
+                # The records keep rdns None, so backfill_rdns retries them
+                logger.exception("Error storing the enrichment of %d source IPs", len(batch))
+            finally:
+                self.pending.difference_update(batch)
+
+
+def create_enricher() -> IPEnricher:
+    """
+    Build the enricher configured by the RDNS_* and DNS_* settings.
+    """
+    resolver = DNSPythonResolver(CONFIG.DNS_NAMESERVERS, CONFIG.DNS_PORT, CONFIG.DNS_TIMEOUT)
+    return IPEnricher(
+        resolver,
+        concurrency=CONFIG.RDNS_CONCURRENCY,
+        ttl=CONFIG.RDNS_TTL,
+        negative_ttl=CONFIG.RDNS_NEGATIVE_TTL,
+        forward_confirm=CONFIG.RDNS_FORWARD_CONFIRM,
+        timeout=CONFIG.DNS_TIMEOUT * 2,
+    )
+
+
+async def backfill_rdns(enricher: IPEnricher) -> int:
+    """
+    Enrich the source IPs of stored records that have no reverse DNS information yet.
+
+    Returns:
+        int: The number of source IPs enriched.
+    """
+    ips = await DMARCRecord.get_motor_collection().distinct("source_ip", {"rdns": None})
+    for start in range(0, len(ips), BACKFILL_BATCH_SIZE):
+        await enricher.enrich(ips[start:start + BACKFILL_BATCH_SIZE])
+    return len(ips)
+
+
+enrichment_worker = EnrichmentWorker(CONFIG.RDNS_BATCH_SIZE, CONFIG.RDNS_QUEUE_SIZE)
@@ -0,0 +1,222 @@
+# report_storage.py
+from typing import AsyncIterator, List, Tuple
+from beanie import Document, PydanticObjectId
+import pymongo
+from config import CONFIG
+from models.dmarc_report import DMARCReportModel, RecordTotals, RecordType
+from models.dmarc_report_chunk import DMARCReportChunk
+from utils.serialization import dumps
+
+CHUNK_SORT = [("report", pymongo.ASCENDING), ("index", pymongo.ASCENDING)]
+
+
+def to_document(model: Document) -> dict:
+    """
+    Build the MongoDB document of a validated model with pydantic's own serializer.
+    Beanie's encoder walks the whole model again in Python, which dominated
+    ingest time on large reports.
+    """
+    document = model.dict(by_alias=True, exclude={"id", "revision_id"})
+    if model.id is not None:
+        document["_id"] = model.id
+    return document
+
+
+async def insert_document(model: Document):
+    """
+    Insert a validated model without Beanie's encoder and set its id.
+
+    Raises:
+        DuplicateKeyError: If the document violates a unique index.
+    """
+    result = await model.get_motor_collection().insert_one(to_document(model))
+    model.id = result.inserted_id
+
+
+async def insert_documents(models: List[Document], ordered: bool = True):
+    """
+    Insert validated models of one collection without Beanie's encoder and set their ids.
+
+    Raises:
+        BulkWriteError: If some documents could not be inserted; the others are, when ordered is False.
+    """
+    if not models:
+        return
+    documents = [to_document(model) for model in models]
+    try:
+        await models[0].get_motor_collection().insert_many(documents, ordered=ordered)
+    finally:
+        # The driver assigns the _id of every document before sending them
+        for model, document in zip(models, documents):
+            model.id = document.get("_id")
+
+
+def needs_chunks(report: DMARCReportModel) -> bool:
+    """
+    Whether a report holds too many records to be stored in a single document.
+    """
+    return len(report.record) > CONFIG.REPORT_CHUNK_SIZE
+
+
+def record_totals(records: List[RecordType]) -> RecordTotals:
+    """
+    Compute the totals of DMARCReportSummary in Python, for the header of a chunked report.
+    """
+    def count_where(field: str, value: str) -> int:
+        return sum(r.row.count for r in records if getattr(r.row.policy_evaluated, field) == value)
+
+    messages = sum(r.row.count for r in records)
+    return RecordTotals(
+        record_count=len(records),
+        message_count=messages,
+        dkim_pass=count_where("dkim", "pass"),
+        dkim_fail=messages - count_where("dkim", "pass"),
+        spf_pass=count_where("spf", "pass"),
+        spf_fail=messages - count_where("spf", "pass"),
+        disposition_none=count_where("disposition", "none"),
+        disposition_quarantine=count_where("disposition", "quarantine"),
+        disposition_reject=count_where("disposition", "reject"),
+    )
+
+
+def split_report(report: DMARCReportModel) -> Tuple[DMARCReportModel, List[DMARCReportChunk]]:
+    """
+    Split a report into a header document, with an empty record list and the
+    record totals, and numbered chunks of at most REPORT_CHUNK_SIZE records.
+    The header id is assigned here so the chunks can reference it.
+    """
+    size = CONFIG.REPORT_CHUNK_SIZE
+    chunks = [report.record[start:start + size] for start in range(0, len(report.record), size)]
+    header = DMARCReportModel(
+        version=report.version,
+        report_metadata=report.report_metadata,
+        policy_published=report.policy_published,
+        record=[],
+        record_chunks=len(chunks),
+        record_totals=record_totals(report.record),
+        pending_index=report.pending_index,
+    )
+    header.id = PydanticObjectId()
+    return header, [DMARCReportChunk(report=header.id, index=index, record=records) for index, records in enumerate(chunks)]
+
+
+async def insert_report(report: DMARCReportModel) -> DMARCReportModel:
+    """
+    Insert a report, as a header plus record chunks when it holds more than
+    REPORT_CHUNK_SIZE records.
+
+    Chunks are written before the header, so readers never find a header whose
+    chunks are missing; they are removed again if the header cannot be inserted.
+    The report is marked pending_index until index_reports has run.
+
+    Returns:
+        DMARCReportModel: The report with its id set and all of its records, ready for index_reports.
+
+    Raises:
+        DuplicateKeyError: If a report with the same org_name and report_id already exists.
+    """
+    report.pending_index = True
+    if not needs_chunks(report):
+        await insert_document(report)
+        return report
+    header, chunks = split_report(report)
+    try:
+        await insert_documents(chunks)
+        await insert_document(header)
+    except Exception:
+        await DMARCReportChunk.get_motor_collection().delete_many({"report": header.id})
+        raise
+    report.id = header.id
+    report.record_chunks = header.record_chunks
+    report.record_totals = header.record_totals
+    return report
+
+
+async def load_records(reports: List[DMARCReportModel]) -> List[DMARCReportModel]:
+    """
+    Reassemble the records of the chunked reports in a list, with one query for all of them.
+    """
+    chunked = {report.id: report for report in reports if report.record_chunks}
+    if not chunked:
+        return reports
+    for report in chunked.values():
+        report.record = []
+    async for chunk in DMARCReportChunk.find({"report": {"$in": list(chunked)}}).sort(CHUNK_SORT):
+        chunked[chunk.report].record.extend(chunk.record)
+    return reports
+
+
+async def iter_report_json(document: dict) -> AsyncIterator[bytes]:
+    """
+    Stream a raw report document as the same JSON object as its regular response,
+    reading and writing its records one chunk at a time.
+    """
+    header = dumps({name: value for name, value in document.items() if name != "record"})
+    yield header[:-1] + b',"record":['
+    separator = b""
+    async for chunk in DMARCReportChunk.get_motor_collection().find({"report": document["_id"]}, {"record": 1}).sort(CHUNK_SORT):
+        if chunk.get("record"):
+            yield separator + dumps(chunk["record"])[1:-1]
+            separator = b","
+    yield b"]}"
+
+
+def _record_paths(projection: dict) -> dict:
+    return {path: 1 for path in projection if path == "record" or path.startswith("record.")}
+
+
+def with_record_chunks(projection: dict) -> dict:
+    """
+    Add record_chunks to a projection selecting records, so load_record_documents can tell chunked reports apart.
+    """
+    if _record_paths(projection):
+        return {**projection, "record_chunks": 1}
+    return projection
+
+
+async def load_record_documents(documents: List[dict], projection: dict) -> List[dict]:
+    """
+    Reassemble the records of chunked raw report documents, fetching only the record
+    paths of the projection. Nothing is read when no record path was selected.
+    """
+    record_paths = _record_paths(projection)
+    chunked = {document["_id"]: document for document in documents if document.get("record_chunks")}
+    if not record_paths or not chunked:
+        return documents
+    for document in chunked.values():
+        document["record"] = []
+    async for chunk in DMARCReportChunk.get_motor_collection().find(
+        {"report": {"$in": list(chunked)}}, {"report": 1, **record_paths}
+    ).sort(CHUNK_SORT):
+        chunked[chunk["report"]]["record"].extend(chunk.get("record", []))
+    return documents
+
+
+def unwind_records(record_paths: List[str]) -> list:
+    """
+    Build the stages replacing {"$unwind": "$record"} in pipelines over dmarc_report,
+    so they see the records of both layouts. The stages before must keep _id.
+
+    Each report is joined with its chunks (an index lookup; none are found for
+    regular reports), and unwinding the join right after the $lookup keeps every
+    intermediate document below the 16 MB limit.
+
+    Args:
+        record_paths (List[str]): The record paths used by the rest of the pipeline, e.g. ["row", "identifiers"].
+    """
+    return [
+        {"$lookup": {
+            "from": DMARCReportChunk.Settings.collection,
+            "localField": "_id",
+            "foreignField": "report",
+            "pipeline": [
+                {"$sort": {"index": 1}},
+                {"$project": {"_id": 0, **{f"record.{path}": 1 for path in record_paths}}},
+            ],
+            "as": "record_chunk",
+        }},
+        {"$unwind": {"path": "$record_chunk", "preserveNullAndEmptyArrays": True}},
+        {"$set": {"record": {"$ifNull": ["$record_chunk.record", "$record"]}}},
+        {"$unset": "record_chunk"},
+        {"$unwind": "$record"},
+    ]
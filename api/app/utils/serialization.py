@@ -0,0 +1,24 @@
+# serialization.py
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return jsonable_encoder(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize a response body with orjson.
+
+    Raw Motor documents are written directly (ObjectIds as strings, datetimes in
+    ISO format), skipping model validation and jsonable_encoder; pydantic models
+    still go through jsonable_encoder.
+    """
+    return orjson.dumps(content, default=_default)
@@ -0,0 +1,11 @@
+import os
+import sys
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("API_KEYS", "test")
+os.environ.setdefault("RDNS_ENABLED", "false")
+os.environ.setdefault("GEOIP_COUNTRY_DB", "")
+os.environ.setdefault("GEOIP_ASN_DB", "")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
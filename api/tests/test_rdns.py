@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime
+from beanie import PydanticObjectId, init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from models.dmarc_record import DMARCRecord
+from models.ip_enrichment import IPEnrichment
+from utils.cache import ALL_DATES, response_cache
+from utils.rdns import (
+    AbstractDNSResolver, DNSLookupError, IPEnricher, STATUS_ERROR, STATUS_NO_PTR, STATUS_OK, backfill_rdns,
+)
+
+
+
+async def init_models():
+    await init_beanie(AsyncMongoMockClient().test, document_models=[DMARCRecord, IPEnrichment])
+
+
+class StubResolver(AbstractDNSResolver):
+    """
+    Resolver answering from fixed PTR and address tables, counting the lookups.
+    """
+    def __init__(self, ptrs: dict, addresses: dict, failing=()):
+        self.ptrs = ptrs
+        self.addresses = addresses
+        self.failing = set(failing)
+        self.lookups = []
+
+    async def reverse(self, ip):
+        self.lookups.append(ip)
+        if ip in self.failing:
+            raise DNSLookupError("SERVFAIL")
+        return self.ptrs.get(ip)
+
+    async def forward(self, name):
+        return self.addresses.get(name, [])
+
+
+def run(coroutine):
+    async def with_models():
+        await init_models()
+        return await coroutine
+    return asyncio.run(with_models())
+
+
+def stub_resolver():
+    return StubResolver(
+        ptrs={"192.0.2.1": "mail.example.com", "192.0.2.2": "spoofed.example.net"},
+        addresses={"mail.example.com": ["192.0.2.1"], "spoofed.example.net": ["198.51.100.7"]},
+        failing={"192.0.2.9"},
+    )
+
+
+def test_resolve_forward_confirms_ptr():
+    enricher = IPEnricher(stub_resolver(), ttl=100, negative_ttl=10)
+
+    confirmed = run(enricher.resolve("192.0.2.1"))
+    assert confirmed.status == STATUS_OK
+    assert confirmed.rdns.ptr == "mail.example.com"
+    assert confirmed.rdns.forward_confirmed is True
+    assert (confirmed.expires_at - confirmed.resolved_at).total_seconds() == 100
+
+    spoofed = run(enricher.resolve("192.0.2.2"))
+    assert spoofed.status == STATUS_OK
+    assert spoofed.rdns.forward_confirmed is False
+
+
+def test_resolve_without_ptr_or_with_failed_lookup():
+    enricher = IPEnricher(stub_resolver(), ttl=100, negative_ttl=10)
+
+    missing = run(enricher.resolve("192.0.2.3"))
+    assert missing.status == STATUS_NO_PTR
+    assert missing.rdns.ptr is None
+    assert missing.rdns.forward_confirmed is None
+    assert (missing.expires_at - missing.resolved_at).total_seconds() == 10
+
+    failed = run(enricher.resolve("192.0.2.9"))
+    assert failed.status == STATUS_ERROR
+    assert failed.rdns.ptr is None
+
+
+def record(ip, rdns=None):
+    return {
+        "report": PydanticObjectId(), "record_index": 0, "report_id": "r1", "org_name": "example.org",
+        "begin": datetime(2024, 1, 1), "end": datetime(2024, 1, 2), "source_ip": ip, "count": 1, "rdns": rdns,
+    }
+
+
+async def expire_cache():
+    await IPEnrichment.get_motor_collection().update_many({}, {"$set": {"expires_at": datetime(2000, 1, 1)}})
+
+
+def test_enrich_uses_cache_and_updates_records():
+    async def scenario():
+        await init_models()
+        records = DMARCRecord.get_motor_collection()
+        await records.insert_many([record("192.0.2.1"), record("192.0.2.3")])
+        resolver = stub_resolver()
+        enricher = IPEnricher(resolver)
+
+        generations = await response_cache.backend.get_generations(["2024-01-01", "2024-01-03", ALL_DATES])
+        entries = await enricher.enrich(["192.0.2.1", "192.0.2.3"])
+        assert sorted(resolver.lookups) == ["192.0.2.1", "192.0.2.3"]
+        assert entries["192.0.2.1"].rdns.ptr == "mail.example.com"
+        stored = await records.find_one({"source_ip": "192.0.2.1"})
+        assert stored["rdns"]["ptr"] == "mail.example.com"
+        # The cached responses over the dates of the updated records are invalidated
+        after = await response_cache.backend.get_generations(["2024-01-01", "2024-01-03", ALL_DATES])
+        assert after[0] > generations[0] and after[1] == generations[1] and after[2] > generations[2]
+
+        # Live cache entries are not resolved again, but records ingested since get them
+        await records.insert_one(record("192.0.2.1"))
+        await enricher.enrich(["192.0.2.1"])
+        assert len(resolver.lookups) == 2
+        assert await records.count_documents({"source_ip": "192.0.2.1", "rdns.ptr": "mail.example.com"}) == 2
+
+        # Once the entry expires the address is resolved again and changed names are stored
+        await expire_cache()
+        resolver.ptrs["192.0.2.1"] = "mx.example.com"
+        resolver.addresses["mx.example.com"] = ["192.0.2.1"]
+        await enricher.enrich(["192.0.2.1"])
+        assert len(resolver.lookups) == 3
+        assert await records.count_documents({"source_ip": "192.0.2.1", "rdns.ptr": "mx.example.com"}) == 2
+
+    asyncio.run(scenario())
+
+
+def test_enrich_keeps_records_on_failed_lookup():
+    async def scenario():
+        await init_models()
+        records = DMARCRecord.get_motor_collection()
+        await records.insert_many([record("192.0.2.1"), record("192.0.2.9")])
+        resolver = stub_resolver()
+        enricher = IPEnricher(resolver, negative_ttl=10)
+        await enricher.enrich(["192.0.2.1"])
+
+        # A lookup failing after a successful one leaves the stored name in place
+        await expire_cache()
+        resolver.failing.add("192.0.2.1")
+        entries = await enricher.enrich(["192.0.2.1", "192.0.2.9"])
+        assert entries["192.0.2.1"].status == STATUS_ERROR
+        assert entries["192.0.2.9"].status == STATUS_ERROR
+        stored = await records.find_one({"source_ip": "192.0.2.1"})
+        assert stored["rdns"]["ptr"] == "mail.example.com"
+
+        # The error is cached with the negative TTL but never written to the records,
+        # so records without information are still picked up by the backfill
+        cached = await IPEnrichment.find_one({"ip": "192.0.2.9"})
+        assert cached.status == STATUS_ERROR
+        assert (cached.expires_at - cached.resolved_at).total_seconds() == 10
+        assert (await records.find_one({"source_ip": "192.0.2.9"}))["rdns"] is None
+        await records.insert_one(record("192.0.2.9"))
+        await enricher.enrich(["192.0.2.9"])
+        assert await records.count_documents({"source_ip": "192.0.2.9", "rdns": None}) == 2
+
+        await expire_cache()
+        resolver.failing.clear()
+        resolver.ptrs["192.0.2.9"] = "mail.example.com"
+        assert await backfill_rdns(enricher) == 1
+        assert await records.count_documents({"source_ip": "192.0.2.9", "rdns.ptr": "mail.example.com"}) == 2
+        assert (await records.find_one({"source_ip": "192.0.2.1"}))["rdns"]["ptr"] == "mail.example.com"
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+import argparse
+import gzip
+import os
+import tempfile
+import time
+from utils.bulk_dmarc_reports import parse_dmarc_reports_dir
+from utils.extract_gz import multiple_extract_gz
+
+RECORD_XML = """
+  <record>
+    <row>
+      <source_ip>10.0.{a}.{b}</source_ip>
+      <count>{count}</count>
+      <policy_evaluated><disposition>none</disposition><dkim>pass</dkim><spf>fail</spf></policy_evaluated>
+    </row>
+    <identifiers><envelope_from>example.com</envelope_from><header_from>example.com</header_from></identifiers>
+    <auth_results>
+      <dkim><domain>example.com</domain><selector>default</selector><result>pass</result></dkim>
+      <spf><domain>example.com</domain><result>fail</result></spf>
+    </auth_results>
+  </record>"""
+
+REPORT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<feedback>
+  <version>1.0</version>
+  <report_metadata>
+    <org_name>benchmark</org_name>
+    <email>dmarc@example.com</email>
+    <report_id>{report_id}</report_id>
+    <date_range><begin>1712620800</begin><end>1712707200</end></date_range>
+  </report_metadata>
+  <policy_published><domain>example.com</domain><adkim>r</adkim><aspf>r</aspf><p>none</p><pct>100</pct></policy_published>{records}
+</feedback>
+"""
+
+def write_reports(directory, files, records):
+    """
+    Write `files` gzip-compressed synthetic reports with `records` records each.
+    """
+    for n in range(files):
+        body = "".join(RECORD_XML.format(a=i // 256 % 256, b=i % 256, count=i % 7 + 1) for i in range(records))
+        with gzip.open(os.path.join(directory, f"report-{n}.xml.gz"), "wt") as f:
+            f.write(REPORT_XML.format(report_id=n, records=body))
+
+def run(directory, workers):
+    """
+    Decompress and parse every report in `directory`, returning (seconds, reports).
+    """
+    extracted_dir = tempfile.mkdtemp(dir=directory)
+    start = time.perf_counter()
+    multiple_extract_gz(directory, extracted_dir, workers=workers)
+    reports = parse_dmarc_reports_dir(extracted_dir, streaming=True, workers=workers)
+    return time.perf_counter() - start, reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare serial and parallel DMARC report parsing.")
+    parser.add_argument("--files", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'serial (s)':>12} {'parallel (s)':>14} {'speedup':>8}")
+    for files in args.files:
+        with tempfile.TemporaryDirectory() as directory:
+            write_reports(directory, files, args.records)
+            serial_time, serial_reports = run(directory, 1)
+            parallel_time, parallel_reports = run(directory, args.workers)
+            assert serial_reports == parallel_reports, "parallel output differs from serial output"
+            print(f"{files:>8} {serial_time:>12.2f} {parallel_time:>14.2f} {serial_time / parallel_time:>7.1f}x")
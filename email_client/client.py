@@ -4,16 +4,28 @@ import sys
 from dotenv import load_dotenv
 from email_clients.imapclient import IMAPClient
 from email_clients.gmailclient import GmailClient
-from utils.bulk_dmarc_reports import parse_dmarc_reports_dir
-from utils.extract_gz import multiple_extract_gz
-from requests import request
+from utils.bulk_dmarc_reports import iter_dmarc_reports_dir
+from utils.extract_gz import multiple_extract_gz, iter_xml_from_attachment, ATTACHMENT_TYPES
+from utils.xml_parser import dmarc_xml_to_dict
+from utils.settings import IngestSettings
+from utils.spool import settle_upload
+from utils.dedup import payload_key, report_key
+from utils.metrics import FAILURES, PARSE_SECONDS, REPORTS_SPOOLED, REPORTS_UPLOADED, UPLOAD_SECONDS, start_metrics_server
+from requests import request, RequestException
 import json
 
 
 client = None
+settings = IngestSettings()
+spool = None
+dedup = None
 attachment_dir = '.'
 extracted_dir = '.'
 parsed_dir = '.'
+archive_dir = None
+ingest_mode = 'disk'
+upload_batch_size = 100
+parse_workers = 1
 
 def signal_handler(sig, frame):
     print("Exiting...")
@@ -22,50 +34,181 @@ def signal_handler(sig, frame):
 
 #Define callback function to parse files from emails
 def parse_dmarc_files():
-    extracted_files = multiple_extract_gz(attachment_dir, extracted_dir)
+    extracted_files = multiple_extract_gz(attachment_dir, extracted_dir, workers=parse_workers, dedup=dedup)
     if not extracted_files:
         return []
-    report_list = parse_dmarc_reports_dir(extracted_dir, move_files=True, parsed_dir=parsed_dir)
-    for report in report_list:
-        # make a request to the API to save the report
-        headers = {"X-API-Key": "keytest1"}  # Add the X-Api-Key header
-        response = request("POST", "http://localhost:8000/api/v1/aggregated_report", json=report.get("feedback"), headers=headers)
-        if int(response.status_code) >= 300:
-            print(json.dumps(report, indent=4))
-            print("Error saving report", response.text)
-    
-def watch_emails():
-    client.watch(file_type='xml.gz', callback=parse_dmarc_files, save_directory=attachment_dir, timeout_seconds=300)
-    
-if __name__ == "__main__":
-    load_dotenv()
-    if len(sys.argv) < 2:
-        print("Usage: python client.py <client_type>")
-        sys.exit(1)
+    report_list = iter_dmarc_reports_dir(extracted_dir, move_files=True, parsed_dir=parsed_dir, streaming=True, workers=parse_workers)
+    upload_reports(report.get("feedback") for report in report_list)
+
+def archive_attachment(filename, payload):
+    """
+    Save a copy of a raw attachment in archive_dir (only used when ARCHIVE_DIR is set).
+    """
+    with open(os.path.join(archive_dir, os.path.basename(filename)), "wb") as f:
+        f.write(payload)
+
+def iter_attachment_reports(attachments):
+    """
+    Decompress and parse attachments in memory, skipping attachments whose SHA-256
+    is already in the dedup index.
+
+    Args:
+        attachments (iterable): (filename, payload) tuples as returned by fetch_attachments().
+
+    Yields:
+        dict: The parsed 'feedback' dictionary of each report.
+    """
+    for filename, payload in attachments:
+        key = payload_key(payload)
+        if dedup and dedup.seen(key):
+            continue
+        if archive_dir:
+            archive_attachment(filename, payload)
+        try:
+            for xml_name, xml_file in iter_xml_from_attachment(filename, payload):
+                with PARSE_SECONDS.time():
+                    feedback = dmarc_xml_to_dict(xml_file, streaming=True).get("feedback")
+                yield feedback
+        except Exception as e:
+            FAILURES.labels("parse").inc()
+            print(f"error: {e}\nfile: {filename}")
+            continue
+        if dedup:
+            dedup.add(key)
+
+#Define callback function to parse attachments fetched in memory
+def ingest_attachments(attachments):
+    upload_reports(iter_attachment_reports(attachments))
+
+def upload_reports(reports, batch_size=None):
+    """
+    Store each report in the spool as soon as it is parsed, then upload everything that is due
+    in batches of batch_size. Reports are consumed lazily, so only one is held in memory.
+    Reports whose (org_name, report_id) is already in the dedup index are skipped.
+
+    Args:
+        reports (iterable): The parsed 'feedback' dictionaries to upload.
+        batch_size (int): Reports per request (default is upload_batch_size).
+    """
+    for report in reports:
+        key = report_key(report)
+        if dedup and dedup.seen(key):
+            continue
+        spool.enqueue([report])
+        REPORTS_SPOOLED.inc()
+        if dedup:
+            dedup.add(key)
+    drain_spool(batch_size)
+
+def drain_spool(batch_size=None):
+    """
+    Upload spooled reports until none is due. Reports waiting for a retry stay in the spool.
+    """
+    batch_size = batch_size or upload_batch_size
+    while True:
+        claimed = spool.claim(batch_size)
+        if not claimed:
+            return
+        upload_batch(claimed)
+
+def upload_batch(claimed):
+    """
+    Send one batch of spooled reports to the API bulk endpoint and record the outcome in the spool.
+
+    Args:
+        claimed (list): (spool id, 'feedback' dictionary) tuples returned by spool.claim().
+    """
+    ids = [spool_id for spool_id, report in claimed]
+    batch = [report for spool_id, report in claimed]
+    try:
+        with UPLOAD_SECONDS.time():
+            response = request("POST", settings.bulk_url, json=batch, headers=settings.headers)
+    except RequestException as e:
+        FAILURES.labels("upload").inc()
+        print("Error saving reports", e)
+        spool.fail(ids, e)
+        return
+    if int(response.status_code) >= 300:
+        FAILURES.labels("upload").inc()
+        print("Error saving reports", response.text)
+        spool.fail(ids, f"{response.status_code}: {response.text}")
+        return
+    REPORTS_UPLOADED.inc(len(batch))
+    for result in settle_upload(spool, ids, response.json().get("results", [])):
+        FAILURES.labels("invalid_report").inc()
+        print(json.dumps(batch[result["index"]], indent=4))
+        print("Error saving report", result.get("detail"))
     
-    client_type = sys.argv[1]
+def create_email_client(client_type):
+    """
+    Build the IMAP or Gmail client from environment variables.
+
+    Args:
+        client_type (str): 'imap' or 'gmail'.
+    """
     if client_type == "imap":
         imap_server = os.getenv("IMAP_SERVER")
         imap_port = int(os.getenv("IMAP_PORT"))
         imap_username = os.getenv("IMAP_USERNAME")
         imap_password = os.getenv("IMAP_PASSWORD")
         imap_mode = os.getenv("IMAP_MODE")
-        client = IMAPClient(imap_server, imap_port, imap_mode, imap_username, imap_password)
+        imap_state_path = os.getenv("IMAP_STATE_PATH", ".imap_state.json")
+        imap_fetch_batch_size = int(os.getenv("IMAP_FETCH_BATCH_SIZE", 50))
+        imap_processed_action = os.getenv("IMAP_PROCESSED_ACTION")
+        imap_processed_folder = os.getenv("IMAP_PROCESSED_FOLDER")
+        return IMAPClient(imap_server, imap_port, imap_mode, imap_username, imap_password,
+                          state_path=imap_state_path, fetch_batch_size=imap_fetch_batch_size,
+                          processed_action=imap_processed_action, processed_folder=imap_processed_folder)
     
     elif client_type == "gmail":
-        client = GmailClient()
+        gmail_client_id = os.getenv("GMAIL_CLIENT_ID")
+        gmail_client_secret = os.getenv("GMAIL_CLIENT_SECRET")
+        gmail_token_path = os.getenv("GMAIL_TOKEN_PATH")
+        gmail_state_path = os.getenv("GMAIL_STATE_PATH", ".gmail_state.json")
+        gmail_batch_size = int(os.getenv("GMAIL_BATCH_SIZE", 50))
+        return GmailClient(gmail_client_id, gmail_client_secret, gmail_token_path,
+                           state_path=gmail_state_path, batch_size=gmail_batch_size)
+
+    raise ValueError(f"Unknown client type: {client_type}")
+
+def watch_emails():
+    if ingest_mode == 'memory':
+        client.watch(file_type=ATTACHMENT_TYPES, attachment_callback=ingest_attachments, timeout_seconds=300)
+    else:
+        client.watch(file_type='xml.gz', callback=parse_dmarc_files, save_directory=attachment_dir, timeout_seconds=300)
+    
+if __name__ == "__main__":
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python client.py <client_type> [watch]")
+        sys.exit(1)
+    
+    client = create_email_client(sys.argv[1])
+    settings = IngestSettings.from_env()
+    start_metrics_server(settings.metrics_port)
+    spool = settings.create_spool()
+    spool.recover()
+    dedup = settings.create_dedup()
     
     attachment_dir = os.getenv("ATTACHMENTS_DIR")
     extracted_dir = os.getenv("EXTRACTED_DIR")
     parsed_dir = os.getenv("PARSED_DIR")
+    archive_dir = os.getenv("ARCHIVE_DIR")
+    ingest_mode = os.getenv("INGEST_MODE", ingest_mode).lower()
+    upload_batch_size = settings.upload_batch_size
+    parse_workers = int(os.getenv("PARSE_WORKERS", parse_workers))
     
-    if not os.path.exists(attachment_dir):
+    if attachment_dir and not os.path.exists(attachment_dir):
         os.makedirs(attachment_dir)
-    if not os.path.exists(extracted_dir):
+    if extracted_dir and not os.path.exists(extracted_dir):
         os.makedirs(extracted_dir)
-    if not os.path.exists(parsed_dir):
+    if parsed_dir and not os.path.exists(parsed_dir):
         os.makedirs(parsed_dir)
+    if archive_dir and not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
             
-    # watch_emails()
-    parse_dmarc_files()
+    if sys.argv[2:] == ["watch"]:
+        watch_emails()
+    else:
+        parse_dmarc_files()
     
\ No newline at end of file
@@ -26,6 +26,19 @@ class AbstractEmailClient(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def fetch_attachments(self, file_type):
+        """
+        Fetch attachments of a specific file type without writing them to disk.
+        
+        Args:
+            file_type (str or tuple): The file type(s) to fetch (e.g., ('.xml.gz', '.zip')).
+
+        Yields:
+            tuple: The attachment filename and its raw bytes.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def disconnect(self):
         """
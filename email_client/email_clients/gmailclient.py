@@ -1,17 +1,25 @@
 import os
 import base64
+import json
 import signal
 import time
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from email_clients.email_base import AbstractEmailClient
+from utils.metrics import ATTACHMENTS_FETCHED, BYTES_DOWNLOADED, FAILURES, MESSAGES_FETCHED
 
-class GmailClient:
+MAX_BATCH_SIZE = 100  # Gmail API limit of requests per batch
+MAX_BATCH_RETRIES = 4
+BATCH_RETRY_DELAY = 1  # seconds before the first retry, doubled on each attempt
+
+class GmailClient(AbstractEmailClient):
     """
     GmailClient class to connect to Gmail API and forward attachments of a specific file type.
     """
-    def __init__(self, client_id, client_secret, token_path):
+    def __init__(self, client_id, client_secret, token_path, state_path=None, batch_size=50):
         """
         Initialize the GmailClient object.
 
@@ -19,10 +27,16 @@ class GmailClient:
             client_id (str): The client ID for OAuth.
             client_secret (str): The client secret for OAuth.
             token_path (str): The path to store the token.
+            state_path (str): JSON file storing the last synced historyId
+                (default is None, which keeps it in memory only).
+            batch_size (int): Number of requests sent per batch request (default is 50, at most 100).
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.token_path = token_path
+        self.state_path = state_path
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.state = self.load_state()
         self.service = None
         self.connected = False
         self.running = False
@@ -31,7 +45,7 @@ class GmailClient:
         """
         Authenticate with the Gmail API using OAuth 2.0.
         """
-        scopes = ['https://www.googleapis.com/auth/gmail.readonly']
+        scopes = ['https://www.googleapis.com/auth/gmail.modify']
 
         flow = InstalledAppFlow.from_client_secrets_file(
             self.client_id, scopes=scopes)
@@ -72,46 +86,244 @@ class GmailClient:
         self.service = None
         
 
-    def forward_attachments(self, file_type, user_id='me', query=''):
+    def load_state(self):
         """
-        Forward attachments of a specific file type from emails.
+        Load the sync state (last historyId) from state_path.
+        """
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        """
+        Atomically write the sync state to state_path.
+        """
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def list_message_ids(self, user_id='me', query=''):
+        """
+        List the ids of every message matching query, following nextPageToken.
 
         Args:
-            service: The Gmail service object.
             user_id (str): User's email address or 'me' for the authenticated user.
             query (str): Query to filter emails (optional).
-            
+
         Returns:
-            True if new messages are found, False otherwise.
+            list: The matching message ids.
+        """
+        message_ids = []
+        page_token = None
+        while True:
+            response = self.service.users().messages().list(userId=user_id, q=query, pageToken=page_token).execute()
+            message_ids.extend(message['id'] for message in response.get('messages', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return message_ids
+
+    def history_message_ids(self, start_history_id, user_id='me'):
+        """
+        List the ids of messages added since start_history_id with users.history.list.
+
+        Args:
+            start_history_id (str): The historyId of the previous sync.
+            user_id (str): User's email address or 'me' for the authenticated user.
+
+        Returns:
+            tuple: The added message ids and the latest historyId, or (None, None)
+            when start_history_id is too old and a full sync is needed.
         """
+        message_ids = []
+        page_token = None
+        history_id = start_history_id
         try:
-            response = self.service.users().messages().list(userId=user_id, q=query + ' is:unread').execute()
-            messages = response.get('messages', [])
+            while True:
+                response = self.service.users().history().list(
+                    userId=user_id, startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'], pageToken=page_token).execute()
+                for history in response.get('history', []):
+                    for added in history.get('messagesAdded', []):
+                        message_ids.append(added['message']['id'])
+                history_id = response.get('historyId', history_id)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    return list(dict.fromkeys(message_ids)), history_id
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None, None
+            raise
 
-            if not messages:
-                print('No messages found.')
-                return False
-            
+    def new_message_ids(self, user_id='me', query=''):
+        """
+        Return the ids of messages to process and the historyId to store once they are handled.
+        Uses the stored historyId when available, otherwise lists every message matching query.
+        """
+        start_history_id = self.state.get('history_id')
+        if start_history_id:
+            message_ids, history_id = self.history_message_ids(start_history_id, user_id)
+            if message_ids is not None:
+                return message_ids, history_id
+
+        history_id = self.service.users().getProfile(userId=user_id).execute()['historyId']
+        return self.list_message_ids(user_id, query + ' is:unread'), history_id
+
+    def execute_batch(self, requests):
+        """
+        Execute requests with BatchHttpRequest in groups of batch_size.
+        Failed requests (rate limits, server errors...) are sent again with exponential
+        backoff, up to MAX_BATCH_RETRIES times. A 404 means the message was deleted
+        meanwhile; it is neither retried nor reported as failed.
+
+        Args:
+            requests (list): (key, request) tuples.
+
+        Returns:
+            tuple: The response of every successful request by key, and the set of keys
+            of the requests that still failed.
+        """
+        responses = {}
+        pending = list(requests)
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(BATCH_RETRY_DELAY * 2 ** (attempt - 1))
+            errors = {}
+
+            def collect(request_id, response, exception):
+                if exception is None:
+                    responses[request_id] = response
+                elif not (isinstance(exception, HttpError) and exception.resp.status == 404):
+                    errors[request_id] = exception
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for key, request in pending[start:start + self.batch_size]:
+                    batch.add(request, request_id=key)
+                batch.execute()
+
+            pending = [(key, request) for key, request in pending if key in errors]
+            if not pending:
+                return responses, set()
+            print(f"Error in {len(pending)} batch requests (attempt {attempt + 1}):", next(iter(errors.values())))
+        return responses, {key for key, request in pending}
+
+    def walk_parts(self, part):
+        """
+        Yield every part of a message payload that has a filename, walking nested multiparts.
+        """
+        if part.get('filename'):
+            yield part
+        for child in part.get('parts', []):
+            yield from self.walk_parts(child)
+
+    def mark_read(self, message_ids, user_id='me'):
+        """
+        Remove the UNREAD label from messages, up to 1000 per batchModify call.
+        """
+        for start in range(0, len(message_ids), 1000):
+            self.service.users().messages().batchModify(
+                userId=user_id,
+                body={'ids': message_ids[start:start + 1000], 'removeLabelIds': ['UNREAD']}).execute()
+
+    def fetch_attachments(self, file_type, user_id='me', query=''):
+        """
+        Fetch attachments of a specific file type without writing them to disk.
+        Messages and large attachments are downloaded with batch requests, and the
+        historyId is stored only after every message has been consumed.
+
+        Messages that could not be downloaded, or whose attachments could not, are
+        not marked read and the historyId is not advanced, so the next sync fetches
+        them again (along with the others since the previous historyId, which the
+        dedup index skips).
+
+        Args:
+            file_type (str or tuple): The file type(s) to fetch (e.g., ('.xml.gz', '.zip')).
+            user_id (str): User's email address or 'me' for the authenticated user.
+            query (str): Query to filter emails on a full sync (optional).
+
+        Yields:
+            tuple: The attachment filename and its raw bytes.
+        """
+        file_types = tuple(t.lower() for t in ((file_type,) if isinstance(file_type, str) else file_type))
+        try:
+            message_ids, history_id = self.new_message_ids(user_id, query)
+            incomplete = False
+
+            for start in range(0, len(message_ids), self.batch_size):
+                ids = message_ids[start:start + self.batch_size]
+                messages, failed_messages = self.execute_batch([
+                    (message_id, self.service.users().messages().get(userId=user_id, id=message_id))
+                    for message_id in ids
+                ])
+                MESSAGES_FETCHED.labels("gmail").inc(len(messages))
+
+                remote_parts = []
+                for message_id, msg in messages.items():
+                    for part in self.walk_parts(msg['payload']):
+                        if not part['filename'].lower().endswith(file_types):
+                            continue
+                        if 'data' in part['body']:
+                            payload = base64.urlsafe_b64decode(part['body']['data'].encode('UTF-8'))
+                            ATTACHMENTS_FETCHED.labels("gmail").inc()
+                            BYTES_DOWNLOADED.labels("gmail").inc(len(payload))
+                            yield part['filename'], payload
+                        elif 'attachmentId' in part['body']:
+                            remote_parts.append((message_id, part))
+
+                attachments, failed_attachments = self.execute_batch([
+                    (str(i), self.service.users().messages().attachments().get(
+                        userId=user_id, messageId=message_id, id=part['body']['attachmentId']))
+                    for i, (message_id, part) in enumerate(remote_parts)
+                ])
+                for i, (message_id, part) in enumerate(remote_parts):
+                    attachment = attachments.get(str(i))
+                    if attachment:
+                        payload = base64.urlsafe_b64decode(attachment['data'].encode('UTF-8'))
+                        ATTACHMENTS_FETCHED.labels("gmail").inc()
+                        BYTES_DOWNLOADED.labels("gmail").inc(len(payload))
+                        yield part['filename'], payload
+
+                unfinished = set(failed_messages) | {remote_parts[int(i)][0] for i in failed_attachments}
+                incomplete = incomplete or bool(unfinished)
+                self.mark_read([message_id for message_id in messages if message_id not in unfinished], user_id)
+
+            if incomplete:
+                print("Some messages could not be downloaded, they will be fetched again on the next sync")
             else:
-                for message in messages:
-                    msg = self.service.users().messages().get(userId=user_id, id=message['id']).execute()
-                    payload = msg['payload']
-                    
-                    #complete the code here
-                    for part in payload['parts']:
-                        if 'filename' in part['filename']:
-                            file_data = base64.urlsafe_b64decode(part['body']['data'].encode('UTF-8'))
-                            if part['filename'].lower().endswith(file_type.lower()):
-                                file_path = os.path.join('.', part['filename'])
-                                with open(file_path, 'wb') as f:
-                                    f.write(file_data)
-                                
-                    self.service.users().messages().modify(userId=user_id, id=message['id'], body={'removeLabelIds': ['UNREAD']}).execute()
-                return True
+                self.state['history_id'] = history_id
+                self.save_state()
 
         except Exception as e:
+            FAILURES.labels("fetch").inc()
             print("Error processing emails:", e)
-            return False
+
+    def forward_attachments(self, file_type, user_id='me', query='', save_directory='.'):
+        """
+        Forward attachments of a specific file type from emails.
+
+        Args:
+            file_type (str): The file type to forward (e.g., '.xml.gz').
+            user_id (str): User's email address or 'me' for the authenticated user.
+            query (str): Query to filter emails (optional).
+            save_directory (str): The directory to save the attachments (default is '.').
+            
+        Returns:
+            True if new messages are found, False otherwise.
+        """
+        has_new_messages = False
+        for filename, payload in self.fetch_attachments(file_type, user_id, query):
+            has_new_messages = True
+            file_path = os.path.join(save_directory, filename)
+            with open(file_path, 'wb') as f:
+                f.write(payload)
+
+        if not has_new_messages:
+            print('No messages found.')
+        return has_new_messages
 
     def stop(self, signum, frame):
         """
@@ -123,14 +335,18 @@ class GmailClient:
         """
         self.disconnect()
 
-    def watch(self, callback = None, query='has:attachment', timeout_seconds=300):
+    def watch(self, file_type='.xml.gz', callback = None, query='has:attachment', save_directory='.', timeout_seconds=300, attachment_callback=None):
         """
         Watch for emails containing attachments of a specific file type.
 
         Args:
+            file_type (str): The file type to forward (e.g., '.xml.gz').
             callback (function): The callback function to execute after processing emails (default is None).
             query (str): Query to filter emails (optional).
+            save_directory (str): The directory to save the attachments (default is '.').
             timeout_seconds (int): The number of seconds to wait between each iteration (default is 300).
+            attachment_callback (function): If set, attachments are not saved; instead this function
+                receives an iterable of (filename, payload) tuples (default is None).
         """
         signal.signal(signal.SIGINT, self.stop)
         signal.signal(signal.SIGTERM, self.stop)
@@ -139,8 +355,10 @@ class GmailClient:
         while self.running:
             if not self.connected:
                 self.connect()
-            has_new_messages = self.forward_attachments(query=query)
-            if callback and has_new_messages:
-                callback()
+            if attachment_callback:
+                attachment_callback(self.fetch_attachments(file_type, query=query))
+            else:
+                has_new_messages = self.forward_attachments(file_type, query=query, save_directory=save_directory)
+                if callback and has_new_messages:
+                    callback()
             time.sleep(timeout_seconds)
-
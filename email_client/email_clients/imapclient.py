@@ -1,16 +1,29 @@
-from imap_tools import MailBox, MailBoxTls, A
+from imap_tools import MailBox, MailBoxTls, A, MailMessageFlags
 import time
 import signal
 from email_clients.email_base import AbstractEmailClient
+from utils.metrics import ATTACHMENTS_FETCHED, BYTES_DOWNLOADED, FAILURES, MESSAGES_FETCHED
+import json
+import re
 import ssl
 import sys
 import os
 
+FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+STRUCTURE_NAME_RE = re.compile(rb'"(?:file)?name" "([^"]+)"', re.IGNORECASE)
+IDLE_REFRESH_SECONDS = 25 * 60  # rfc2177: re-issue IDLE at least every 29 minutes
+MAX_RECONNECT_BACKOFF = 300
+STRUCTURE_TYPE_RE = re.compile(rb'"application" "(?:x-)?(?:gzip|zip|zip-compressed)"', re.IGNORECASE)
+STRUCTURE_OCTET_RE = re.compile(rb'"application" "octet-stream"', re.IGNORECASE)
+# Names the prefilter cannot read: RFC 2231 parameters (filename*=), literals and encoded words
+STRUCTURE_OPAQUE_NAME_RE = re.compile(rb'"(?:file)?name\*|"(?:file)?name" \{\d+\}|"(?:file)?name" "=\?', re.IGNORECASE)
+
 class IMAPClient(AbstractEmailClient):
     """
     IMAPClient class to connect to an IMAP server and forward attachments of a specific file type.
     """
-    def __init__(self, host, port, mode, username, password):
+    def __init__(self, host, port, mode, username, password, state_path=None, fetch_batch_size=50,
+                 processed_action=None, processed_folder=None):
         """
         Initialize the IMAPClient object.
 
@@ -20,15 +33,102 @@ class IMAPClient(AbstractEmailClient):
             ssl (bool): Whether to use SSL/TLS encryption.
             username (str): The username for authentication.
             password (str): The password for authentication.
+            state_path (str): JSON file storing the last seen UID and UIDVALIDITY per folder
+                (default is None, which keeps the state in memory only).
+            fetch_batch_size (int): Number of messages downloaded per FETCH command (default is 50).
+            processed_action (str): What to do with handled messages: None, 'seen' or 'move' (default is None).
+            processed_folder (str): Destination folder when processed_action is 'move'.
         """
         self.host = host
         self.port = port
         self.mode = mode
         self.username = username
         self.password = password
+        self.state_path = state_path
+        self.fetch_batch_size = fetch_batch_size
+        self.processed_action = processed_action
+        self.processed_folder = processed_folder
+        self.state = self.load_state()
         self.connected = False
         self.running = True
 
+    def load_state(self):
+        """
+        Load the per-folder UID state from state_path.
+        """
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        """
+        Atomically write the per-folder UID state to state_path.
+        """
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def folder_state(self, folder):
+        """
+        Return the UID state of a folder, resetting it when the server's UIDVALIDITY changed.
+
+        Args:
+            folder (str): The selected folder.
+
+        Returns:
+            dict: {'uidvalidity': int, 'last_uid': int}
+        """
+        key = f"{self.username}@{self.host}/{folder}"
+        uidvalidity = self.mailbox.folder.status(folder, ['UIDVALIDITY'])['UIDVALIDITY']
+        state = self.state.get(key)
+        if not state or state.get('uidvalidity') != uidvalidity:
+            state = {'uidvalidity': uidvalidity, 'last_uid': 0}
+            self.state[key] = state
+        return state
+
+    def uids_with_attachments(self, uids, file_types):
+        """
+        Fetch only the BODYSTRUCTURE of messages and keep the ones with a matching attachment.
+
+        Args:
+            uids (list): The message UIDs to inspect.
+            file_types (tuple): Lowercase attachment extensions to look for.
+
+        Returns:
+            list: The UIDs whose structure contains a matching filename or a gzip/zip part,
+            or an octet-stream part whose name cannot be read from the structure; those
+            are downloaded and filtered on their decoded attachment names.
+        """
+        typ, data = self.mailbox.client.uid('FETCH', ','.join(uids), '(UID BODYSTRUCTURE)')
+        if typ != 'OK':
+            return list(uids)
+        response = b''.join(part if isinstance(part, bytes) else b''.join(part) for part in data if part)
+        markers = list(FETCH_UID_RE.finditer(response))
+        matching = []
+        for i, marker in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(response)
+            structure = response[marker.end():end]
+            names = (name.decode(errors='ignore').lower() for name in STRUCTURE_NAME_RE.findall(structure))
+            if (any(name.endswith(file_types) for name in names) or STRUCTURE_TYPE_RE.search(structure)
+                    or (STRUCTURE_OCTET_RE.search(structure) and STRUCTURE_OPAQUE_NAME_RE.search(structure))):
+                matching.append(marker.group(1).decode())
+        return matching
+
+    def mark_processed(self, uids):
+        """
+        Flag or move handled messages according to processed_action.
+        """
+        if not uids or not self.processed_action:
+            return
+        if self.processed_action == 'seen':
+            self.mailbox.flag(uids, MailMessageFlags.SEEN, True)
+        elif self.processed_action == 'move' and self.processed_folder:
+            self.mailbox.move(uids, self.processed_folder)
+
     # Implement the abstract methods
     def connect(self):
         """
@@ -60,27 +160,64 @@ class IMAPClient(AbstractEmailClient):
             search_criteria (str): The search criteria to filter emails (default is None).
             save_directory (str): The directory to save the attachments (default is '.').
         """
-        try:
-            has_new_messages = False
-            
-            self.mailbox.folder.folder = folder
-            if search_criteria:
-                self.mailbox.folder.search(search_criteria)
+        has_new_messages = False
+        for filename, payload in self.fetch_attachments(file_type, folder, search_criteria):
+            has_new_messages = True
+            file_path = os.path.join(save_directory, filename)
+            # Escribir los datos del archivo adjunto en el archivo local
+            with open(file_path, "wb") as f:
+                f.write(payload)
 
-            for msg in self.mailbox.fetch():
-                has_new_messages = True
-                for att in msg.attachments:
-                    if att.filename.lower().endswith(file_type.lower()):
-                        file_path = os.path.join(save_directory, att.filename)
-                        # Escribir los datos del archivo adjunto en el archivo local
-                        with open(file_path, "wb") as f:
-                            f.write(att.payload)
+        return has_new_messages
 
-            return has_new_messages
+    def fetch_attachments(self, file_type, folder='INBOX', search_criteria=None):
+        """
+        Fetch attachments of a specific file type without writing them to disk.
+        Only messages with a UID above the last one seen in the folder are considered,
+        and messages whose BODYSTRUCTURE has no matching part are never downloaded.
+        The last seen UID is saved after each batch has been consumed.
 
-        except Exception as e:
-            print("Error processing emails:", e)
-            return False
+        A message whose attachments cannot be read is reported and skipped. Connection
+        and command errors (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError...) are
+        raised, so callers can reconnect.
+
+        Args:
+            file_type (str or tuple): The file type(s) to fetch (e.g., ('.xml.gz', '.zip')).
+            folder (str): The folder to search for emails (default is 'INBOX').
+            search_criteria (str): The search criteria to filter emails (default is None).
+
+        Yields:
+            tuple: The attachment filename and its raw bytes.
+        """
+        file_types = tuple(t.lower() for t in ((file_type,) if isinstance(file_type, str) else file_type))
+        self.mailbox.folder.set(folder)
+        state = self.folder_state(folder)
+        criteria = f"UID {state['last_uid'] + 1}:*"
+        if search_criteria:
+            criteria = f"{criteria} {search_criteria}"
+        # 'UID n:*' always matches the newest message, even when its UID is below n
+        uids = sorted((uid for uid in self.mailbox.uids(criteria) if int(uid) > state['last_uid']), key=int)
+
+        for start in range(0, len(uids), self.fetch_batch_size):
+            batch = uids[start:start + self.fetch_batch_size]
+            wanted = self.uids_with_attachments(batch, file_types)
+            if wanted:
+                for msg in self.mailbox.fetch(A(uid=wanted), mark_seen=False, bulk=True):
+                    MESSAGES_FETCHED.labels("imap").inc()
+                    try:
+                        attachments = [(att.filename, att.payload) for att in msg.attachments
+                                       if att.filename.lower().endswith(file_types)]
+                    except Exception as e:
+                        FAILURES.labels("fetch").inc()
+                        print(f"Error reading message {msg.uid}:", e)
+                        continue
+                    for filename, payload in attachments:
+                        ATTACHMENTS_FETCHED.labels("imap").inc()
+                        BYTES_DOWNLOADED.labels("imap").inc(len(payload))
+                        yield filename, payload
+                self.mark_processed(wanted)
+            state['last_uid'] = int(batch[-1])
+            self.save_state()
 
     def disconnect(self):
         """
@@ -108,9 +245,31 @@ class IMAPClient(AbstractEmailClient):
             print("Error stopping:", e)
             sys.exit(1)
 
-    def watch(self, file_type, callback = None, folder='INBOX', search_criteria=None, save_directory=".", timeout_seconds=300):
+    def supports_idle(self):
+        """
+        Check whether the server advertises the IDLE capability.
+        """
+        return 'IDLE' in self.mailbox.client.capabilities
+
+    def process_folder(self, file_type, callback=None, folder='INBOX', search_criteria=None, save_directory=".", attachment_callback=None):
+        """
+        Handle new messages once, either in memory (attachment_callback) or by saving them to save_directory.
+        """
+        if attachment_callback:
+            attachment_callback(self.fetch_attachments(file_type, folder, search_criteria))
+        else:
+            has_new_message = self.forward_attachments(file_type, folder, search_criteria, save_directory)
+            if callback and has_new_message:
+                callback()
+
+    def watch(self, file_type, callback = None, folder='INBOX', search_criteria=None, save_directory=".", timeout_seconds=300,
+              attachment_callback=None, idle=True, idle_timeout=IDLE_REFRESH_SECONDS):
         """
         Watch the specified folder for emails containing attachments of a specific file type.
+        With idle=True and a server that supports IDLE, the client waits for the server to
+        announce new messages (EXISTS) instead of sleeping, and processes the folder again every
+        idle_timeout seconds at the latest. Otherwise it polls every timeout_seconds. Dropped connections are retried
+        with exponential backoff.
 
         Args:
             file_type (str): The file type to forward (e.g., '.xml.gz').
@@ -118,18 +277,41 @@ class IMAPClient(AbstractEmailClient):
             callback (function): The callback function to execute after processing emails (default is None).
             search_criteria (str): The search criteria to filter emails (default is None).
             save_directory (str): The directory to save the attachments (default is '.').
-            timeout_seconds (int): The number of seconds to wait between each iteration (default is 300).
+            timeout_seconds (int): The number of seconds to wait between each iteration when polling (default is 300).
+            attachment_callback (function): If set, attachments are not saved; instead this function
+                receives an iterable of (filename, payload) tuples (default is None).
+            idle (bool): Use IMAP IDLE when the server supports it (default is True).
+            idle_timeout (int): Seconds before an IDLE command is refreshed (default is 25 minutes).
         """
         signal.signal(signal.SIGINT, self.stop)
         signal.signal(signal.SIGTERM, self.stop)
         self.running = True
+        backoff = 1
 
         while self.running:
-            if not self.connected:
-                self.connect()
-                
-            has_new_message = self.forward_attachments(file_type, folder, search_criteria, save_directory)
-            if callback and has_new_message:
-                callback()
-                
-            time.sleep(timeout_seconds)
\ No newline at end of file
+            try:
+                if not self.connected:
+                    self.connect()
+                    if not self.connected:
+                        raise ConnectionError("could not connect to the IMAP server")
+
+                self.process_folder(file_type, callback, folder, search_criteria, save_directory, attachment_callback)
+                backoff = 1
+
+                if idle and self.supports_idle():
+                    # The folder is processed again whether IDLE saw EXISTS or timed out: mail
+                    # arriving between the search and the start of IDLE is not announced, and
+                    # searching above the last seen UID is cheap
+                    self.mailbox.folder.set(folder)
+                    self.mailbox.idle.wait(timeout=idle_timeout)
+                else:
+                    time.sleep(timeout_seconds)
+
+            except Exception as e:
+                if not self.running:
+                    break
+                FAILURES.labels("fetch").inc()
+                print(f"Connection lost, reconnecting in {backoff}s:", e)
+                self.connected = False
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RECONNECT_BACKOFF)
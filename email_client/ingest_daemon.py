@@ -0,0 +1,254 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from dotenv import load_dotenv
+from client import create_email_client
+from utils.extract_gz import iter_xml_from_attachment, ATTACHMENT_TYPES
+from utils.settings import IngestSettings
+from utils.spool import settle_upload
+from utils.dedup import payload_key, report_key
+from utils.xml_parser import dmarc_xml_bytes_to_feedback
+from utils.metrics import (
+    DECOMPRESS_SECONDS, FAILURES, PARSE_SECONDS, QUEUE_DEPTH, REPORTS_SPOOLED, REPORTS_UPLOADED, UPLOAD_SECONDS,
+    start_metrics_server,
+)
+
+class IngestDaemon:
+    """
+    Asyncio ingest pipeline: mailbox fetch -> decompress -> parse -> spool -> upload.
+    The first stages are connected by bounded queues, so a slow stage applies backpressure
+    to the ones before it instead of stalling the whole loop. Parsed reports are stored in
+    the durable spool, from which the upload stage claims batches and retries failures.
+    """
+    def __init__(self, email_client, settings: IngestSettings):
+        """
+        Initialize the IngestDaemon object.
+
+        Args:
+            email_client: An IMAPClient or GmailClient providing fetch_attachments().
+            settings (IngestSettings): Endpoint, credentials and tuning options.
+        """
+        self.email_client = email_client
+        self.settings = settings
+        self.attachments = asyncio.Queue(maxsize=settings.queue_size)
+        self.documents = asyncio.Queue(maxsize=settings.queue_size)
+        self.spool = settings.create_spool()
+        self.dedup = settings.create_dedup()
+        self.upload_wakeups = []
+        self.draining = False
+        self.stopping = threading.Event()
+        self.stopped = asyncio.Event()
+        QUEUE_DEPTH.labels("attachments").set_function(self.attachments.qsize)
+        QUEUE_DEPTH.labels("documents").set_function(self.documents.qsize)
+
+    def stop(self):
+        """
+        Stop fetching new mail; items already queued are drained before run() returns.
+        """
+        print("Stopping, draining queues...")
+        self.stopping.set()
+        self.stopped.set()
+
+    def fetch_into(self, loop):
+        """
+        Run one blocking mailbox fetch in a thread, pushing attachments into the queue.
+        Blocks while the queue is full.
+        """
+        if not self.email_client.connected:
+            self.email_client.connect()
+            if not self.email_client.connected:
+                raise ConnectionError("could not connect to the mail server")
+        for filename, payload in self.email_client.fetch_attachments(ATTACHMENT_TYPES):
+            asyncio.run_coroutine_threadsafe(self.attachments.put((filename, payload)), loop).result()
+            if self.stopping.is_set():
+                break
+
+    async def fetch_stage(self):
+        loop = asyncio.get_running_loop()
+        while not self.stopping.is_set():
+            try:
+                await asyncio.to_thread(self.fetch_into, loop)
+            except Exception as e:
+                FAILURES.labels("fetch").inc()
+                print("Error fetching emails, reconnecting on the next fetch:", e)
+                self.email_client.connected = False
+            try:
+                await asyncio.wait_for(self.stopped.wait(), timeout=self.settings.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def decompress(self, filename, payload):
+        """
+        Decompress an attachment, skipping it when its SHA-256 is in the dedup index.
+
+        Returns:
+            list: (xml name, xml bytes, attachment key) tuples.
+        """
+        key = payload_key(payload)
+        if self.dedup and self.dedup.seen(key):
+            return []
+        if self.settings.archive_dir:
+            with open(os.path.join(self.settings.archive_dir, os.path.basename(filename)), "wb") as f:
+                f.write(payload)
+        with DECOMPRESS_SECONDS.time():
+            return [(name, xml_file.read(), key) for name, xml_file in iter_xml_from_attachment(filename, payload)]
+
+    async def decompress_stage(self):
+        while True:
+            filename, payload = await self.attachments.get()
+            try:
+                for document in await asyncio.to_thread(self.decompress, filename, payload):
+                    await self.documents.put(document)
+            except Exception as e:
+                FAILURES.labels("decompress").inc()
+                print(f"error: {e}\nfile: {filename}")
+            finally:
+                self.attachments.task_done()
+
+    def spool_report(self, feedback, attachment_key):
+        """
+        Store a parsed report in the spool unless its (org_name, report_id) was seen before,
+        then record the report and its attachment in the dedup index.
+        """
+        key = report_key(feedback)
+        if self.dedup and self.dedup.seen(key):
+            return False
+        self.spool.enqueue([feedback])
+        if self.dedup:
+            self.dedup.add(key, attachment_key)
+        REPORTS_SPOOLED.inc()
+        return True
+
+    def wake_uploaders(self):
+        """
+        Tell every upload stage that reports were spooled (or that the daemon is draining).
+        """
+        for wakeup in self.upload_wakeups:
+            wakeup.set()
+
+    async def parse_stage(self, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            name, xml_bytes, attachment_key = await self.documents.get()
+            try:
+                start = time.perf_counter()
+                feedback = await loop.run_in_executor(executor, dmarc_xml_bytes_to_feedback, xml_bytes)
+                PARSE_SECONDS.observe(time.perf_counter() - start)
+                if await asyncio.to_thread(self.spool_report, feedback, attachment_key):
+                    self.wake_uploaders()
+            except Exception as e:
+                FAILURES.labels("parse").inc()
+                print(f"error: {e}\nfile: {name}")
+            finally:
+                self.documents.task_done()
+
+    async def upload(self, http, claimed):
+        ids = [spool_id for spool_id, report in claimed]
+        batch = [report for spool_id, report in claimed]
+        try:
+            with UPLOAD_SECONDS.time():
+                response = await http.post(self.settings.bulk_url, json=batch, headers=self.settings.headers)
+        except httpx.HTTPError as e:
+            FAILURES.labels("upload").inc()
+            print("Error saving reports", e)
+            await asyncio.to_thread(self.spool.fail, ids, e)
+            return
+        if response.status_code >= 300:
+            FAILURES.labels("upload").inc()
+            print("Error saving reports", response.text)
+            await asyncio.to_thread(self.spool.fail, ids, f"{response.status_code}: {response.text}")
+            return
+        REPORTS_UPLOADED.inc(len(batch))
+        invalid = await asyncio.to_thread(settle_upload, self.spool, ids, response.json().get("results", []))
+        for result in invalid:
+            FAILURES.labels("invalid_report").inc()
+            print("Error saving report", result.get("report_id"), result.get("detail"))
+
+    async def upload_stage(self, http):
+        """
+        Claim batches of up to upload_batch_size due reports from the spool and send them
+        to the bulk endpoint. A batch is claimed once upload_batch_size reports are due or
+        upload_batch_timeout has passed, whichever comes first; every spooled report
+        wakes the stage up to count them again. Returns once draining and nothing is due.
+        """
+        loop = asyncio.get_running_loop()
+        batch_size = self.settings.upload_batch_size
+        # Each uploader has its own event, so one clearing it never hides a wake-up from another
+        wakeup = asyncio.Event()
+        self.upload_wakeups.append(wakeup)
+        while True:
+            deadline = loop.time() + self.settings.upload_batch_timeout
+            while True:
+                wakeup.clear()
+                due = await asyncio.to_thread(self.spool.due)
+                QUEUE_DEPTH.labels("spool").set(due)
+                remaining = deadline - loop.time()
+                if self.draining or due >= batch_size or remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            claimed = await asyncio.to_thread(self.spool.claim, batch_size)
+            if not claimed:
+                if self.draining:
+                    return
+                continue
+            await self.upload(http, claimed)
+
+    async def run(self):
+        """
+        Run every stage until stop() is called, then drain the queues stage by stage.
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        start_metrics_server(self.settings.metrics_port)
+        recovered = self.spool.recover()
+        if recovered:
+            print(f"Recovered {recovered} in-flight reports from the spool")
+
+        limits = httpx.Limits(max_keepalive_connections=self.settings.upload_concurrency)
+        with ProcessPoolExecutor(max_workers=self.settings.parse_workers) as executor:
+            async with httpx.AsyncClient(http2=self.settings.http2, limits=limits, timeout=60) as http:
+                uploaders = [asyncio.create_task(self.upload_stage(http)) for _ in range(self.settings.upload_concurrency)]
+                stages = [
+                    (self.attachments, [asyncio.create_task(self.decompress_stage())]),
+                    (self.documents, [asyncio.create_task(self.parse_stage(executor)) for _ in range(self.settings.parse_workers)]),
+                ]
+                await self.fetch_stage()
+
+                for queue, workers in stages:
+                    await queue.join()
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+
+                # Upload what is due; reports waiting for a retry stay in the spool
+                self.draining = True
+                self.wake_uploaders()
+                await asyncio.gather(*uploaders)
+
+        self.spool.close()
+        if self.dedup:
+            self.dedup.close()
+        self.email_client.disconnect()
+        print("Shutdown complete")
+
+if __name__ == "__main__":
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python ingest_daemon.py <client_type>")
+        sys.exit(1)
+
+    settings = IngestSettings.from_env()
+    if settings.archive_dir and not os.path.exists(settings.archive_dir):
+        os.makedirs(settings.archive_dir)
+    daemon = IngestDaemon(create_email_client(sys.argv[1]), settings)
+    asyncio.run(daemon.run())
@@ -0,0 +1,59 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from utils.settings import IngestSettings
+from utils.spool import STATES, DEAD
+
+def print_stats(spool, args):
+    for state, count in spool.counts().items():
+        print(f"{state:>10}: {count}")
+
+def print_list(spool, args):
+    for item in spool.list(args.state, args.limit):
+        next_attempt = datetime.fromtimestamp(item["next_attempt_at"]).isoformat(timespec="seconds")
+        print(f"{item['id']:>8} {item['state']:>10} attempts={item['attempts']} next={next_attempt} "
+              f"{item['org_name']} {item['report_id']} {item['last_error'] or ''}")
+
+def print_report(spool, args):
+    report = spool.get(args.id)
+    if report is None:
+        print(f"No spooled report with id {args.id}")
+        sys.exit(1)
+    print(json.dumps(report, indent=4))
+
+def replay(spool, args):
+    print(f"Replayed {spool.replay(args.ids)} reports")
+
+def purge(spool, args):
+    print(f"Deleted {spool.purge(args.state)} reports")
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Inspect and replay the report upload spool.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Number of reports per state").set_defaults(func=print_stats)
+
+    list_parser = commands.add_parser("list", help="List spooled reports")
+    list_parser.add_argument("--state", choices=STATES)
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.set_defaults(func=print_list)
+
+    show_parser = commands.add_parser("show", help="Print the payload of a spooled report")
+    show_parser.add_argument("id", type=int)
+    show_parser.set_defaults(func=print_report)
+
+    replay_parser = commands.add_parser("replay", help="Move dead-lettered reports back to pending")
+    replay_parser.add_argument("ids", type=int, nargs="*", help="Spool ids (default: every dead report)")
+    replay_parser.set_defaults(func=replay)
+
+    purge_parser = commands.add_parser("purge", help="Delete every report in a state")
+    purge_parser.add_argument("--state", choices=STATES, default=DEAD)
+    purge_parser.set_defaults(func=purge)
+
+    args = parser.parse_args()
+    spool = IngestSettings.from_env().create_spool()
+    args.func(spool, args)
+    spool.close()
@@ -1,41 +1,97 @@
 from utils.xml_parser import dmarc_xml_to_dict, dict_to_json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import os
 import shutil
 
-def parse_dmarc_reports_dir(directory: str, move_files=False, parsed_dir:str=None):
+def parse_xml_file(xml_file: str, streaming=False):
     """
-    Parse DMARC reports from XML files in a directory.
+    Parse one DMARC XML file. Defined at module level so it can run in a worker process.
+    """
+    return dmarc_xml_to_dict(xml_file, streaming=streaming)
+
+def iter_parsed_files(xml_files: list, streaming=False, workers=1):
+    """
+    Parse XML files, in a process pool when workers > 1.
 
     Parameters:
-    - directory: The directory containing DMARC XML files.
-    - move_files: If True, move the files into dir/parsed_reports
-    - parsed_dir: Directory where parsed files will be moved (if move_files=True).
+    - xml_files: The paths of the XML files to parse.
+    - streaming: If True, parse each file with the streaming parser (see dmarc_xml_to_dict).
+    - workers: Number of worker processes. 1 parses in the current process.
 
-    Returns:
-    - report_list: A list of dictionaries representing the parsed DMARC reports.
+    Yields:
+    - (index, xml_file, report_data, error): One tuple per file, in the order the files finish.
+      index is the position in xml_files, and exactly one of report_data and error is None.
     """
-    report_list = []
-    
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(parse_xml_file, xml_file, streaming): (index, xml_file)
+                for index, xml_file in enumerate(xml_files)
+            }
+            for future in as_completed(futures):
+                index, xml_file = futures[future]
+                try:
+                    yield index, xml_file, future.result(), None
+                except Exception as e:
+                    yield index, xml_file, None, e
+    else:
+        for index, xml_file in enumerate(xml_files):
+            try:
+                yield index, xml_file, parse_xml_file(xml_file, streaming), None
+            except Exception as e:
+                yield index, xml_file, None, e
+
+def _iter_dmarc_reports_dir(directory: str, move_files=False, parsed_dir:str=None, streaming=False, workers=1):
     parsed_reports_dir = os.path.join(directory, 'parsed_reports') if not parsed_dir else parsed_dir
+    xml_files = [os.path.join(directory, filename) for filename in os.listdir(directory) if filename.endswith('.xml')]
 
-    for filename in os.listdir(directory):
-        if filename.endswith('.xml'):
-            xml_file = os.path.join(directory, filename)
+    for index, xml_file, report_data, error in iter_parsed_files(xml_files, streaming, workers):
+        if error is not None:
+            print(f"error: {error}\nfile: {xml_file}")
+            continue
+
+        # Move the file only after the consumer has handled the report
+        yield index, report_data
+
+        if move_files:
             try:
-                report_data = dmarc_xml_to_dict(xml_file)
-                report_list.append(report_data)
-
-                if move_files:
-                    if not os.path.exists(parsed_reports_dir):
-                        os.makedirs(parsed_reports_dir)
-                    parsed_filename = os.path.join(parsed_reports_dir, filename)
-                    shutil.move(xml_file, parsed_filename)
-                    
+                if not os.path.exists(parsed_reports_dir):
+                    os.makedirs(parsed_reports_dir)
+                parsed_filename = os.path.join(parsed_reports_dir, os.path.basename(xml_file))
+                shutil.move(xml_file, parsed_filename)
             except Exception as e:
                 print(f"error: {e}\nfile: {xml_file}")
 
-    return report_list
+def iter_dmarc_reports_dir(directory: str, move_files=False, parsed_dir:str=None, streaming=False, workers=1):
+    """
+    Parse DMARC reports from XML files in a directory, one file at a time.
 
+    Parameters:
+    - directory: The directory containing DMARC XML files.
+    - move_files: If True, move the files into dir/parsed_reports
+    - parsed_dir: Directory where parsed files will be moved (if move_files=True).
+    - streaming: If True, parse each file with the streaming parser (see dmarc_xml_to_dict).
+    - workers: Number of worker processes. With more than one, reports are yielded as they finish.
+
+    Yields:
+    - report_data: A dictionary representing a parsed DMARC report.
+    """
+    for index, report_data in _iter_dmarc_reports_dir(directory, move_files, parsed_dir, streaming, workers):
+        yield report_data
 
+def parse_dmarc_reports_dir(directory: str, move_files=False, parsed_dir:str=None, streaming=False, workers=1):
+    """
+    Parse DMARC reports from XML files in a directory.
 
-    
\ No newline at end of file
+    Parameters:
+    - directory: The directory containing DMARC XML files.
+    - move_files: If True, move the files into dir/parsed_reports
+    - parsed_dir: Directory where parsed files will be moved (if move_files=True).
+    - streaming: If True, parse each file with the streaming parser (see dmarc_xml_to_dict).
+    - workers: Number of worker processes. The result is in the same order as with a single worker.
+
+    Returns:
+    - report_list: A list of dictionaries representing the parsed DMARC reports.
+    """
+    results = sorted(_iter_dmarc_reports_dir(directory, move_files, parsed_dir, streaming, workers), key=lambda result: result[0])
+    return [report_data for index, report_data in results]
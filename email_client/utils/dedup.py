@@ -0,0 +1,118 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_last_seen ON seen (last_seen);
+"""
+
+def payload_key(payload):
+    """
+    Dedup key of a raw (compressed) attachment.
+    """
+    return "sha256:" + hashlib.sha256(payload).hexdigest()
+
+def file_key(path):
+    """
+    Dedup key of an attachment saved on disk, hashed in 1 MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return "sha256:" + digest.hexdigest()
+
+def report_key(feedback):
+    """
+    Dedup key of a parsed report, from its (org_name, report_id).
+    """
+    metadata = feedback.get("report_metadata") or {}
+    return f"report:{metadata.get('org_name')}/{metadata.get('report_id')}"
+
+class DedupIndex:
+    """
+    Persistent SQLite index of attachments and reports that were already handled.
+    Entries expire after ttl_seconds, and once more than max_entries are stored the
+    least recently seen ones are evicted.
+    """
+    def __init__(self, path, max_entries=200000, ttl_seconds=90 * 24 * 3600):
+        """
+        Initialize the DedupIndex object.
+
+        Args:
+            path (str): The SQLite database file.
+            max_entries (int): Maximum number of stored keys (default is 200000).
+            ttl_seconds (float): Seconds after which a key is forgotten (default is 90 days).
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.size = self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def seen(self, key):
+        """
+        Check whether a key was handled before, refreshing its LRU position when it was.
+
+        Returns:
+            bool: True if the key is stored and not expired.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT created_at FROM seen WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            if now - row[0] > self.ttl_seconds:
+                self.db.execute("DELETE FROM seen WHERE key = ?", (key,))
+                self.size -= 1
+                return False
+            self.db.execute("UPDATE seen SET last_seen = ? WHERE key = ?", (now, key))
+            return True
+
+    def add(self, *keys):
+        """
+        Record keys as handled, evicting the least recently seen keys beyond max_entries.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for key in keys:
+                    inserted = self.db.execute(
+                        "INSERT OR IGNORE INTO seen (key, created_at, last_seen) VALUES (?, ?, ?)",
+                        (key, now, now)).rowcount
+                    self.size += inserted
+                if self.size > self.max_entries:
+                    self.size -= self.db.execute(
+                        "DELETE FROM seen WHERE key IN (SELECT key FROM seen ORDER BY last_seen LIMIT ?)",
+                        (self.size - self.max_entries,)).rowcount
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def purge_expired(self):
+        """
+        Delete every expired key.
+
+        Returns:
+            int: The number of deleted keys.
+        """
+        with self.lock:
+            deleted = self.db.execute("DELETE FROM seen WHERE created_at < ?",
+                                      (time.time() - self.ttl_seconds,)).rowcount
+            self.size -= deleted
+            return deleted
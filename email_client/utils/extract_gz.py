@@ -1,6 +1,13 @@
 import gzip
+import io
 import shutil
 import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.dedup import file_key
+from utils.metrics import FAILURES
+
+ATTACHMENT_TYPES = ('.xml.gz', '.gz', '.zip', '.xml')
 
 def extract_gz(file_path, save_directory="."):
     """
@@ -23,22 +30,66 @@ def extract_gz(file_path, save_directory="."):
         print("Error extracting Gzip file:", e)
         return None
     
-def multiple_extract_gz(directory, save_directory="."):
+def multiple_extract_gz(directory, save_directory=".", workers=1, dedup=None):
     """
     Extract multiple Gzip files in a directory to the specified directory.
 
     Args:
         directory (str): The directory containing Gzip files.
         save_directory (str): The directory to save the extracted files (default is '.').
+        workers (int): Number of worker processes used to decompress files (default is 1).
+        dedup (DedupIndex): If set, files whose SHA-256 was already extracted are skipped,
+            and extracted files are recorded (default is None).
 
     Returns:
         list: A list of paths to the extracted files.
     """
-    extracted_files = []
-    for filename in os.listdir(directory):
-        if filename.endswith('.gz'):
-            gz_file = os.path.join(directory, filename)
-            extracted_file = extract_gz(gz_file, save_directory)
-            if extracted_file:
-                extracted_files.append(extracted_file)
-    return extracted_files
\ No newline at end of file
+    gz_files = [os.path.join(directory, filename) for filename in os.listdir(directory) if filename.endswith('.gz')]
+    keys = {}
+    if dedup:
+        keys = {gz_file: file_key(gz_file) for gz_file in gz_files}
+        gz_files = [gz_file for gz_file in gz_files if not dedup.seen(keys[gz_file])]
+
+    if workers and workers > 1:
+        extracted = [None] * len(gz_files)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(extract_gz, gz_file, save_directory): index for index, gz_file in enumerate(gz_files)}
+            for future in as_completed(futures):
+                try:
+                    extracted[futures[future]] = future.result()
+                except Exception as e:
+                    print("Error extracting Gzip file:", e)
+    else:
+        extracted = [extract_gz(gz_file, save_directory) for gz_file in gz_files]
+    # Workers may run in other processes, so failures are counted here
+    FAILURES.labels("decompress").inc(extracted.count(None))
+
+    if dedup:
+        dedup.add(*(keys[gz_file] for gz_file, extracted_file in zip(gz_files, extracted) if extracted_file))
+    return [extracted_file for extracted_file in extracted if extracted_file]
+
+def iter_xml_from_attachment(filename, payload):
+    """
+    Decompress an attachment in memory and yield its XML reports as file objects.
+    Gzip and zip members are decompressed lazily while they are read, so nothing
+    is written to disk.
+
+    Args:
+        filename (str): The attachment filename, used to pick the decompressor.
+        payload (bytes): The raw attachment bytes.
+
+    Yields:
+        tuple: The XML filename and a binary file object with its contents.
+    """
+    name = filename.lower()
+    if name.endswith('.zip'):
+        with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+            for member in archive.namelist():
+                if member.lower().endswith('.xml'):
+                    with archive.open(member) as xml_file:
+                        yield member, xml_file
+    elif name.endswith('.gz'):
+        with gzip.GzipFile(fileobj=io.BytesIO(payload)) as xml_file:
+            yield os.path.basename(filename)[:-3], xml_file
+    else:
+        yield filename, io.BytesIO(payload)
@@ -0,0 +1,25 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+MESSAGES_FETCHED = Counter("dmarc_ingest_messages_fetched", "Mailbox messages downloaded.", ["client"])
+ATTACHMENTS_FETCHED = Counter("dmarc_ingest_attachments_fetched", "Report attachments downloaded.", ["client"])
+BYTES_DOWNLOADED = Counter("dmarc_ingest_downloaded_bytes", "Bytes of report attachments downloaded.", ["client"])
+DECOMPRESS_SECONDS = Histogram("dmarc_ingest_decompress_seconds", "Time to decompress one attachment.")
+PARSE_SECONDS = Histogram("dmarc_ingest_parse_seconds", "Time to parse one report XML document.")
+UPLOAD_SECONDS = Histogram(
+    "dmarc_ingest_upload_seconds",
+    "Time of one request to the bulk endpoint.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REPORTS_SPOOLED = Counter("dmarc_ingest_reports_spooled", "Parsed reports stored in the spool.")
+REPORTS_UPLOADED = Counter("dmarc_ingest_reports_uploaded", "Reports sent in successful bulk requests.")
+QUEUE_DEPTH = Gauge("dmarc_ingest_queue_depth", "Items waiting in an ingest queue.", ["queue"])
+FAILURES = Counter("dmarc_ingest_failures", "Errors by pipeline stage.", ["stage"])
+
+
+def start_metrics_server(port):
+    """
+    Serve the metrics over HTTP for Prometheus, in a background thread. Does nothing when port is 0.
+    """
+    if port:
+        start_http_server(port)
+        print(f"Serving metrics on port {port}")
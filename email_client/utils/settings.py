@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass, field
+from utils.spool import ReportSpool
+from utils.dedup import DedupIndex
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+@dataclass
+class IngestSettings:
+    """
+    Endpoint, credentials and tuning options for uploading reports to the API.
+    Values are read from the environment by from_env().
+    """
+    api_url: str = "http://localhost:8000/api/v1"
+    api_key: str = ""
+    upload_batch_size: int = 100
+    upload_concurrency: int = 2
+    upload_batch_timeout: float = 2.0
+    http2: bool = True
+    parse_workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    queue_size: int = 100
+    poll_interval: int = 300
+    archive_dir: str = None
+    spool_path: str = ".spool.sqlite3"
+    spool_max_attempts: int = 8
+    spool_retry_delay: float = 30
+    dedup_path: str = ".dedup.sqlite3"
+    dedup_max_entries: int = 200000
+    dedup_ttl_days: float = 90
+    metrics_port: int = 0
+
+    @property
+    def bulk_url(self):
+        return f"{self.api_url.rstrip('/')}/aggregated_report/bulk"
+
+    @property
+    def headers(self):
+        return {"X-API-Key": self.api_key}
+
+    def create_spool(self):
+        """
+        Open the report spool configured by spool_path and spool_*.
+        """
+        return ReportSpool(self.spool_path, max_attempts=self.spool_max_attempts, base_delay=self.spool_retry_delay)
+
+    def create_dedup(self):
+        """
+        Open the dedup index configured by dedup_*, or return None when DEDUP_PATH is empty.
+        """
+        if not self.dedup_path:
+            return None
+        return DedupIndex(self.dedup_path, max_entries=self.dedup_max_entries, ttl_seconds=self.dedup_ttl_days * 24 * 3600)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the settings from API_URL, API_KEY, UPLOAD_*, PARSE_WORKERS, INGEST_QUEUE_SIZE,
+        POLL_INTERVAL, ARCHIVE_DIR, SPOOL_*, DEDUP_* and METRICS_PORT, keeping the defaults for unset variables.
+        """
+        defaults = cls()
+        return cls(
+            api_url=os.getenv("API_URL", defaults.api_url),
+            api_key=os.getenv("API_KEY", defaults.api_key),
+            upload_batch_size=int(os.getenv("UPLOAD_BATCH_SIZE", defaults.upload_batch_size)),
+            upload_concurrency=int(os.getenv("UPLOAD_CONCURRENCY", defaults.upload_concurrency)),
+            upload_batch_timeout=float(os.getenv("UPLOAD_BATCH_TIMEOUT", defaults.upload_batch_timeout)),
+            http2=_env_bool("UPLOAD_HTTP2", defaults.http2),
+            parse_workers=int(os.getenv("PARSE_WORKERS", defaults.parse_workers)),
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", defaults.queue_size)),
+            poll_interval=int(os.getenv("POLL_INTERVAL", defaults.poll_interval)),
+            archive_dir=os.getenv("ARCHIVE_DIR", defaults.archive_dir),
+            spool_path=os.getenv("SPOOL_PATH", defaults.spool_path),
+            spool_max_attempts=int(os.getenv("SPOOL_MAX_ATTEMPTS", defaults.spool_max_attempts)),
+            spool_retry_delay=float(os.getenv("SPOOL_RETRY_DELAY", defaults.spool_retry_delay)),
+            dedup_path=os.getenv("DEDUP_PATH", defaults.dedup_path),
+            dedup_max_entries=int(os.getenv("DEDUP_MAX_ENTRIES", defaults.dedup_max_entries)),
+            dedup_ttl_days=float(os.getenv("DEDUP_TTL_DAYS", defaults.dedup_ttl_days)),
+            metrics_port=int(os.getenv("METRICS_PORT", defaults.metrics_port)),
+        )
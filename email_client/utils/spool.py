@@ -0,0 +1,262 @@
+import json
+import random
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+FAILED = 'failed'
+DEAD = 'dead'
+STATES = (PENDING, IN_FLIGHT, FAILED, DEAD)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    org_name TEXT,
+    report_id TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_state_next_attempt ON reports (state, next_attempt_at);
+"""
+
+class ReportSpool:
+    """
+    Durable SQLite spool between parsing and upload.
+
+    Reports move through pending -> in_flight -> (deleted on success | failed -> ... | dead).
+    Failed uploads are retried with exponential backoff and full jitter, and reports
+    that fail max_attempts times (or are rejected as invalid) move to the dead-letter
+    state until they are replayed.
+    """
+    def __init__(self, path, max_attempts=8, base_delay=30, max_delay=3600):
+        """
+        Initialize the ReportSpool object.
+
+        Args:
+            path (str): The SQLite database file.
+            max_attempts (int): Attempts before a report is dead-lettered (default is 8).
+            base_delay (float): Backoff delay in seconds after the first failure (default is 30).
+            max_delay (float): Upper bound of the backoff delay in seconds (default is 3600).
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run statements in one write transaction, serialised across threads.
+        """
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def backoff(self, attempts):
+        """
+        Seconds to wait before the next attempt: full jitter over base_delay * 2^(attempts-1).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def enqueue(self, reports):
+        """
+        Durably store parsed reports as pending.
+
+        Args:
+            reports (list): The parsed 'feedback' dictionaries.
+
+        Returns:
+            int: The number of reports stored.
+        """
+        now = time.time()
+        rows = [
+            ((report.get("report_metadata") or {}).get("org_name"),
+             (report.get("report_metadata") or {}).get("report_id"),
+             json.dumps(report), PENDING, now, now, now)
+            for report in reports
+        ]
+        with self.transaction():
+            self.db.executemany(
+                "INSERT INTO reports (org_name, report_id, payload, state, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def claim(self, limit):
+        """
+        Move up to limit reports that are due (pending, or failed with an elapsed backoff) to in_flight.
+
+        Returns:
+            list: (id, report) tuples.
+        """
+        now = time.time()
+        with self.transaction():
+            rows = self.db.execute(
+                "SELECT id, payload FROM reports WHERE state IN (?, ?) AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?", (PENDING, FAILED, now, limit)).fetchall()
+            self.db.executemany("UPDATE reports SET state = ?, updated_at = ? WHERE id = ?",
+                                [(IN_FLIGHT, now, row[0]) for row in rows])
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def ack(self, ids):
+        """
+        Remove successfully uploaded reports from the spool.
+        """
+        with self.transaction():
+            self.db.executemany("DELETE FROM reports WHERE id = ?", [(i,) for i in ids])
+
+    def fail(self, ids, error, permanent=False):
+        """
+        Record a failed upload. Reports are rescheduled with backoff, or dead-lettered
+        when permanent is True or they reached max_attempts.
+        """
+        now = time.time()
+        with self.transaction():
+            for spool_id in ids:
+                row = self.db.execute("SELECT attempts FROM reports WHERE id = ?", (spool_id,)).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                if permanent or attempts >= self.max_attempts:
+                    state, next_attempt_at = DEAD, now
+                else:
+                    state, next_attempt_at = FAILED, now + self.backoff(attempts)
+                self.db.execute(
+                    "UPDATE reports SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                    "WHERE id = ?", (state, attempts, next_attempt_at, str(error), now, spool_id))
+
+    def recover(self):
+        """
+        Return reports left in_flight by a crash or restart to pending.
+
+        Returns:
+            int: The number of recovered reports.
+        """
+        with self.transaction():
+            return self.db.execute("UPDATE reports SET state = ?, updated_at = ? WHERE state = ?",
+                                   (PENDING, time.time(), IN_FLIGHT)).rowcount
+
+    def replay(self, ids=None):
+        """
+        Move dead-lettered reports back to pending with their attempts reset.
+
+        Args:
+            ids (list): The spool ids to replay (default is None, which replays every dead report).
+
+        Returns:
+            int: The number of replayed reports.
+        """
+        now = time.time()
+        query = "UPDATE reports SET state = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE state = ?"
+        params = [PENDING, now, now, DEAD]
+        if ids:
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        with self.transaction():
+            return self.db.execute(query, params).rowcount
+
+    def purge(self, state=DEAD):
+        """
+        Delete every report in a state.
+
+        Returns:
+            int: The number of deleted reports.
+        """
+        with self.transaction():
+            return self.db.execute("DELETE FROM reports WHERE state = ?", (state,)).rowcount
+
+    def counts(self):
+        """
+        Return the number of reports per state.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT state, COUNT(*) FROM reports GROUP BY state").fetchall()
+        counts = {state: 0 for state in STATES}
+        counts.update(dict(rows))
+        return counts
+
+    def due(self):
+        """
+        Return the number of reports that can be claimed now.
+        """
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM reports WHERE state IN (?, ?) AND next_attempt_at <= ?",
+                                   (PENDING, FAILED, time.time())).fetchone()[0]
+
+    def list(self, state=None, limit=50):
+        """
+        List spooled reports without their payload.
+
+        Returns:
+            list: Dictionaries with id, org_name, report_id, state, attempts, next_attempt_at and last_error.
+        """
+        query = "SELECT id, org_name, report_id, state, attempts, next_attempt_at, last_error FROM reports"
+        params = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        keys = ("id", "org_name", "report_id", "state", "attempts", "next_attempt_at", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get(self, spool_id):
+        """
+        Return the stored report payload, or None.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT payload FROM reports WHERE id = ?", (spool_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+def settle_upload(spool, ids, results):
+    """
+    Apply the per-report results of a bulk upload to the spool.
+    Created and already existing reports are acknowledged, invalid reports are
+    dead-lettered (retrying them cannot succeed) and reports missing from the
+    results are retried.
+
+    Args:
+        spool (ReportSpool): The spool the reports were claimed from.
+        ids (list): The spool ids, in the order the reports were sent.
+        results (list): The 'results' list returned by the bulk endpoint.
+
+    Returns:
+        list: The results of the invalid reports.
+    """
+    by_index = {result["index"]: result for result in results}
+    done, retry, invalid = [], [], []
+    for index, spool_id in enumerate(ids):
+        result = by_index.get(index)
+        if result is None:
+            retry.append(spool_id)
+        elif result["status"] in ("created", "already_exists"):
+            done.append(spool_id)
+        else:
+            invalid.append(result)
+            spool.fail([spool_id], result.get("detail"), permanent=True)
+    spool.ack(done)
+    if retry:
+        spool.fail(retry, "missing from bulk response")
+    return invalid
@@ -1,5 +1,7 @@
+import io
 import xmltodict
 import json
+from xml.etree.ElementTree import iterparse
 
 def xml_to_dict(xml_filename, **kwargs):
     """
@@ -18,21 +20,174 @@ def xml_to_dict(xml_filename, **kwargs):
     return data_dict
 
 
-def dmarc_xml_to_dict(xml_filename):
+def _local_name(tag):
+    """
+    Strip the '{namespace}' prefix ElementTree adds to namespaced tags.
+    """
+    return tag.rsplit('}', 1)[-1]
+
+
+def element_to_dict(element):
+    """
+    Convert an ElementTree element to the structure xmltodict.parse() produces.
+    Repeated child tags become lists, attributes are stored under '@name' keys
+    and elements without children or attributes become their stripped text (or None).
+    
+    Parameters:
+    - element: The ElementTree element to convert.
+    
+    Returns:
+    - value: A dictionary, a string or None.
+    """
+    children = list(element)
+    text = element.text.strip() if element.text else None
+    if not children and not element.attrib:
+        return text or None
+
+    value = {f"@{_local_name(k)}": v for k, v in element.attrib.items()}
+    for child in children:
+        tag = _local_name(child.tag)
+        child_value = element_to_dict(child)
+        if tag in value:
+            if not isinstance(value[tag], list):
+                value[tag] = [value[tag]]
+            value[tag].append(child_value)
+        else:
+            value[tag] = child_value
+    if text:
+        value["#text"] = text
+    return value
+
+
+def iter_dmarc_xml(xml_file):
+    """
+    Stream a DMARC XML report without loading the whole document.
+    Elements are converted and cleared as soon as they are parsed, so neither
+    the file contents nor the element tree are held in memory, only the
+    dictionaries of the records the caller keeps.
+    
+    Parameters:
+    - xml_file: A filename or a binary file object with the DMARC XML report.
+    
+    Yields:
+    - ('metadata', dict) once, holding every top-level element except the records.
+    - ('record', dict) for each record.
+    """
+    metadata = {}
+    metadata_sent = False
+    depth = 0
+    root = None
+
+    for event, element in iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        tag = _local_name(element.tag)
+        value = element_to_dict(element)
+        root.clear()
+
+        if tag != "record":
+            metadata[tag] = value
+            continue
+
+        if not metadata_sent:
+            yield "metadata", metadata
+            metadata_sent = True
+        yield "record", value
+
+    if not metadata_sent:
+        yield "metadata", metadata
+
+
+def _as_list(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+
+def normalize_feedback(feedback):
+    """
+    Coerce the elements a DMARC report may repeat to lists, in place: the records,
+    report_metadata errors, policy override reasons and DKIM/SPF auth results.
+    The API can then build reports from the parsed dictionary without coercing
+    every record again.
+    
+    Parameters:
+    - feedback: The 'feedback' dictionary of a parsed report.
+    
+    Returns:
+    - feedback: The same dictionary.
+    """
+    if not isinstance(feedback, dict):
+        return feedback
+    metadata = feedback.get("report_metadata")
+    if isinstance(metadata, dict) and "error" in metadata:
+        metadata["error"] = _as_list(metadata["error"])
+    feedback["record"] = _as_list(feedback.get("record")) or []
+    for record in feedback["record"]:
+        if not isinstance(record, dict):
+            continue
+        policy_evaluated = (record.get("row") or {}).get("policy_evaluated")
+        if isinstance(policy_evaluated, dict) and "reason" in policy_evaluated:
+            policy_evaluated["reason"] = _as_list(policy_evaluated["reason"])
+        auth_results = record.get("auth_results")
+        if isinstance(auth_results, dict):
+            for method in ("dkim", "spf"):
+                if method in auth_results:
+                    auth_results[method] = _as_list(auth_results[method])
+    return feedback
+
+
+def dmarc_xml_to_dict(xml_filename, streaming=False):
     """
     Convert DMARC XML report to Python dictionary.
-    Ensures that the 'record' key is always a list.
+    Repeatable elements, including 'record', are always lists (see normalize_feedback()).
     
     Parameters:
     - xml_filename: The filename of the input DMARC XML report.
+    - streaming: If True, build the dictionary with iter_dmarc_xml() instead of
+      reading the whole file into a string first. The returned dictionary still
+      holds every record, as the API takes each report in a single document.
     
     Returns:
     - dmarc_dict: Python dictionary representing the DMARC XML report data.
     """
+    if streaming:
+        feedback = {}
+        records = []
+        for kind, value in iter_dmarc_xml(xml_filename):
+            if kind == "metadata":
+                feedback.update(value)
+            else:
+                records.append(value)
+        feedback["record"] = records
+        return {"feedback": normalize_feedback(feedback)}
+
     dmarc_dict = xml_to_dict(xml_filename, process_namespaces=True, force_list=["record"])
+    normalize_feedback(dmarc_dict.get("feedback"))
 
     return dmarc_dict
 
+def dmarc_xml_bytes_to_feedback(xml_bytes):
+    """
+    Parse an in-memory DMARC XML report with the streaming parser.
+    Defined at module level so it can run in a worker process.
+    
+    Parameters:
+    - xml_bytes: The XML report as bytes.
+    
+    Returns:
+    - feedback: The 'feedback' dictionary of the report.
+    """
+    return dmarc_xml_to_dict(io.BytesIO(xml_bytes), streaming=True).get("feedback")
+
 def dict_to_json(data_dict):
     """
     Convert Python dictionary to JSON string.
@@ -12,23 +12,24 @@ import {
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend)
 
-const DMARCBarchart = ({ reports }) => {
+// Stacks the message count per day and disposition from the daily_counts rows
+// of the stats API; days are the UTC day the reports begin.
+const DMARCBarchart = ({ dailyCounts }) => {
   const [chartData, setChartData] = useState(null)
   const processData = () => {
-    if (!reports) return
+    if (!dailyCounts) return
     const dataByDate = {}
-    reports.forEach((report) => {
-      const dateBegin = new Date(report.report_metadata.date_range.begin)
-      const dateKey = `${String(dateBegin.getDate()).padStart(2, '0')}-${String(dateBegin.getMonth() + 1).padStart(2, '0')}-${dateBegin.getFullYear()}`
+    dailyCounts.forEach(({ day, disposition, count }) => {
+      // The API returns UTC midnights, with or without an offset, so the
+      // date part is read from the string rather than in local time.
+      const dateKey = day.split('T')[0].split('-').reverse().join('-')
 
       if (!dataByDate[dateKey]) {
         dataByDate[dateKey] = { none: 0, quarantine: 0, reject: 0 }
       }
-
-      report.record.forEach((record) => {
-        const disposition = record.row.policy_evaluated.disposition
-        dataByDate[dateKey][disposition]++
-      })
+      if (disposition in dataByDate[dateKey]) {
+        dataByDate[dateKey][disposition] += count
+      }
     })
 
     const labels = Object.keys(dataByDate)
@@ -51,7 +52,7 @@ const DMARCBarchart = ({ reports }) => {
 
   useEffect(() => {
     processData()
-  }, [reports])
+  }, [dailyCounts])
 
   return (
     <div className="flex flex-col w-full items-center h-fit bg-blue-gray-700 text-white p-5 rounded-md shadow-lg">
@@ -1,38 +1,13 @@
 import React, { useEffect, useRef, useState } from 'react'
 import L from 'leaflet'
 import 'leaflet/dist/leaflet.css'
-import axios from 'axios'
 import MapLegend from './MapLegend'
 import worldGeoJSON from '@src/assets/maps/world.geo.json'
 
-const fetchCountriesByIP = async (ips) => {
-  const results = []
-  for (const chunk of ips) {
-    try {
-      const response = await axios.post('http://ip-api.com/batch', chunk, {
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      })
-      results.push(...response.data)
-
-      const remainingRequests = parseInt(response.headers['x-rl'], 10)
-      const timeToReset = parseInt(response.headers['x-ttl'], 10)
-
-      if (remainingRequests === 0) {
-        await new Promise((resolve) => setTimeout(resolve, timeToReset * 1000))
-      }
-    } catch (error) {
-      console.error('Error fetching IP data:', error)
-    }
-  }
-  return results
-}
-
-const ChoroplethMap = ({ ipData }) => {
+// countryData maps country names to message counts, as returned by the API
+const ChoroplethMap = ({ countryData }) => {
   const mapRef = useRef(null)
   const mapInstance = useRef(null)
-  const [countryData, setCountryData] = useState(null)
   const [geoJsonData, setGeoJsonData] = useState(null)
 
   useEffect(() => {
@@ -45,36 +20,6 @@ const ChoroplethMap = ({ ipData }) => {
       }).addTo(mapInstance.current)
     }
 
-    const getCountries = async () => {
-      const ipList = Object.keys(ipData)
-      const chunks = []
-
-      for (let i = 0; i < ipList.length; i += 100) {
-        chunks.push(ipList.slice(i, i + 100 - 1).map((ip) => ({ query: ip })))
-      }
-
-      const countryFrequency = {}
-      let requestsCount = 0
-
-      for (const chunk of chunks) {
-        if (requestsCount >= 15) {
-          await new Promise((resolve) => setTimeout(resolve, 60000))
-          requestsCount = 0
-        }
-
-        const ipInfos = await fetchCountriesByIP([chunk])
-
-        ipInfos.forEach((info) => {
-          if (info.status === 'success') {
-            const country = info.country
-            countryFrequency[country] =
-              (countryFrequency[country] || 0) + ipData[info.query]
-          }
-        })
-      }
-      setCountryData(countryFrequency)
-    }
-    getCountries()
     setGeoJsonData(worldGeoJSON)
 
     return () => {
@@ -83,7 +28,7 @@ const ChoroplethMap = ({ ipData }) => {
         mapInstance.current = null
       }
     }
-  }, [ipData])
+  }, [countryData])
 
   useEffect(() => {
     if (geoJsonData && countryData && mapInstance.current) {
@@ -14,6 +14,25 @@ const generateBackgroundColor = (numColors) => {
   return colors
 }
 
+// Sum the message count per evaluated policy value, either from full records
+// or from the policy_result_counts rows of the stats API. Records without a
+// value are counted under the first label.
+const countPolicyEvaluated = (records, stats, field, labels) => {
+  const counts = Object.fromEntries(labels.map((label) => [label, 0]))
+  const add = (value, count) => {
+    const label = value || labels[0]
+    counts[label] = (counts[label] || 0) + count
+  }
+  if (stats) {
+    stats.forEach((row) => add(row[field], row.count))
+  } else {
+    records.forEach((record) =>
+      add(record.row?.policy_evaluated?.[field], record.row.count),
+    )
+  }
+  return counts
+}
+
 function AuthResultsChart({ records, type = 'dkim' }) {
   // Objeto para contar los resultados
   const resultCounts = {
@@ -114,45 +133,18 @@ function AuthResultsChart({ records, type = 'dkim' }) {
   )
 }
 
-export function DMARCResultsChart({ records }) {
-  const resultLabels = records.reduce(
-    (labels, record) => {
-      const result =
-        record.row &&
-        record.row.policy_evaluated &&
-        record.row.policy_evaluated.disposition
-          ? record.row.policy_evaluated.disposition
-          : null
-      if (result && !labels.includes(result)) {
-        labels.push(result)
-      }
-      return labels
-    },
-    ['quarantine', 'reject', 'none'],
-  )
+export function DMARCResultsChart({ records = [], stats }) {
+  const counts = countPolicyEvaluated(records, stats, 'disposition', [
+    'quarantine',
+    'reject',
+    'none',
+  ])
 
   const data = {
-    labels: resultLabels,
+    labels: Object.keys(counts),
     datasets: [
       {
-        data: records.reduce(
-          (acc, record) => {
-            const result =
-              record.row &&
-              record.row.policy_evaluated &&
-              record.row.policy_evaluated.disposition
-                ? record.row.policy_evaluated.disposition
-                : null
-            if (result) {
-              acc[resultLabels.indexOf(result)] += record.row.count
-            } else {
-              acc[0] += record.row.count
-            }
-            return acc
-          },
-          Array(resultLabels.length + 1).fill(0),
-        ),
-
+        data: Object.values(counts),
         backgroundColor: [
           'rgba(54, 162, 235, 0.2)',
           'rgba(255, 99, 132, 0.2)',
@@ -205,45 +197,14 @@ export function DMARCResultsChart({ records }) {
   )
 }
 
-export function PolicyEvaluatedChart({ records, type = 'dkim' }) {
-  const resultLabels = records.reduce(
-    (labels, record) => {
-      const result =
-        record.row &&
-        record.row.policy_evaluated &&
-        record.row.policy_evaluated[type]
-          ? record.row.policy_evaluated[type]
-          : null
-      if (result && !labels.includes(result)) {
-        labels.push(result)
-      }
-      return labels
-    },
-    ['pass', 'fail'],
-  )
+export function PolicyEvaluatedChart({ records = [], stats, type = 'dkim' }) {
+  const counts = countPolicyEvaluated(records, stats, type, ['pass', 'fail'])
 
   const data = {
-    labels: resultLabels,
+    labels: Object.keys(counts),
     datasets: [
       {
-        data: records.reduce(
-          (acc, record) => {
-            const result =
-              record.row &&
-              record.row.policy_evaluated &&
-              record.row.policy_evaluated[type]
-                ? record.row.policy_evaluated[type]
-                : null
-            if (result) {
-              acc[resultLabels.indexOf(result)] += record.row.count
-            } else {
-              acc[0] += record.row.count
-            }
-            return acc
-          },
-          Array(resultLabels.length + 1).fill(0),
-        ),
-
+        data: Object.values(counts),
         backgroundColor: [
           'rgba(54, 162, 235, 0.2)',
           'rgba(255, 99, 132, 0.2)',
@@ -91,11 +91,57 @@ type DmarcReport = {
   record: RecordType[] | RecordType
 }
 
+type DmarcReportTotals = {
+  record_count: number
+  message_count: number
+  dkim_pass: number
+  dkim_fail: number
+  spf_pass: number
+  spf_fail: number
+  disposition_none: number
+  disposition_quarantine: number
+  disposition_reject: number
+}
+
+type DmarcReportSummary = Omit<DmarcReport, 'record'> & DmarcReportTotals
+
+// Summaries from the API already carry the totals; full reports are summed here.
+function reportTotals(
+  report: DmarcReport | DmarcReportSummary,
+): DmarcReportTotals {
+  if ('message_count' in report) {
+    return report
+  }
+  const records = ([] as RecordType[]).concat(report.record)
+  const sum = (matches: (record: RecordType) => boolean) =>
+    records.reduce((a, b) => a + (matches(b) ? b.row.count : 0), 0)
+  const messageCount = sum(() => true)
+  const dkimPass = sum((r) => r.row?.policy_evaluated?.dkim === 'pass')
+  const spfPass = sum((r) => r.row?.policy_evaluated?.spf === 'pass')
+  return {
+    record_count: records.length,
+    message_count: messageCount,
+    dkim_pass: dkimPass,
+    dkim_fail: messageCount - dkimPass,
+    spf_pass: spfPass,
+    spf_fail: messageCount - spfPass,
+    disposition_none: sum(
+      (r) => r.row?.policy_evaluated?.disposition === 'none',
+    ),
+    disposition_quarantine: sum(
+      (r) => r.row?.policy_evaluated?.disposition === 'quarantine',
+    ),
+    disposition_reject: sum(
+      (r) => r.row?.policy_evaluated?.disposition === 'reject',
+    ),
+  }
+}
+
 export function DmarcReportsTable({
   reportsData,
   pageSize = 10,
 }: {
-  reportsData: DmarcReport[]
+  reportsData: (DmarcReport | DmarcReportSummary)[]
 }) {
   const rerender = React.useReducer(() => ({}), {})[1]
   const navigate = useNavigate()
@@ -104,7 +150,9 @@ export function DmarcReportsTable({
     navigate(`/report/${id}`)
   }
 
-  const columns = React.useMemo<ColumnDef<DmarcReport>[]>(
+  const columns = React.useMemo<
+    ColumnDef<DmarcReport | DmarcReportSummary>[]
+  >(
     () => [
       {
         header: 'Report',
@@ -146,95 +194,39 @@ export function DmarcReportsTable({
       },
       {
         header: 'Total Records',
-        accessorFn: (report) => {
-          const records = Array.isArray(report.record)
-            ? report.record
-            : [report.record]
-          return records.length
-        },
+        accessorFn: (report) => reportTotals(report).record_count,
       },
       {
         header: 'Total Emails',
-        accessorFn: (row) => {
-          const records = Array.isArray(row.record) ? row.record : [row.record]
-          return records.reduce((a, b) => a + b.row.count, 0)
-        },
+        accessorFn: (report) => reportTotals(report).message_count,
       },
       {
         header: 'SPF Pass',
-        accessorFn: (row) =>
-          (Array.isArray(row.record) ? row.record : [row.record]).reduce(
-            (a, b) =>
-              a + (b.row?.policy_evaluated?.spf === 'pass' ? b.row.count : 0),
-            0,
-          ),
+        accessorFn: (report) => reportTotals(report).spf_pass,
       },
       {
         header: 'SPF Fail',
-        accessorFn: (row) =>
-          (Array.isArray(row.record) ? row.record : [row.record]).reduce(
-            (a, b) =>
-              a + (b.row?.policy_evaluated?.spf !== 'pass' ? b.row.count : 0),
-            0,
-          ),
+        accessorFn: (report) => reportTotals(report).spf_fail,
       },
       {
         header: 'DKIM Pass',
-        accessorFn: (row) =>
-          (Array.isArray(row.record) ? row.record : [row.record]).reduce(
-            (a, b) =>
-              a + (b.row?.policy_evaluated?.dkim === 'pass' ? b.row.count : 0),
-            0,
-          ),
+        accessorFn: (report) => reportTotals(report).dkim_pass,
       },
       {
         header: 'DKIM Fail',
-        accessorFn: (row) =>
-          (Array.isArray(row.record) ? row.record : [row.record]).reduce(
-            (a, b) =>
-              a + (b.row?.policy_evaluated?.dkim !== 'pass' ? b.row.count : 0),
-            0,
-          ),
+        accessorFn: (report) => reportTotals(report).dkim_fail,
       },
       {
         header: 'Policy: None',
-        accessorFn: (row) =>
-          (Array.isArray(row.record) ? row.record : [row.record]).reduce(
-            (a, b) =>
-              a +
-              (b.row?.policy_evaluated?.disposition === 'none'
-                ? b.row.count
-                : 0),
-            0,
-          ),
+        accessorFn: (report) => reportTotals(report).disposition_none,
       },
       {
         header: 'Policy: Quarantine',
-        accessorFn: (row) =>
-          ([] as RecordType[])
-            .concat(row.record)
-            .reduce(
-              (a, b) =>
-                a +
-                (b.row?.policy_evaluated?.disposition === 'quarantine'
-                  ? b.row.count
-                  : 0),
-              0,
-            ),
+        accessorFn: (report) => reportTotals(report).disposition_quarantine,
       },
       {
         header: 'Policy: Reject',
-        accessorFn: (row) =>
-          ([] as RecordType[])
-            .concat(row.record)
-            .reduce(
-              (a, b) =>
-                a +
-                (b.row?.policy_evaluated?.disposition === 'reject'
-                  ? b.row.count
-                  : 0),
-              0,
-            ),
+        accessorFn: (report) => reportTotals(report).disposition_reject,
       },
     ],
     [],
@@ -1,13 +1,69 @@
 import axiosInstance from './axiosInstance'
 import endpoints from './endpoints.json'
 
-function getDmarcReportsByDateRange(startDate, endDate) {
-  return axiosInstance.get(`/${endpoints.aggregatedReportByDateRange}`, {
-    params: {
-      start_date: startDate,
-      end_date: endDate,
-    },
-  })
+const MAX_PAGE_SIZE = 500
+
+async function fetchReportsPage(url, startDate, endDate, cursor, limit) {
+  try {
+    const response = await axiosInstance.get(url, {
+      params: {
+        start_date: startDate,
+        end_date: endDate,
+        limit,
+        ...(cursor ? { cursor } : {}),
+      },
+    })
+    return {
+      reports: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null,
+    }
+  } catch (error) {
+    if (error.response && error.response.status === 404) {
+      return { reports: [], nextCursor: null }
+    }
+    throw error
+  }
+}
+
+function getDmarcReportsPage(startDate, endDate, cursor = null, limit = 50) {
+  return fetchReportsPage(
+    `/${endpoints.aggregatedReportByDateRange}`,
+    startDate,
+    endDate,
+    cursor,
+    limit,
+  )
+}
+
+function getDmarcReportSummariesPage(
+  startDate,
+  endDate,
+  cursor = null,
+  limit = 50,
+) {
+  return fetchReportsPage(
+    `/${endpoints.aggregatedReportSummary}`,
+    startDate,
+    endDate,
+    cursor,
+    limit,
+  )
+}
+
+async function getDmarcReportsByDateRange(startDate, endDate) {
+  const reports = []
+  let cursor = null
+  do {
+    const page = await getDmarcReportsPage(
+      startDate,
+      endDate,
+      cursor,
+      MAX_PAGE_SIZE,
+    )
+    reports.push(...page.reports)
+    cursor = page.nextCursor
+  } while (cursor)
+  return reports
 }
 
 function createNewUser(user) {
@@ -22,13 +78,9 @@ async function getIpsByRange(startDate, endDate) {
   endDate = endDate.toISOString()
   const query = `
   {
-    all_dmarc_reports_by_date_range(start_date: "${startDate}", end_date: "${endDate}") {
-      record {
-        row {
-          source_ip,
-          count
-        }
-      }
+    source_ip_counts(start_date: "${startDate}", end_date: "${endDate}") {
+      source_ip,
+      count
     }
   }
   `
@@ -41,22 +93,13 @@ async function getIpsByRange(startDate, endDate) {
   try {
     const response = await axiosInstance.post(urlQuery, { query }, { headers })
     if (response.data && response.data.data) {
-      const reports = response.data.data.all_dmarc_reports_by_date_range
       const ipCount = {}
 
-      reports.forEach((report) => {
-        report.record.forEach((record) => {
-          const ip = record.row.source_ip
-          const count = record.row.count
-          if (!ip) {
-            return
-          }
-          if (ip in ipCount) {
-            ipCount[ip] += count
-          } else {
-            ipCount[ip] = count
-          }
-        })
+      response.data.data.source_ip_counts.forEach(({ source_ip, count }) => {
+        if (!source_ip) {
+          return
+        }
+        ipCount[source_ip] = count
       })
 
       return ipCount
@@ -69,22 +112,69 @@ async function getIpsByRange(startDate, endDate) {
   }
 }
 
+async function getCountryCounts(args) {
+  const query = `
+  {
+    country_counts(${args}) {
+      country,
+      count
+    }
+  }
+  `
+
+  const urlQuery = `/${endpoints.graphQl}/`
+  const headers = {
+    'Content-Type': 'application/json',
+  }
+
+  try {
+    const response = await axiosInstance.post(urlQuery, { query }, { headers })
+    if (response.data && response.data.data) {
+      const countryCount = {}
+
+      response.data.data.country_counts.forEach(({ country, count }) => {
+        if (!country) {
+          return
+        }
+        countryCount[country] = count
+      })
+
+      return countryCount
+    } else {
+      throw new Error('No data found in response')
+    }
+  } catch (error) {
+    console.error('Error fetching data:', error)
+    throw error
+  }
+}
+
+function getCountriesByRange(startDate, endDate) {
+  return getCountryCounts(
+    `start_date: "${startDate.toISOString()}", end_date: "${endDate.toISOString()}"`,
+  )
+}
+
+function getCountriesByReport(reportId) {
+  return getCountryCounts(`report_id: ${JSON.stringify(reportId)}`)
+}
+
 async function getIdentifiersByDate(startDate, endDate) {
   startDate = startDate.toISOString()
   endDate = endDate.toISOString()
   const query = `
   {
-    all_dmarc_reports_by_date_range(start_date: "${startDate}", end_date: "${endDate}") {
-      record {
-        row {
-          count
-        }
-        identifiers {
-          envelope_to,
-          envelope_from,
-          header_from,
-        }
-      }
+    envelope_to: identifier_counts(field: "envelope_to", start_date: "${startDate}", end_date: "${endDate}") {
+      identifier,
+      count
+    }
+    envelope_from: identifier_counts(field: "envelope_from", start_date: "${startDate}", end_date: "${endDate}") {
+      identifier,
+      count
+    }
+    header_from: identifier_counts(field: "header_from", start_date: "${startDate}", end_date: "${endDate}") {
+      identifier,
+      count
     }
   }
   `
@@ -94,38 +184,21 @@ async function getIdentifiersByDate(startDate, endDate) {
     'Content-Type': 'application/json',
   }
 
+  const toCountMap = (counts) => {
+    const countMap = {}
+    counts.forEach(({ identifier, count }) => {
+      countMap[identifier] = count
+    })
+    return countMap
+  }
+
   try {
     const response = await axiosInstance.post(urlQuery, { query }, { headers })
     if (response.data && response.data.data) {
-      const reports = response.data.data.all_dmarc_reports_by_date_range
-      const envelopeTo = {}
-      const envelopeFrom = {}
-      const headerFrom = {}
-
-      reports.forEach((report) => {
-        report.record.forEach((record) => {
-          const identifier = record.identifiers
-          const count = record.row?.count
-          if (!identifier || !count) {
-            return
-          }
-          if (identifier.envelope_to in envelopeTo) {
-            envelopeTo[identifier.envelope_to] += count
-          } else {
-            envelopeTo[identifier.envelope_to] = count
-          }
-          if (identifier.envelope_from in envelopeFrom) {
-            envelopeFrom[identifier.envelope_from] += count
-          } else {
-            envelopeFrom[identifier.envelope_from] = count
-          }
-          if (identifier.header_from in headerFrom) {
-            headerFrom[identifier.header_from] += count
-          } else {
-            headerFrom[identifier.header_from] = count
-          }
-        })
-      })
+      const data = response.data.data
+      const envelopeTo = toCountMap(data.envelope_to)
+      const envelopeFrom = toCountMap(data.envelope_from)
+      const headerFrom = toCountMap(data.header_from)
 
       return { envelopeTo, envelopeFrom, headerFrom }
     } else {
@@ -137,10 +210,58 @@ async function getIdentifiersByDate(startDate, endDate) {
   }
 }
 
+async function getPolicyStatsByDate(startDate, endDate) {
+  startDate = startDate.toISOString()
+  endDate = endDate.toISOString()
+  const query = `
+  {
+    policy_result_counts(start_date: "${startDate}", end_date: "${endDate}") {
+      disposition,
+      dkim,
+      spf,
+      count
+    }
+    daily_counts(start_date: "${startDate}", end_date: "${endDate}") {
+      day,
+      disposition,
+      dkim,
+      spf,
+      count
+    }
+  }
+  `
+
+  const urlQuery = `/${endpoints.graphQl}/`
+  const headers = {
+    'Content-Type': 'application/json',
+  }
+
+  try {
+    const response = await axiosInstance.post(urlQuery, { query }, { headers })
+    if (response.data && response.data.data) {
+      const data = response.data.data
+      return {
+        policyResults: data.policy_result_counts,
+        dailyCounts: data.daily_counts,
+      }
+    } else {
+      throw new Error('No data found in response')
+    }
+  } catch (error) {
+    console.error('Error fetching data:', error)
+    throw error
+  }
+}
+
 export {
+  getDmarcReportsPage,
+  getDmarcReportSummariesPage,
   getDmarcReportsByDateRange,
   getDmarcReport,
   getIpsByRange,
+  getCountriesByRange,
+  getCountriesByReport,
   getIdentifiersByDate,
+  getPolicyStatsByDate,
   createNewUser,
 }
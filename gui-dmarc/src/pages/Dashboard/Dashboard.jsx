@@ -2,8 +2,9 @@ import React, { useState, useEffect } from 'react'
 import AuthResultsChart, { DMARCResultsChart } from '@src/components/PieCharts'
 import {
   getDmarcReportsByDateRange,
-  getIpsByRange,
+  getCountriesByRange,
   getIdentifiersByDate,
+  getPolicyStatsByDate,
 } from '@src/hooks/dmarcReports.js'
 import { TopDomainTable } from '@src/components/TopTables'
 import ChoroplethMap from '@src/components/ChoroplethMap'
@@ -18,27 +19,45 @@ function Dashboard() {
   const [loading, setLoading] = useState(false)
   const [reports, setReports] = useState([])
   const [records, setRecords] = useState([])
-  const [ipData, setIpData] = useState(false)
+  const [countryData, setCountryData] = useState(false)
   const [identifiers, setIdentifiers] = useState(false)
+  const [policyStats, setPolicyStats] = useState({
+    policyResults: [],
+    dailyCounts: [],
+  })
   const [activeTable, setActiveTable] = useState('envelopeTo')
 
   useEffect(() => {
-    async function fetchIps() {
+    async function fetchCountries() {
       try {
-        const ipData = await getIpsByRange(startDate, endDate)
-        setIpData(ipData)
+        const countryData = await getCountriesByRange(startDate, endDate)
+        setCountryData(countryData)
       } catch (error) {
-        setIpData({})
+        setCountryData({})
       }
     }
-    fetchIps()
+    fetchCountries()
   }, [startDate, endDate])
 
+  useEffect(() => {
+    async function fetchPolicyStats() {
+      try {
+        const policyStats = await getPolicyStatsByDate(startDate, endDate)
+        setPolicyStats(policyStats)
+      } catch (error) {
+        setPolicyStats({ policyResults: [], dailyCounts: [] })
+      }
+    }
+    fetchPolicyStats()
+  }, [startDate, endDate])
+
+  // Full reports are only needed for the auth results charts and the related
+  // reports of the domain tables; the other widgets use the stats queries.
   useEffect(() => {
     setLoading(true)
     async function fetchReports() {
-      const response = await getDmarcReportsByDateRange(startDate, endDate)
-      setReports(response.data)
+      const reports = await getDmarcReportsByDateRange(startDate, endDate)
+      setReports(reports)
       setLoading(false)
     }
     fetchReports()
@@ -109,9 +128,15 @@ function Dashboard() {
             Policy Evaluated Results
           </h1>
           <div className="flex flex-col sm:flex-row gap-2">
-            <DMARCResultsChart records={records} />
-            <PolicyEvaluatedChart records={records} type="dkim" />
-            <PolicyEvaluatedChart records={records} type="spf" />
+            <DMARCResultsChart stats={policyStats.policyResults} />
+            <PolicyEvaluatedChart
+              stats={policyStats.policyResults}
+              type="dkim"
+            />
+            <PolicyEvaluatedChart
+              stats={policyStats.policyResults}
+              type="spf"
+            />
           </div>
         </div>
         <div id="auth" className="carousel-item flex-col w-full">
@@ -166,14 +191,18 @@ function Dashboard() {
           <h2 className="text-xl font-bold mb-4">
             Results of DMARC Disposition Results by Date
           </h2>
-          <DMARCBarchart reports={reports} />
+          <DMARCBarchart dailyCounts={policyStats.dailyCounts} />
         </div>
 
         <div className="flex rounded-xl flex-col w-2/5">
           <h1 className="text-2xl font-semibold mb-2">
             Geographical Distribution of Source IPs
           </h1>
-          {ipData ? <ChoroplethMap ipData={ipData} /> : 'Loading...'}
+          {countryData ? (
+            <ChoroplethMap countryData={countryData} />
+          ) : (
+            'Loading...'
+          )}
         </div>
       </div>
     </div>
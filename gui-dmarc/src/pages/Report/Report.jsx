@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { useParams } from 'react-router-dom'
-import { getDmarcReport } from '@src/hooks/dmarcReports'
+import { getDmarcReport, getCountriesByReport } from '@src/hooks/dmarcReports'
 import { RecordsTable } from '@src/components/ReportsTables'
 import AuthResultsChart, { DMARCResultsChart, PolicyEvaluatedChart } from '@src/components/PieCharts'
 import  ChoroplethMap  from '../../components/ChoroplethMap'
@@ -18,7 +18,7 @@ function ReportData() {
   const { id } = useParams();
   const [loading, setLoading] = useState(true);
   const [report, setReport] = useState(null);
-  const [ipData , setIpData] = useState({})
+  const [countryData, setCountryData] = useState({})
 
   useEffect(() => {
     async function fetchReport() {
@@ -26,20 +26,9 @@ function ReportData() {
       try {
         const response = await getDmarcReport(id);
         setReport(response.data);
-        const ipData = {}
-        response.data.record.forEach((record) => {
-          const ip = record.row.source_ip
-          const count = record.row.count
-          if (!ip) {
-            return
-          }
-          if (ip in ipData) {
-            ipData[ip] += count
-          } else {
-            ipData[ip] = count
-          }
-        })
-        setIpData(ipData)
+        getCountriesByReport(id)
+          .then(setCountryData)
+          .catch(() => setCountryData({}))
       } catch (error) {
         console.error('Error fetching DMARC report:', error);
       } finally {
@@ -148,7 +137,7 @@ function ReportData() {
         <h2 className="text-2xl font-semibold mb-2">Records</h2>
         <RecordsTable recordsData={report.record} />
         <h2 className="text-2xl font-semibold my-4 ">Geographical Heatmap by IP Addresses</h2>
-        <ChoroplethMap ipData={ipData} />
+        <ChoroplethMap countryData={countryData} />
       </div>
       </div>
     </div>
@@ -1,7 +1,9 @@
 import { useState, useEffect } from 'react'
-import { getDmarcReportsByDateRange } from '@src/hooks/dmarcReports'
+import { getDmarcReportSummariesPage } from '@src/hooks/dmarcReports'
 import { DmarcReportsTable } from '../../components/ReportsTables'
 
+const PAGE_SIZE = 100
+
 function Reports() {
   // Date handling
   const [endDate, setEndDate] = useState(new Date())
@@ -10,16 +12,37 @@ function Reports() {
     new Date(new Date().setDate(new Date().getDate() - 31)),
   )
   const [reports, setReports] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
 
   useEffect(() => {
     setLoading(true)
     async function fetchReports() {
-      const response = await getDmarcReportsByDateRange(startDate, endDate)
-      setReports(response.data)
+      const page = await getDmarcReportSummariesPage(
+        startDate,
+        endDate,
+        null,
+        PAGE_SIZE,
+      )
+      setReports(page.reports)
+      setNextCursor(page.nextCursor)
       setLoading(false)
     }
     fetchReports()
   }, [startDate, endDate])
+
+  const loadMoreReports = async () => {
+    setLoading(true)
+    const page = await getDmarcReportSummariesPage(
+      startDate,
+      endDate,
+      nextCursor,
+      PAGE_SIZE,
+    )
+    setReports((prevReports) => [...prevReports, ...page.reports])
+    setNextCursor(page.nextCursor)
+    setLoading(false)
+  }
+
   const handleStartDateChange = (event) => {
     setStartDate(new Date(event.target.value))
   }
@@ -93,6 +116,15 @@ function Reports() {
         />
       </div>
       <DmarcReportsTable reportsData={filteredReports} />
+      {nextCursor && (
+        <button
+          className="bg-blue-gray-700 px-3 py-2 rounded-xl my-3"
+          onClick={loadMoreReports}
+          disabled={loading}
+        >
+          {loading ? 'Loading...' : 'Load more reports'}
+        </button>
+      )}
     </div>
   )
 }